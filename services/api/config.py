@@ -38,12 +38,21 @@ class Settings(BaseSettings):
     
     # ML Service
     ML_ENDPOINT: str = os.getenv("ML_ENDPOINT", "http://localhost:5000")
+    ML_SERVICE_PATH: str = os.getenv(
+        "ML_SERVICE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml")
+    )
+    HEALTH_SCORE_CACHE_SIZE: int = 10000
+    USAGE_ANOMALY_STREAM_CHUNK: int = 10000
     
     # Monitoring thresholds
     CHURN_RISK_THRESHOLD: float = 0.6
     ANOMALY_THRESHOLD: float = 0.3
     UTILIZATION_LOW_THRESHOLD: float = 50.0
     
+    # Batch endpoints
+    BATCH_LOOKUP_MAX_IDS: int = 100
+    
     class Config:
         case_sensitive = True
 
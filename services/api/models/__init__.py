@@ -2,7 +2,7 @@
 Initialize models package
 """
 
-from .models import User, Client, ClientMetric, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation
+from .models import User, Client, ClientMetric, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation, JobRun
 
 __all__ = [
     'User',
@@ -11,5 +11,6 @@ __all__ = [
     'SoftwareLicense',
     'LicenseUsage',
     'CostAnomaly',
-    'Recommendation'
+    'Recommendation',
+    'JobRun'
 ]
\ No newline at end of file
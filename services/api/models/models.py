@@ -147,4 +147,13 @@ class Alert(Base):
     status = Column(String, default='active')  # 'active', 'resolved', 'dismissed'
     created_at = Column(DateTime, default=datetime.utcnow)
     resolved_at = Column(DateTime)
-    owner_id = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey("users.id"))
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, index=True, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    processed_count = Column(Integer, default=0)
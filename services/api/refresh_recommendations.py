@@ -0,0 +1,83 @@
+"""
+Scheduled recommendation refresh
+Re-evaluates every client's recommendation rules, for inputs that change
+without a client write: days since contact grow with time, and support
+metrics are recorded without touching the client row
+
+Usage:
+    python refresh_recommendations.py [--chunk-size 1000]
+"""
+
+import argparse
+
+from database import SessionLocal
+from models.models import Client
+from utils.recommendations import recommendation_service
+
+CHUNK_SIZE = 1000
+
+
+def refresh_tenant(owner_id, chunk_size=CHUNK_SIZE, session_factory=None):
+    """
+    Re-evaluate one tenant's clients in id-ordered chunks
+
+    Unchanged results are skipped by their content hash, so only
+    recommendations that read differently now are written.
+
+    Returns:
+        dict: Summed refresh counts (see RecommendationService.refresh_clients)
+    """
+    db = (session_factory or SessionLocal)()
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    last_id = 0
+
+    try:
+        while True:
+            clients = db.query(Client).filter(
+                Client.owner_id == owner_id,
+                Client.id > last_id
+            ).order_by(Client.id).limit(chunk_size).all()
+            if not clients:
+                break
+
+            counts = recommendation_service.refresh_clients(db, owner_id, clients)
+            for key, count in counts.items():
+                totals[key] += count
+
+            last_id = clients[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+
+    return totals
+
+
+def run(chunk_size=CHUNK_SIZE, session_factory=None):
+    """
+    Refresh every tenant's client recommendations
+
+    Returns:
+        dict: Summed refresh counts
+    """
+    db = (session_factory or SessionLocal)()
+    try:
+        owner_ids = [
+            row[0] for row in db.query(Client.owner_id).filter(Client.owner_id.isnot(None)).distinct().all()
+        ]
+    finally:
+        db.close()
+
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    for owner_id in owner_ids:
+        for key, count in refresh_tenant(owner_id, chunk_size, session_factory).items():
+            totals[key] += count
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-evaluate client recommendations")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    totals = run(chunk_size=args.chunk_size)
+    print(", ".join(f"{count} {key}" for key, count in totals.items()))
@@ -0,0 +1,245 @@
+"""
+Batch churn and health rescoring job
+Rescores clients changed since the last run, writes the results back
+to the clients table with bulk UPDATEs and records health score history
+
+Usage:
+    python rescore_clients.py [--chunk-size 1000] [--workers 4] [--full]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+from sqlalchemy import bindparam, func, literal, or_, select
+
+from config import settings
+from database import SessionLocal, engine
+from models.models import Client, ClientMetric, JobRun
+from utils.scoring import HEALTH_SCORE_METRIC, SCORED_METRICS, load_ml_module, client_health_inputs
+
+JOB_NAME = "client_rescoring"
+CHUNK_SIZE = 1000
+
+# Scores are derived data, so updated_at is written back unchanged.
+# Otherwise every rescored client would count as changed on the next run.
+# Only rows still at the updated_at that was scored are written: a client
+# edited meanwhile keeps its newer values and is rescored on the next run.
+_update_scores = Client.__table__.update().where(
+    Client.__table__.c.id == bindparam('b_id'),
+    Client.__table__.c.updated_at.is_not_distinct_from(bindparam('b_updated_at'))
+).values(
+    health_score=bindparam('b_health_score'),
+    churn_probability=bindparam('b_churn_probability'),
+    churn_risk=bindparam('b_churn_risk'),
+    updated_at=bindparam('b_updated_at')
+)
+
+# One health score history row per client written above, for trends
+_record_history = ClientMetric.__table__.insert().from_select(
+    ['client_id', 'metric_type', 'value', 'timestamp'],
+    select(
+        Client.__table__.c.id, literal(HEALTH_SCORE_METRIC),
+        bindparam('b_health_score'), bindparam('b_scored_at')
+    ).where(
+        Client.__table__.c.id == bindparam('b_id'),
+        Client.__table__.c.updated_at.is_not_distinct_from(bindparam('b_updated_at'))
+    )
+)
+
+_scorers = None
+
+
+def _get_scorers():
+    """Load the churn predictor and health calculator once per process"""
+    global _scorers
+    if _scorers is None:
+        churn_predictor = load_ml_module("churn_predictor").ChurnPredictor()
+        health_calculator = load_ml_module("health_score_calculator").HealthScoreCalculator()
+        _scorers = (churn_predictor, health_calculator)
+    return _scorers
+
+
+def _churn_features(client):
+    features = {
+        'contract_value': client.contract_value,
+        'monthly_spend': client.monthly_spend,
+        'total_licenses': client.total_licenses,
+        'total_users': client.total_users,
+        'last_support_ticket': client.last_support_ticket,
+        'created_at': client.created_at
+    }
+    return {k: v for k, v in features.items() if v is not None}
+
+
+def _changed_since(since):
+    """
+    Clients updated after ``since``, or with a scored metric recorded after it
+
+    Metric rows are written without touching the client, so they're
+    checked separately.
+    """
+    new_metrics = select(ClientMetric.client_id).where(
+        ClientMetric.metric_type.in_(SCORED_METRICS),
+        ClientMetric.timestamp > since
+    )
+    return or_(Client.updated_at > since, Client.id.in_(new_metrics))
+
+
+def _latest_metrics(db, client_ids):
+    """Latest support metrics for a chunk of clients in one query"""
+    rows = db.query(ClientMetric).filter(
+        ClientMetric.client_id.in_(client_ids),
+        ClientMetric.metric_type.in_(SCORED_METRICS)
+    ).order_by(ClientMetric.timestamp).all()
+
+    metrics = {}
+    for row in rows:
+        metrics.setdefault(row.client_id, {})[row.metric_type] = row.value
+    return metrics
+
+
+def score_chunk(db, clients):
+    """
+    Score a chunk of clients
+
+    Returns:
+        list: Bind parameters for the bulk UPDATE, one dict per client
+    """
+    churn_predictor, health_calculator = _get_scorers()
+    metrics = _latest_metrics(db, [c.id for c in clients])
+
+    probabilities = churn_predictor.predict_proba_batch([_churn_features(c) for c in clients])
+    risk_levels = churn_predictor.risk_levels(probabilities)
+    health_scores = health_calculator.calculate_batch(
+        [client_health_inputs(c, metrics.get(c.id)) for c in clients]
+    )["overall_score"]
+
+    return [
+        {
+            'b_id': client.id,
+            'b_health_score': float(health_score),
+            'b_churn_probability': float(probability),
+            'b_churn_risk': str(risk_level),
+            'b_updated_at': client.updated_at
+        }
+        for client, probability, risk_level, health_score
+        in zip(clients, probabilities, risk_levels, health_scores)
+    ]
+
+
+def rescore_tenant(owner_id, since=None, chunk_size=CHUNK_SIZE, session_factory=None):
+    """
+    Rescore one tenant's clients in id-ordered chunks
+
+    Args:
+        owner_id (int): Tenant (MSP user) id
+        since (datetime): Only clients updated, or with new support
+            metrics, after this time; None for all
+        chunk_size (int): Clients loaded, scored and written per round trip
+        session_factory: Session factory, defaults to SessionLocal
+
+    Returns:
+        int: Number of clients rescored
+    """
+    db = (session_factory or SessionLocal)()
+    processed = 0
+    last_id = 0
+
+    try:
+        while True:
+            query = db.query(Client).filter(
+                Client.owner_id == owner_id,
+                Client.id > last_id
+            )
+            if since is not None:
+                query = query.filter(_changed_since(since))
+
+            clients = query.order_by(Client.id).limit(chunk_size).all()
+            if not clients:
+                break
+
+            scores = score_chunk(db, clients)
+            scored_at = datetime.utcnow()
+            db.execute(_update_scores, scores)
+            db.execute(_record_history, [dict(row, b_scored_at=scored_at) for row in scores])
+            db.commit()
+
+            processed += len(clients)
+            last_id = clients[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+
+    return processed
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused
+    engine.dispose()
+
+
+def run(chunk_size=CHUNK_SIZE, workers=1, full=False, session_factory=None):
+    """
+    Rescore every tenant's changed clients and record the run
+
+    Returns:
+        JobRun: The recorded run
+    """
+    session_factory = session_factory or SessionLocal
+    db = session_factory()
+
+    try:
+        started_at = datetime.utcnow()
+
+        since = None
+        if not full:
+            since = db.query(func.max(JobRun.started_at)).filter(
+                JobRun.job_name == JOB_NAME,
+                JobRun.finished_at.isnot(None)
+            ).scalar()
+
+        owners = db.query(Client.owner_id).distinct()
+        if since is not None:
+            owners = owners.filter(_changed_since(since))
+        owner_ids = [row[0] for row in owners.all()]
+
+        if workers > 1 and len(owner_ids) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                counts = list(pool.map(rescore_tenant, owner_ids, repeat(since), repeat(chunk_size)))
+        else:
+            counts = [
+                rescore_tenant(owner_id, since, chunk_size, session_factory)
+                for owner_id in owner_ids
+            ]
+
+        job_run = JobRun(
+            job_name=JOB_NAME,
+            started_at=started_at,
+            finished_at=datetime.utcnow(),
+            processed_count=sum(counts)
+        )
+        db.add(job_run)
+        db.commit()
+        db.refresh(job_run)
+        return job_run
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore client churn and health")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--workers", type=int,
+        # SQLite allows a single writer, so parallel tenants only help on PostgreSQL
+        default=1 if settings.USE_SQLITE else (os.cpu_count() or 1)
+    )
+    parser.add_argument("--full", action="store_true", help="Rescore all clients, not just changed ones")
+    args = parser.parse_args()
+
+    job_run = run(chunk_size=args.chunk_size, workers=args.workers, full=args.full)
+    print(f"Rescored {job_run.processed_count} clients "
+          f"in {(job_run.finished_at - job_run.started_at).total_seconds():.1f}s")
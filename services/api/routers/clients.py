@@ -4,10 +4,13 @@ Client management endpoints
 
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 from database import get_db
 from models.models import Client
 from pydantic import BaseModel
+from utils.batch import batch_lookup
+from utils.projection import parse_fields, select_fields, fields_response
+from utils.recommendations import recommendation_service, refresh_quietly
 
 router = APIRouter(prefix="/api/clients", tags=["clients"])
 
@@ -56,12 +59,34 @@ class ClientResponse(ClientBase):
     class Config:
         from_attributes = True
 
+class ClientBatchRequest(BaseModel):
+    ids: List[Union[int, str]]  # Database ids or client_id strings
+
+class ClientLookupResult(BaseModel):
+    id: Union[int, str]
+    found: bool
+    data: Optional[ClientResponse] = None
+
+class ClientBatchResponse(BaseModel):
+    results: List[ClientLookupResult]
+
 @router.get("/", response_model=List[ClientResponse])
-def get_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_clients(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
     """Get all clients"""
+    field_names = parse_fields(fields, ClientResponse)
+    if field_names:
+        return fields_response(
+            select_fields(db.query(Client), Client, field_names).offset(skip).limit(limit).all()
+        )
     clients = db.query(Client).offset(skip).limit(limit).all()
     return clients
 
+@router.post("/batch", response_model=ClientBatchResponse)
+def get_clients_batch(request: ClientBatchRequest, db: Session = Depends(get_db)):
+    """Get many clients by id or client_id in one request"""
+    results = batch_lookup(db.query(Client), Client, request.ids, key_column=Client.client_id)
+    return {"results": results}
+
 @router.get("/{client_id}", response_model=ClientResponse)
 def get_client(client_id: int, db: Session = Depends(get_db)):
     """Get a specific client by ID"""
@@ -108,6 +133,12 @@ def update_client(client_id: int, client_update: ClientUpdate, db: Session = Dep
         setattr(db_client, field, value)
     
     db.commit()
+    
+    # Re-evaluate only the rules that read a changed field
+    if db_client.owner_id is not None:
+        refresh_quietly(recommendation_service.refresh_clients, db, db_client.owner_id, [db_client],
+                        changed=update_data)
+    
     db.refresh(db_client)
     return db_client
 
@@ -118,6 +149,9 @@ def delete_client(client_id: int, db: Session = Depends(get_db)):
     if not db_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
+    # Its recommendations, dismissed ones too, go in the same transaction
+    if db_client.owner_id is not None:
+        recommendation_service.remove_entities(db, db_client.owner_id, 'msp', [db_client.id])
     db.delete(db_client)
     db.commit()
     return {"message": "Client deleted successfully"}
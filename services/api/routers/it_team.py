@@ -6,18 +6,26 @@ Endpoints for IT administrators
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 import random
 import uuid
 
+from config import settings
 from database import get_db
 from models.models import User, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation
 from schemas.schemas import (
     SoftwareLicenseCreate, SoftwareLicenseResponse,
-    ITDashboardResponse, CostAnomalyResponse, RecommendationResponse
+    ITDashboardResponse, CostAnomalyResponse, RecommendationResponse,
+    SoftwareLicenseBatchRequest, SoftwareLicenseBatchResponse
 )
 from routers.auth import get_current_user
+from utils.batch import batch_lookup
+from utils.projection import parse_fields, select_fields, fields_response
+from utils.search import ranked_search
+from utils.scoring import load_ml_module
+from utils.catalog import infer_category
+from utils.recommendations import recommendation_service, refresh_quietly
 
 router = APIRouter()
 
@@ -91,7 +99,8 @@ async def get_software_licenses(
     db: Session = Depends(get_db),
     department: str = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    fields: Optional[str] = None
 ):
     """Get all software licenses"""
     if current_user.role != "it_admin":
@@ -100,6 +109,8 @@ async def get_software_licenses(
             detail="Access denied. IT Admin role required."
         )
     
+    field_names = parse_fields(fields, SoftwareLicenseResponse)
+    
     query = db.query(SoftwareLicense).filter(
         SoftwareLicense.owner_id == current_user.id
     )
@@ -107,6 +118,11 @@ async def get_software_licenses(
     if department:
         query = query.filter(SoftwareLicense.department == department)
     
+    if field_names:
+        return fields_response(
+            select_fields(query, SoftwareLicense, field_names).offset(skip).limit(limit).all()
+        )
+    
     licenses = query.offset(skip).limit(limit).all()
     
     return licenses
@@ -138,15 +154,52 @@ async def create_software_license(
         monthly_cost=license.monthly_cost,
         annual_cost=annual_cost,
         department=license.department,
+        category=license.category or infer_category(license.software_name),
         owner_id=current_user.id
     )
     
     db.add(db_license)
     db.commit()
+    refresh_quietly(recommendation_service.refresh_licenses, db, current_user.id, [db_license])
     db.refresh(db_license)
     
     return db_license
 
+@router.get("/software/search", response_model=List[SoftwareLicenseResponse])
+async def search_software_licenses(
+    q: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    limit: int = 20
+):
+    """Search software by name, vendor or category (prefix typeahead)"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    return ranked_search(db, SoftwareLicense, q, current_user.id, limit)
+
+@router.post("/software/batch", response_model=SoftwareLicenseBatchResponse)
+async def get_software_licenses_batch(
+    request: SoftwareLicenseBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get many software licenses by id in one request"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    query = db.query(SoftwareLicense).filter(
+        SoftwareLicense.owner_id == current_user.id
+    )
+    
+    return {"results": batch_lookup(query, SoftwareLicense, request.ids)}
+
 @router.get("/software/{license_id}/usage")
 async def get_license_usage(
     license_id: int,
@@ -200,6 +253,51 @@ async def get_license_usage(
         ]
     }
 
+@router.get("/usage-anomalies")
+async def get_usage_anomalies(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    top_k: int = 10,
+    threshold: float = 3.5
+):
+    """Find users whose usage is far from their peers on the same license and department"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    if top_k < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="top_k must be at least 1"
+        )
+    
+    # Rows are streamed in chunks straight into the columnar detector
+    usage_rows = db.query(
+        LicenseUsage.license_id,
+        LicenseUsage.user_email,
+        LicenseUsage.usage_hours,
+        SoftwareLicense.department
+    ).join(
+        SoftwareLicense, LicenseUsage.license_id == SoftwareLicense.id
+    ).filter(
+        SoftwareLicense.owner_id == current_user.id
+    ).yield_per(settings.USAGE_ANOMALY_STREAM_CHUNK)
+    
+    detector = load_ml_module("usage_anomaly_detector").UsageAnomalyDetector(threshold=threshold, top_k=top_k)
+    result = detector.detect(usage_rows)
+    
+    license_ids = {group["license_id"] for group in result["groups"]}
+    names = dict(db.query(SoftwareLicense.id, SoftwareLicense.software_name).filter(
+        SoftwareLicense.id.in_(license_ids)
+    ).all()) if license_ids else {}
+    for group in result["groups"]:
+        group["software_name"] = names.get(group["license_id"])
+        group["department"] = group["department"] or "Unassigned"
+    
+    return result
+
 @router.get("/anomalies", response_model=List[CostAnomalyResponse])
 async def get_cost_anomalies(
     current_user: User = Depends(get_current_user),
@@ -268,6 +366,10 @@ async def deactivate_unused_licenses(
     license.utilization_percent = (license.active_users / license.total_licenses * 100) if license.total_licenses > 0 else 0
     
     db.commit()
+    refresh_quietly(
+        recommendation_service.refresh_licenses, db, current_user.id, [license],
+        changed={"active_users", "utilization_percent"}
+    )
     
     cost_saved = deactivated_count * (license.monthly_cost / license.total_licenses) if license.total_licenses > 0 else 0
     
@@ -278,6 +380,22 @@ async def deactivate_unused_licenses(
         "new_utilization": license.utilization_percent
     }
 
+@router.post("/recommendations/refresh")
+async def refresh_recommendations(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-evaluate every recommendation rule for all software licenses"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    licenses = db.query(SoftwareLicense).filter(SoftwareLicense.owner_id == current_user.id).all()
+    
+    return recommendation_service.refresh_licenses(db, current_user.id, licenses)
+
 @router.get("/spend/department")
 async def get_departmental_spend(
     current_user: User = Depends(get_current_user),
@@ -6,7 +6,7 @@ Endpoints for Managed Service Providers
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 import random
 import uuid
@@ -15,9 +15,14 @@ from database import get_db
 from models.models import User, Client, ClientMetric, Recommendation, Alert
 from schemas.schemas import (
     ClientCreate, ClientResponse, MSPDashboardResponse,
-    RecommendationResponse
+    RecommendationResponse, ClientBatchRequest, ClientBatchResponse
 )
 from routers.auth import get_current_user
+from utils.batch import batch_lookup
+from utils.projection import parse_fields, select_fields, fields_response
+from utils.search import ranked_search
+from utils.scoring import health_scoring_service
+from utils.recommendations import recommendation_service, refresh_quietly
 
 router = APIRouter()
 
@@ -82,7 +87,8 @@ async def get_clients(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    fields: Optional[str] = None
 ):
     """Get all clients for the MSP"""
     if current_user.role != "msp":
@@ -91,12 +97,54 @@ async def get_clients(
             detail="Access denied. MSP role required."
         )
     
-    clients = db.query(Client).filter(
+    field_names = parse_fields(fields, ClientResponse)
+    
+    query = db.query(Client).filter(
         Client.owner_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    )
+    
+    if field_names:
+        return fields_response(
+            select_fields(query, Client, field_names).offset(skip).limit(limit).all()
+        )
+    
+    clients = query.offset(skip).limit(limit).all()
     
     return clients
 
+@router.get("/clients/search", response_model=List[ClientResponse])
+async def search_clients(
+    q: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    limit: int = 20
+):
+    """Search clients by name, industry, contact or email (prefix typeahead)"""
+    if current_user.role != "msp":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. MSP role required."
+        )
+    
+    return ranked_search(db, Client, q, current_user.id, limit)
+
+@router.post("/clients/batch", response_model=ClientBatchResponse)
+async def get_clients_batch(
+    request: ClientBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get many clients by id or client_id in one request"""
+    if current_user.role != "msp":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. MSP role required."
+        )
+    
+    query = db.query(Client).filter(Client.owner_id == current_user.id)
+    
+    return {"results": batch_lookup(query, Client, request.ids, key_column=Client.client_id)}
+
 @router.get("/clients/{client_id}", response_model=ClientResponse)
 async def get_client(
     client_id: int,
@@ -160,6 +208,7 @@ async def create_client(
     
     db.add(db_client)
     db.commit()
+    refresh_quietly(recommendation_service.refresh_clients, db, current_user.id, [db_client])
     db.refresh(db_client)
     
     return db_client
@@ -188,18 +237,17 @@ async def get_client_health_score(
             detail="Client not found"
         )
     
+    breakdown = health_scoring_service.get_breakdown(db, client)
+    
     return {
         "client_id": client.client_id,
         "client_name": client.name,
-        "overall_score": client.health_score,
-        "factors": {
-            "payment_history": random.uniform(70, 100),
-            "support_ticket_frequency": random.uniform(60, 90),
-            "license_utilization": random.uniform(65, 95),
-            "contract_renewal_proximity": random.uniform(50, 100),
-            "engagement_level": random.uniform(60, 95)
-        },
-        "trend": "improving" if random.random() > 0.5 else "declining",
+        "overall_score": breakdown["overall_score"],
+        "previous_score": breakdown["previous_score"],
+        "health_status": breakdown["health_status"],
+        "factors": breakdown["factor_scores"],
+        "trend": breakdown["trend"],
+        "insights": breakdown["insights"],
         "churn_risk": client.churn_risk,
         "churn_probability": client.churn_probability
     }
@@ -228,6 +276,22 @@ async def get_recommendations(
     
     return recommendations
 
+@router.post("/recommendations/refresh")
+async def refresh_recommendations(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-evaluate every recommendation rule for all clients"""
+    if current_user.role != "msp":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. MSP role required."
+        )
+    
+    clients = db.query(Client).filter(Client.owner_id == current_user.id).all()
+    
+    return recommendation_service.refresh_clients(db, current_user.id, clients)
+
 @router.get("/alerts")
 async def get_alerts(
     current_user: User = Depends(get_current_user),
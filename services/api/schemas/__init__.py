@@ -9,6 +9,9 @@ __all__ = [
     'Token', 'TokenData',
     'ClientBase', 'ClientCreate', 'ClientResponse',
     'SoftwareLicenseBase', 'SoftwareLicenseCreate', 'SoftwareLicenseResponse',
+    'ClientBatchRequest', 'SoftwareLicenseBatchRequest',
+    'ClientLookupResult', 'SoftwareLicenseLookupResult',
+    'ClientBatchResponse', 'SoftwareLicenseBatchResponse',
     'CostAnomalyResponse',
     'RecommendationResponse',
     'MSPDashboardResponse',
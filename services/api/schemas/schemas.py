@@ -3,7 +3,7 @@ Pydantic schemas for request/response validation
 """
 
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 
 # User schemas
@@ -64,6 +64,7 @@ class SoftwareLicenseBase(BaseModel):
     active_users: Optional[int] = None
     monthly_cost: float
     department: Optional[str] = None
+    category: Optional[str] = None  # Inferred from software_name if not given
 
 class SoftwareLicenseCreate(SoftwareLicenseBase):
     pass
@@ -79,6 +80,29 @@ class SoftwareLicenseResponse(SoftwareLicenseBase):
     class Config:
         from_attributes = True
 
+# Batch lookup schemas
+class ClientBatchRequest(BaseModel):
+    ids: List[Union[int, str]]  # Database ids or client_id strings like CLT-XXXX
+
+class SoftwareLicenseBatchRequest(BaseModel):
+    ids: List[int]
+
+class ClientLookupResult(BaseModel):
+    id: Union[int, str]
+    found: bool
+    data: Optional[ClientResponse] = None
+
+class SoftwareLicenseLookupResult(BaseModel):
+    id: int
+    found: bool
+    data: Optional[SoftwareLicenseResponse] = None
+
+class ClientBatchResponse(BaseModel):
+    results: List[ClientLookupResult]
+
+class SoftwareLicenseBatchResponse(BaseModel):
+    results: List[SoftwareLicenseLookupResult]
+
 # Anomaly schemas
 class CostAnomalyResponse(BaseModel):
     id: int
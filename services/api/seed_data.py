@@ -14,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import SessionLocal, engine, Base
 from models.models import User, Client, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation
 from routers.auth import get_password_hash
+from routers.it_team import software_catalog
 
 def seed_database():
     """Seed database with sample data"""
@@ -90,6 +91,7 @@ def seed_database():
             {"name": "Tableau", "vendor": "Tableau", "licenses": 30, "active": 15, "cost": 2100, "dept": "Analytics"}
         ]
         
+        catalog = software_catalog()
         for sw_data in software_data:
             utilization = (sw_data["active"] / sw_data["licenses"] * 100) if sw_data["licenses"] > 0 else 0
             
@@ -102,6 +104,7 @@ def seed_database():
                 monthly_cost=sw_data["cost"],
                 annual_cost=sw_data["cost"] * 12,
                 department=sw_data["dept"],
+                category=catalog.categorize(sw_data["name"]),
                 renewal_date=datetime.utcnow() + timedelta(days=random.randint(30, 365)),
                 owner_id=it_user.id
             )
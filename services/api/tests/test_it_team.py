@@ -0,0 +1,99 @@
+"""
+Tests for IT team endpoints
+"""
+import pytest
+
+
+def test_usage_anomalies_by_license_and_department(client, auth_headers, db_session, test_user):
+    """Test usage is compared within each license/department, not globally"""
+    from models.models import SoftwareLicense, LicenseUsage
+    
+    test_user.role = "it_admin"
+    light = SoftwareLicense(software_name="Chat", department="Sales", owner_id=test_user.id)
+    heavy = SoftwareLicense(software_name="IDE", department="Engineering", owner_id=test_user.id)
+    db_session.add_all([light, heavy])
+    db_session.commit()
+    
+    # Heavy IDE usage is normal for engineers; 40 hours of chat is not
+    for i, hours in enumerate([2, 3, 2.5, 3.5, 2, 3, 40]):
+        db_session.add(LicenseUsage(license_id=light.id, user_email=f"sales{i}@example.com", usage_hours=hours))
+    for i, hours in enumerate([38, 42, 40, 41, 39, 37, 43]):
+        db_session.add(LicenseUsage(license_id=heavy.id, user_email=f"eng{i}@example.com", usage_hours=hours))
+    db_session.commit()
+    
+    response = client.get("/api/it/usage-anomalies", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    
+    assert data["anomaly_count"] == 1
+    assert data["group_count"] == 2
+    group = data["groups"][0]
+    assert group["software_name"] == "Chat"
+    assert group["department"] == "Sales"
+    assert group["median_usage"] == pytest.approx(3.0)
+    assert [u["user_email"] for u in group["anomalous_users"]] == ["sales6@example.com"]
+    assert group["anomalous_users"][0]["direction"] == "high"
+
+
+def test_usage_anomalies_requires_it_admin(client, auth_headers):
+    """Test non-IT users are rejected"""
+    response = client.get("/api/it/usage-anomalies", headers=auth_headers)
+    assert response.status_code == 403
+
+
+def test_create_software_infers_category(client, auth_headers, db_session, test_user):
+    """Test a new license's category comes from the software catalog unless given"""
+    test_user.role = "it_admin"
+    db_session.commit()
+    
+    inferred = client.post("/api/it/software", headers=auth_headers, json={
+        "software_name": "Zoom Pro", "total_licenses": 10, "monthly_cost": 150.0
+    })
+    given = client.post("/api/it/software", headers=auth_headers, json={
+        "software_name": "Zoom Pro", "total_licenses": 10, "monthly_cost": 150.0, "category": "Video"
+    })
+    unknown = client.post("/api/it/software", headers=auth_headers, json={
+        "software_name": "Internal Wiki", "total_licenses": 10, "monthly_cost": 0.0
+    })
+    
+    assert inferred.status_code == 201
+    assert inferred.json()["category"] == "Communication"
+    assert given.json()["category"] == "Video"
+    assert unknown.json()["category"] is None
+
+
+def test_software_category_without_ml_service_and_on_rename(client, auth_headers, db_session, test_user, monkeypatch):
+    """Test creates succeed without the catalog, and a renamed license's inferred category follows its name"""
+    import utils.catalog
+    import utils.recommendations
+    from models.models import SoftwareLicense
+    
+    test_user.role = "it_admin"
+    db_session.commit()
+    zoom = client.post("/api/it/software", headers=auth_headers, json={
+        "software_name": "Zoom Pro", "total_licenses": 10, "monthly_cost": 150.0
+    }).json()
+    manual = client.post("/api/it/software", headers=auth_headers, json={
+        "software_name": "Zoom Pro", "total_licenses": 10, "monthly_cost": 150.0, "category": "Video"
+    }).json()
+    
+    # Renaming re-infers an inferred category and keeps one set by hand
+    for license_id in (zoom["id"], manual["id"]):
+        db_session.get(SoftwareLicense, license_id).software_name = "Jira Cloud"
+    db_session.commit()
+    assert db_session.get(SoftwareLicense, zoom["id"]).category == "Project Management"
+    assert db_session.get(SoftwareLicense, manual["id"]).category == "Video"
+    
+    def missing(name):
+        raise ModuleNotFoundError(f"No module named 'pulseops_ml.{name}'")
+    
+    monkeypatch.setattr(utils.catalog, "load_ml_module", missing)
+    monkeypatch.setattr(utils.catalog, "_catalog", None)
+    monkeypatch.setattr(utils.recommendations.recommendation_service, "_engine", None)
+    monkeypatch.setattr(utils.recommendations, "load_ml_module", missing)
+    
+    created = client.post("/api/it/software", headers=auth_headers, json={
+        "software_name": "Slack", "total_licenses": 10, "monthly_cost": 80.0
+    })
+    assert created.status_code == 201
+    assert created.json()["category"] is None
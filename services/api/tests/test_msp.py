@@ -79,3 +79,311 @@ def test_get_nonexistent_client(client, auth_headers):
     """Test getting nonexistent client"""
     response = client.get("/api/msp/clients/99999", headers=auth_headers)
     assert response.status_code == 404
+
+
+def test_get_clients_batch(client, auth_headers, db_session, test_user):
+    """Test batch lookup keeps request order and marks missing ids"""
+    from models.models import Client
+    
+    clients = []
+    for i in range(3):
+        client_obj = Client(
+            client_id=f"CLT-BATCH{i:03d}",
+            name=f"Batch Client {i}",
+            industry="Technology",
+            owner_id=test_user.id
+        )
+        db_session.add(client_obj)
+        clients.append(client_obj)
+    db_session.commit()
+    
+    ids = [clients[2].id, "CLT-BATCH000", 99999, "CLT-MISSING", clients[1].id]
+    response = client.post("/api/msp/clients/batch", json={"ids": ids}, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["id"] for r in results] == ids
+    assert [r["found"] for r in results] == [True, True, False, False, True]
+    assert results[0]["data"]["name"] == "Batch Client 2"
+    assert results[1]["data"]["name"] == "Batch Client 0"
+    assert results[2]["data"] is None
+
+
+def test_get_clients_batch_tenant_scoped(client, auth_headers, db_session, test_user):
+    """Test batch lookup does not return other tenants' clients"""
+    from models.models import Client
+    
+    other_client = Client(client_id="CLT-OTHER001", name="Other Client", owner_id=test_user.id + 1)
+    db_session.add(other_client)
+    db_session.commit()
+    
+    response = client.post(
+        "/api/msp/clients/batch",
+        json={"ids": [other_client.id, "CLT-OTHER001"]},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert [r["found"] for r in response.json()["results"]] == [False, False]
+
+
+def test_get_clients_batch_too_many_ids(client, auth_headers):
+    """Test batch lookup rejects oversized requests"""
+    from config import settings
+    
+    ids = list(range(settings.BATCH_LOOKUP_MAX_IDS + 1))
+    response = client.post("/api/msp/clients/batch", json={"ids": ids}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_get_clients_sparse_fields(client, auth_headers, db_session, test_user):
+    """Test fields= projects the client list down to the requested columns"""
+    from models.models import Client
+    
+    db_session.add(Client(
+        client_id="CLT-FIELDS001",
+        name="Fields Client",
+        industry="Technology",
+        health_score=75.0,
+        owner_id=test_user.id
+    ))
+    db_session.commit()
+    
+    response = client.get("/api/msp/clients?fields=name,health_score", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == [{"name": "Fields Client", "health_score": 75.0}]
+
+
+def test_get_clients_unknown_field(client, auth_headers):
+    """Test fields= rejects names outside the response schema"""
+    response = client.get("/api/msp/clients?fields=name,owner_id", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_search_clients(client, auth_headers, db_session, test_user):
+    """Test ranked prefix search over client name, industry and contact"""
+    from models.models import Client
+    
+    db_session.add_all([
+        Client(client_id="CLT-SRCH001", name="Acme Corporation", industry="Manufacturing",
+               contact="Jane Doe", owner_id=test_user.id),
+        Client(client_id="CLT-SRCH002", name="Globex", industry="Technology",
+               contact="Acme Liaison", owner_id=test_user.id),
+        Client(client_id="CLT-SRCH003", name="Acme Other Tenant", owner_id=test_user.id + 1),
+    ])
+    db_session.commit()
+    
+    response = client.get("/api/msp/clients/search?q=acm", headers=auth_headers)
+    assert response.status_code == 200
+    names = [c["name"] for c in response.json()]
+    assert set(names) == {"Acme Corporation", "Globex"}
+    
+    response = client.get("/api/msp/clients/search?q=manuf", headers=auth_headers)
+    assert [c["name"] for c in response.json()] == ["Acme Corporation"]
+
+
+def test_search_clients_sees_updates(client, auth_headers, db_session, test_user):
+    """Test the search index follows inserts, updates and deletes"""
+    from models.models import Client
+    
+    client_obj = Client(client_id="CLT-SRCH010", name="Initech", owner_id=test_user.id)
+    db_session.add(client_obj)
+    db_session.commit()
+    
+    client_obj.name = "Initrode"
+    db_session.commit()
+    
+    response = client.get("/api/msp/clients/search?q=initrode", headers=auth_headers)
+    assert [c["client_id"] for c in response.json()] == ["CLT-SRCH010"]
+    response = client.get("/api/msp/clients/search?q=initech", headers=auth_headers)
+    assert response.json() == []
+    
+    db_session.delete(client_obj)
+    db_session.commit()
+    response = client.get("/api/msp/clients/search?q=initrode", headers=auth_headers)
+    assert response.json() == []
+
+
+def test_client_health_score_breakdown(client, auth_headers, db_session, test_user, tmp_path, monkeypatch):
+    """Test the health score breakdown is computed and cached, and trends follow the rescoring job's history"""
+    import rescore_clients
+    from models.models import Client, ClientMetric
+    from sqlalchemy.orm import sessionmaker
+    
+    monkeypatch.setenv("MODEL_REGISTRY_DIR", str(tmp_path))
+    
+    client_obj = Client(
+        client_id="CLT-HEALTH001",
+        name="Health Client",
+        contract_value=24000.0,
+        monthly_spend=2000.0,
+        total_licenses=100,
+        total_users=80,
+        owner_id=test_user.id
+    )
+    db_session.add(client_obj)
+    db_session.commit()
+    
+    url = f"/api/msp/clients/{client_obj.id}/health-score"
+    first = client.get(url, headers=auth_headers).json()
+    second = client.get(url, headers=auth_headers).json()
+    assert first == second
+    assert first["previous_score"] is None
+    assert first["trend"] == "stable"
+    assert set(first["factors"]) == {
+        "payment_history", "support_engagement", "license_utilization",
+        "contract_stability", "feature_adoption", "communication_frequency"
+    }
+    
+    def history():
+        return db_session.query(ClientMetric).filter(
+            ClientMetric.client_id == client_obj.id,
+            ClientMetric.metric_type == "health_score"
+        ).count()
+    
+    # Reading a breakdown doesn't write; the rescoring job records history
+    assert history() == 0
+    rescore_clients.run(session_factory=sessionmaker(bind=db_session.get_bind()))
+    assert history() == 1
+    db_session.expire_all()
+    assert client.get(url, headers=auth_headers).json()["previous_score"] is None
+    
+    # Dropping utilization to 10% changes updated_at and lowers the score
+    client_obj.total_users = 10
+    db_session.commit()
+    
+    third = client.get(url, headers=auth_headers).json()
+    assert third["previous_score"] == pytest.approx(first["overall_score"])
+    assert third["overall_score"] < first["overall_score"]
+    assert third["trend"] == "declining"
+    
+    # A new support metric changes the breakdown without touching the client
+    db_session.add(ClientMetric(client_id=client_obj.id, metric_type="support_tickets", value=40))
+    db_session.commit()
+    fourth = client.get(url, headers=auth_headers).json()
+    assert fourth["factors"]["support_engagement"] != third["factors"]["support_engagement"]
+    assert history() == 1
+
+
+def test_recommendations_follow_client_changes(client, auth_headers, db_session, test_user):
+    """Test only affected rules are re-evaluated and stored rows are upserted, not duplicated"""
+    from models.models import Client, Recommendation
+    from utils.recommendations import recommendation_service
+    
+    client_obj = Client(
+        client_id="CLT-REC001",
+        name="Rec Client",
+        health_score=90.0,
+        contract_value=10000.0,
+        monthly_spend=1000.0,
+        churn_risk="high",
+        owner_id=test_user.id
+    )
+    db_session.add(client_obj)
+    db_session.commit()
+    
+    def stored():
+        return {r.meta_data["rule_id"]: r for r in db_session.query(Recommendation).all()}
+    
+    counts = recommendation_service.refresh_clients(db_session, test_user.id, [client_obj])
+    assert counts["inserted"] == 2
+    assert set(stored()) == {"upsell_high_satisfaction", "retention_high_churn_risk"}
+    assert stored()["upsell_high_satisfaction"].meta_data["client_id"] == "CLT-REC001"
+    
+    counts = recommendation_service.refresh_clients(db_session, test_user.id, [client_obj])
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 2, "removed": 0}
+    
+    # Only the upsell rule reads monthly_spend; its row is updated in place
+    upsell_id = stored()["upsell_high_satisfaction"].id
+    response = client.put(f"/api/clients/{client_obj.id}", json={"monthly_spend": 2000.0})
+    assert response.status_code == 200
+    assert stored()["upsell_high_satisfaction"].id == upsell_id
+    assert stored()["upsell_high_satisfaction"].potential_value == 2000.0 * 12 * 0.3
+    assert recommendation_service.refresh_clients(
+        db_session, test_user.id, [client_obj], changed={"email"}
+    ) == {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    
+    # A dismissed recommendation isn't recreated; one a rule stops making is removed
+    stored()["retention_high_churn_risk"].status = "dismissed"
+    db_session.commit()
+    client.put(f"/api/clients/{client_obj.id}", json={"churn_risk": "high", "health_score": 50.0})
+    rows = stored()
+    assert set(rows) == {"retention_high_churn_risk"}
+    assert rows["retention_high_churn_risk"].status == "dismissed"
+    assert db_session.query(Recommendation).count() == 1
+
+
+def test_client_writes_succeed_without_ml_service(client, auth_headers, db_session, test_user, monkeypatch):
+    """Test creating and updating clients works when the recommendation engine can't load"""
+    import utils.recommendations
+    from models.models import Client
+    
+    def missing(name):
+        raise ModuleNotFoundError(f"No module named 'pulseops_ml.{name}'")
+    
+    monkeypatch.setattr(utils.recommendations, "load_ml_module", missing)
+    monkeypatch.setattr(utils.recommendations.recommendation_service, "_engine", None)
+    
+    created = client.post("/api/msp/clients", headers=auth_headers, json={
+        "name": "Offline Client", "industry": "Retail", "contract_value": 5000.0, "monthly_spend": 500.0
+    })
+    assert created.status_code == 201
+    
+    updated = client.put(f"/api/clients/{created.json()['id']}", json={"monthly_spend": 750.0})
+    assert updated.status_code == 200
+    assert db_session.query(Client).filter(Client.name == "Offline Client").one().monthly_spend == 750.0
+
+
+def test_recommendation_refresh_drops_stale_pending_copy(db_session, test_user):
+    """Test a pending row with outdated content is removed when its current content was dismissed"""
+    from models.models import Client, Recommendation
+    from utils.recommendations import recommendation_service
+    
+    clients = [
+        Client(client_id=f"CLT-DUP{i}", name=f"Dup {i}", churn_risk="high", contract_value=1000.0,
+               owner_id=test_user.id)
+        for i in range(2)
+    ]
+    db_session.add_all(clients)
+    db_session.commit()
+    recommendation_service.refresh_clients(db_session, test_user.id, clients)
+    
+    # Dismiss the current recommendation and leave an outdated pending copy next to it
+    current = db_session.query(Recommendation).filter(
+        Recommendation.meta_data["entity"].as_string() == f"client:{clients[0].id}"
+    ).one()
+    current.status = "dismissed"
+    db_session.add(Recommendation(
+        recommendation_type=current.recommendation_type, title="Old", description="Old",
+        potential_value=1.0, priority="high", status="pending", owner_id=test_user.id,
+        meta_data=dict(current.meta_data, content_hash="outdated")
+    ))
+    db_session.commit()
+    
+    counts = recommendation_service.refresh_clients(db_session, test_user.id, [clients[0]])
+    
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 1, "removed": 1}
+    rows = db_session.query(Recommendation).all()
+    assert sorted(r.status for r in rows) == ["dismissed", "pending"]
+    assert {r.meta_data["entity"] for r in rows if r.status == "pending"} == {f"client:{clients[1].id}"}
+
+
+def test_deleting_a_client_removes_its_recommendations(client, db_session, test_user):
+    """Test a deleted client's recommendations, dismissed ones too, are removed with it"""
+    from models.models import Client, Recommendation
+    from utils.recommendations import recommendation_service
+    
+    clients = [
+        Client(client_id=f"CLT-DEL{i}", name=f"Del {i}", churn_risk="high", contract_value=1000.0,
+               owner_id=test_user.id)
+        for i in range(2)
+    ]
+    db_session.add_all(clients)
+    db_session.commit()
+    recommendation_service.refresh_clients(db_session, test_user.id, clients)
+    for row in db_session.query(Recommendation).all():
+        row.status = "dismissed"
+    db_session.commit()
+    
+    assert client.delete(f"/api/clients/{clients[0].id}").status_code == 200
+    
+    rows = db_session.query(Recommendation).all()
+    assert {r.meta_data["entity"] for r in rows} == {f"client:{clients[1].id}"}
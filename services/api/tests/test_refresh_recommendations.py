@@ -0,0 +1,34 @@
+"""
+Tests for the scheduled recommendation refresh
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+
+def test_untouched_clients_age_into_time_based_rules(db_session, test_user):
+    """Test the job fires rules on days since contact, and a dismissed one stays dismissed as days pass"""
+    import refresh_recommendations
+    from models.models import Client, Recommendation
+    
+    client_obj = Client(client_id="CLT-AGE001", name="Quiet Client", contract_value=1000.0,
+                        last_support_ticket=datetime.utcnow() - timedelta(days=90), owner_id=test_user.id)
+    db_session.add(client_obj)
+    db_session.commit()
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    
+    totals = refresh_recommendations.run(session_factory=session_factory)
+    
+    assert totals["inserted"] == 1
+    row = db_session.query(Recommendation).one()
+    assert row.meta_data["rule_id"] == "retention_inactive"
+    assert "90 days" in row.description
+    
+    # A day later the description reads differently, but the dismissal holds
+    row.status = "dismissed"
+    client_obj.last_support_ticket -= timedelta(days=1)
+    db_session.commit()
+    totals = refresh_recommendations.run(session_factory=session_factory)
+    
+    assert totals == {"inserted": 0, "updated": 0, "unchanged": 1, "removed": 0}
+    assert db_session.query(Recommendation).one().status == "dismissed"
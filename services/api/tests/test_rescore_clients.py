@@ -0,0 +1,97 @@
+"""
+Tests for the batch rescoring job
+"""
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sqlalchemy.orm import sessionmaker
+
+
+def test_rescore_writes_back_changed_clients(db_session, test_user, tmp_path, monkeypatch):
+    """Test the job rescores clients and skips unchanged ones on the next run"""
+    import rescore_clients
+    from models.models import Client
+    
+    # Keep the demo churn model ChurnPredictor publishes out of the repo
+    monkeypatch.setenv("MODEL_REGISTRY_DIR", str(tmp_path))
+    
+    clients = []
+    for i in range(5):
+        client_obj = Client(
+            client_id=f"CLT-RESCORE{i:03d}",
+            name=f"Rescore Client {i}",
+            contract_value=24000.0,
+            monthly_spend=2000.0,
+            total_licenses=100,
+            total_users=20 * (i + 1),
+            owner_id=test_user.id
+        )
+        db_session.add(client_obj)
+        clients.append(client_obj)
+    db_session.commit()
+    updated_at = {c.id: c.updated_at for c in clients}
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    
+    job_run = rescore_clients.run(chunk_size=2, session_factory=session_factory)
+    assert job_run.processed_count == 5
+    
+    db_session.expire_all()
+    for client_obj in clients:
+        assert client_obj.health_score is not None
+        assert 0 <= client_obj.churn_probability <= 1
+        assert client_obj.churn_risk in ("low", "medium", "high")
+        assert client_obj.updated_at == updated_at[client_obj.id]
+    
+    # Only the client changed since the last run is rescored
+    clients[0].total_users = 5
+    db_session.commit()
+    job_run = rescore_clients.run(chunk_size=2, session_factory=session_factory)
+    assert job_run.processed_count == 1
+
+
+def test_rescore_skips_clients_edited_meanwhile_and_picks_up_new_metrics(db_session, test_user, tmp_path, monkeypatch):
+    """Test a concurrent edit isn't overwritten, and a new support metric counts as a change"""
+    import rescore_clients
+    from models.models import Client, ClientMetric
+    
+    monkeypatch.setenv("MODEL_REGISTRY_DIR", str(tmp_path))
+    
+    clients = [
+        Client(client_id=f"CLT-RACE{i:03d}", name=f"Race Client {i}", contract_value=24000.0,
+               total_licenses=100, total_users=50, owner_id=test_user.id)
+        for i in range(2)
+    ]
+    db_session.add_all(clients)
+    db_session.commit()
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    
+    # The API edits client 0 after the job read it
+    score_chunk = rescore_clients.score_chunk
+    
+    def edit_then_score(db, chunk):
+        params = score_chunk(db, chunk)
+        clients[0].total_users = 90
+        clients[0].health_score = 12.0
+        db_session.commit()
+        return params
+    
+    monkeypatch.setattr(rescore_clients, "score_chunk", edit_then_score)
+    rescore_clients.run(session_factory=session_factory)
+    monkeypatch.setattr(rescore_clients, "score_chunk", score_chunk)
+    
+    db_session.expire_all()
+    edited_at = clients[0].updated_at
+    assert clients[0].health_score == 12.0
+    assert clients[0].churn_probability is None
+    assert clients[1].churn_probability is not None
+    
+    # The edited client is rescored next; a new metric marks client 1 changed
+    db_session.add(ClientMetric(client_id=clients[1].id, metric_type="support_tickets", value=20))
+    db_session.commit()
+    job_run = rescore_clients.run(session_factory=session_factory)
+    
+    db_session.expire_all()
+    assert job_run.processed_count == 2
+    assert clients[0].churn_probability is not None
+    assert clients[0].updated_at == edited_at
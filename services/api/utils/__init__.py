@@ -0,0 +1,15 @@
+"""
+Initialize utils package
+"""
+
+from .batch import batch_lookup
+from .projection import parse_fields, select_fields, fields_response
+from .search import ranked_search, ensure_search_indexes
+from .scoring import HealthScoringService, health_scoring_service, load_ml_module
+
+__all__ = [
+    'batch_lookup',
+    'parse_fields', 'select_fields', 'fields_response',
+    'ranked_search', 'ensure_search_indexes',
+    'HealthScoringService', 'health_scoring_service', 'load_ml_module'
+]
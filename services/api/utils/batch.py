@@ -0,0 +1,61 @@
+"""
+Batch lookup helpers
+Resolve many ids with a single IN query and keep the caller's order
+"""
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_
+
+from config import settings
+
+
+def batch_lookup(query, model, ids, key_column=None):
+    """
+    Fetch many rows in one query and return them in request order
+    
+    Args:
+        query: Base query, already scoped to the current tenant
+        model: Mapped class being looked up (matched on ``model.id``)
+        ids (list): Integer primary keys and/or string keys
+        key_column: Optional string column (e.g. ``Client.client_id``)
+            used to resolve string ids
+        
+    Returns:
+        list: One ``{"id", "found", "data"}`` entry per requested id
+    """
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one id is required"
+        )
+    
+    if len(ids) > settings.BATCH_LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids. Maximum is {settings.BATCH_LOOKUP_MAX_IDS} per request."
+        )
+    
+    int_ids = {i for i in ids if isinstance(i, int)}
+    str_ids = {i for i in ids if isinstance(i, str)}
+    
+    conditions = []
+    if int_ids:
+        conditions.append(model.id.in_(int_ids))
+    if str_ids and key_column is not None:
+        conditions.append(key_column.in_(str_ids))
+    
+    rows = query.filter(or_(*conditions)).all() if conditions else []
+    
+    by_id = {row.id: row for row in rows}
+    by_key = {getattr(row, key_column.key): row for row in rows} if key_column is not None else {}
+    
+    results = []
+    for requested in ids:
+        row = by_id.get(requested) if isinstance(requested, int) else by_key.get(requested)
+        results.append({
+            "id": requested,
+            "found": row is not None,
+            "data": row
+        })
+    
+    return results
@@ -0,0 +1,58 @@
+"""
+Software categories
+Infers SoftwareLicense.category from the name with the ML service's keyword catalog
+"""
+
+import logging
+import threading
+
+from sqlalchemy import event, inspect
+
+from models.models import SoftwareLicense
+from utils.scoring import load_ml_module
+
+logger = logging.getLogger(__name__)
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def software_catalog():
+    """Keyword catalog used to infer SoftwareLicense.category, compiled once"""
+    global _catalog
+    with _lock:
+        if _catalog is None:
+            _catalog = load_ml_module("software_catalog").SoftwareCatalog()
+        return _catalog
+
+
+def infer_category(software_name):
+    """
+    Category for a software name, or None
+
+    The catalog is loaded from the ML service's tree, which a deployment
+    may not ship. A failure is logged and the category left empty instead
+    of failing the write.
+    """
+    try:
+        return software_catalog().categorize(software_name)
+    except Exception:
+        logger.exception("Software catalog unavailable; category not inferred")
+        return None
+
+
+@event.listens_for(SoftwareLicense, "before_update")
+def _reinfer_category(mapper, connection, target):
+    """
+    Re-infer the category when software_name changes on any write path
+
+    A category that was set by hand (it differs from what the old name
+    infers) or changed in the same write is kept.
+    """
+    attrs = inspect(target).attrs
+    name, category = attrs.software_name.history, attrs.category.history
+    if not name.has_changes() or category.has_changes():
+        return
+    old_name = name.deleted[0] if name.deleted else None
+    if target.category is None or target.category == infer_category(old_name):
+        target.category = infer_category(target.software_name)
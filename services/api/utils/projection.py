@@ -0,0 +1,44 @@
+"""
+Sparse fieldset helpers
+Project list endpoints down to the columns named in ``?fields=``
+"""
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def parse_fields(fields, schema):
+    """
+    Parse and validate a comma-separated ``fields`` query parameter
+    
+    Args:
+        fields (str): Raw query value, e.g. ``"id,name,health_score"``
+        schema: Pydantic response model the fields must belong to
+        
+    Returns:
+        list: Requested field names in order, or None for all fields
+    """
+    if not fields:
+        return None
+    
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+    unknown = [f for f in requested if f not in schema.model_fields]
+    
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(schema.model_fields)}"
+        )
+    
+    return requested
+
+
+def select_fields(query, model, field_names):
+    """Restrict a query to the given columns so only they are loaded"""
+    return query.with_entities(*[getattr(model, f) for f in field_names])
+
+
+def fields_response(rows):
+    """Serialize projected rows, bypassing the full response model"""
+    return JSONResponse(content=jsonable_encoder([dict(row._mapping) for row in rows]))
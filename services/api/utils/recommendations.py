@@ -0,0 +1,309 @@
+"""
+Incremental recommendations
+Re-evaluates only the rules a client or license change affects and upserts the stored rows
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import func
+
+from models.models import ClientMetric, Recommendation
+from utils.scoring import load_ml_module
+
+logger = logging.getLogger(__name__)
+
+# Rule input -> Client columns (or client metrics) it is built from
+CLIENT_RULE_INPUTS = {
+    'name': ('name',),
+    'client_id': ('client_id',),
+    'health_score': ('health_score',),
+    'contract_value': ('contract_value',),
+    'monthly_spend': ('monthly_spend',),
+    'license_utilization': ('total_users', 'total_licenses'),
+    'churn_risk': ('churn_risk',),
+    'days_since_contact': ('last_support_ticket',),
+    'support_tickets_per_month': ('support_tickets',),
+}
+
+# Rule inputs measured against the current time: they change without any
+# write, so every refresh re-evaluates the rules that read them
+TIME_BASED_INPUTS = {
+    'msp': {'days_since_contact'},
+    'it_admin': set(),
+}
+
+# Rule input -> SoftwareLicense columns it is built from
+LICENSE_RULE_INPUTS = {
+    name: (name,) for name in (
+        'id', 'software_name', 'vendor', 'utilization_percent', 'total_licenses',
+        'active_users', 'monthly_cost', 'annual_cost', 'renewal_date'
+    )
+}
+
+
+def client_rule_inputs(client, metrics=None, now=None):
+    """
+    Build recommendation rule inputs from a Client row
+
+    Days since contact are measured at ``now`` (the current time by
+    default), so they grow while the client is untouched. Missing values
+    fall back to the rule file's defaults.
+    """
+    metrics = metrics or {}
+    as_of = now or datetime.utcnow()
+
+    data = {
+        'client_id': client.client_id,
+        'name': client.name,
+        'health_score': client.health_score,
+        'contract_value': client.contract_value,
+        'monthly_spend': client.monthly_spend,
+        'churn_risk': client.churn_risk,
+        'support_tickets_per_month': metrics.get('support_tickets'),
+    }
+    if client.total_licenses and client.total_users is not None:
+        data['license_utilization'] = client.total_users / client.total_licenses * 100
+    if client.last_support_ticket:
+        data['days_since_contact'] = max((as_of - client.last_support_ticket).days, 0)
+
+    return {k: v for k, v in data.items() if v is not None}
+
+
+def license_rule_inputs(license):
+    """Build recommendation rule inputs from a SoftwareLicense row"""
+    data = {name: getattr(license, name) for name in LICENSE_RULE_INPUTS}
+    if data['renewal_date'] is not None:
+        data['renewal_date'] = data['renewal_date'].isoformat()
+    return {k: v for k, v in data.items() if v is not None}
+
+
+def content_hash(recommendation, fields=('rule_id', 'type', 'title', 'description', 'priority')):
+    """Stable hash of what a recommendation says, to skip rewriting identical ones"""
+    content = {key: recommendation.get(key) for key in fields}
+    content['potential_value'] = round(float(recommendation.get('potential_value') or 0), 2)
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class RecommendationService:
+    """
+    Keeps stored recommendations in step with clients and licenses
+
+    Each stored row is keyed by owner, entity and the rule that made it
+    (``meta_data``: ``entity``, ``rule_id``, ``content_hash``). When an
+    entity changes, only the rules that read a changed field are evaluated
+    for it. A result whose content hash is already stored (in any status,
+    so dismissed recommendations stay dismissed) is skipped, changed pending
+    rows are updated in place, new ones are inserted, and pending rows a
+    rule no longer makes are removed, all in bulk. Stored rows are looked
+    up by their ``meta_data`` entity, so a refresh reads only the rows of
+    the entities it refreshes.
+
+    Rules that read a time-based input (TIME_BASED_INPUTS) are evaluated on
+    every refresh, and refresh_recommendations.py re-evaluates every client
+    on a schedule, so they also fire for clients nobody touches. Their
+    descriptions change as time passes, so a dismissed or implemented row
+    suppresses them when everything but the description matches
+    (``stable_hash``).
+    """
+
+    ROLES = {
+        'msp': ('client', CLIENT_RULE_INPUTS),
+        'it_admin': ('software', LICENSE_RULE_INPUTS),
+    }
+    QUERY_CHUNK = 500
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        with self._lock:
+            if self._engine is None:
+                module = load_ml_module("recommendation_engine")
+                self._engine = module.RecommendationEngine()
+            return self._engine
+
+    def changed_inputs(self, role, columns):
+        """
+        Rule inputs affected by changed model columns (None means all)
+
+        Time-based inputs are always included.
+        """
+        if columns is None:
+            return None
+        columns = set(columns)
+        _, inputs = self.ROLES[role]
+        return {name for name, sources in inputs.items() if columns & set(sources)} | TIME_BASED_INPUTS[role]
+
+    def refresh_clients(self, db, owner_id, clients, changed=None):
+        """
+        Re-evaluate recommendations for MSP clients
+
+        Args:
+            db: Database session
+            owner_id (int): MSP user the recommendations belong to
+            clients (list): Client rows
+            changed: Client columns (or metric types) that changed; None
+                re-evaluates every rule
+
+        Returns:
+            dict: Counts of inserted, updated, unchanged and removed rows
+        """
+        metrics = self._latest_metrics(db, [c.id for c in clients])
+        records = [client_rule_inputs(c, metrics.get(c.id)) for c in clients]
+        return self._refresh(db, owner_id, 'msp', [c.id for c in clients], records, changed)
+
+    def refresh_licenses(self, db, owner_id, licenses, changed=None):
+        """Re-evaluate recommendations for software licenses (see refresh_clients)"""
+        records = [license_rule_inputs(license) for license in licenses]
+        return self._refresh(db, owner_id, 'it_admin', [license.id for license in licenses], records, changed)
+
+    def remove_entities(self, db, owner_id, role, ids):
+        """
+        Delete every stored recommendation, in any status, for deleted entities
+
+        Runs in the caller's transaction; the caller commits.
+
+        Returns:
+            int: Rows deleted
+        """
+        kind, _ = self.ROLES[role]
+        entities = [f"{kind}:{entity_id}" for entity_id in ids]
+        entity_key = Recommendation.meta_data["entity"].as_string()
+        removed = 0
+        for start in range(0, len(entities), self.QUERY_CHUNK):
+            removed += db.query(Recommendation).filter(
+                Recommendation.owner_id == owner_id,
+                entity_key.in_(entities[start:start + self.QUERY_CHUNK])
+            ).delete(synchronize_session=False)
+        return removed
+
+    def _refresh(self, db, owner_id, role, ids, records, changed):
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        rule_ids = self.engine.affected_rules(role, self.changed_inputs(role, changed))
+        if not ids or not rule_ids:
+            return counts
+        # Rules whose text changes as time passes
+        time_based = TIME_BASED_INPUTS[role]
+        aging = set(self.engine.affected_rules(role, time_based)) if time_based else set()
+
+        kind, _ = self.ROLES[role]
+        entities = [f"{kind}:{entity_id}" for entity_id in ids]
+
+        # Only the refreshed entities' rows, matched on their meta_data keys
+        # in SQL; chunked to stay under bound parameter limits
+        existing = {}
+        entity_key = Recommendation.meta_data["entity"].as_string()
+        rule_key = Recommendation.meta_data["rule_id"].as_string()
+        for start in range(0, len(entities), self.QUERY_CHUNK):
+            rows = db.query(Recommendation).filter(
+                Recommendation.owner_id == owner_id,
+                entity_key.in_(entities[start:start + self.QUERY_CHUNK]),
+                rule_key.in_(sorted(rule_ids))
+            ).all()
+            for row in rows:
+                existing.setdefault((row.meta_data['entity'], row.meta_data['rule_id']), []).append(row)
+
+        results = {
+            (entity, recommendation['rule_id']): recommendation
+            for entity, made in zip(entities, self.engine.evaluate(role, records, rule_ids))
+            for recommendation in made
+        }
+
+        inserts, updates, removed = [], [], []
+        for key in [(entity, rule_id) for entity in entities for rule_id in rule_ids]:
+            stored = existing.get(key, [])
+            recommendation = results.get(key)
+            pending = [row for row in stored if row.status == 'pending']
+
+            if recommendation is None:
+                removed.extend(row.id for row in pending)
+                continue
+
+            digest = content_hash(recommendation)
+            stable = digest
+            if key[1] in aging:
+                stable = content_hash(recommendation, ('rule_id', 'type', 'title', 'priority'))
+            current = [row for row in pending if row.meta_data.get('content_hash') == digest]
+            if current:
+                counts["unchanged"] += 1
+                removed.extend(row.id for row in pending if row is not current[0])
+                continue
+            if any(stable in (row.meta_data.get('content_hash'), row.meta_data.get('stable_hash'))
+                   for row in stored if row.status != 'pending'):
+                # Already dismissed or implemented as it reads now: drop
+                # outdated pending copies instead of reviving it
+                counts["unchanged"] += 1
+                removed.extend(row.id for row in pending)
+                continue
+
+            values = {
+                "recommendation_type": recommendation['type'],
+                "title": recommendation['title'],
+                "description": recommendation['description'],
+                "potential_value": float(recommendation['potential_value']),
+                "priority": recommendation['priority'],
+                "meta_data": self._meta(recommendation, key, digest, stable),
+            }
+            if pending:
+                updates.append(dict(values, id=pending[0].id))
+                removed.extend(row.id for row in pending[1:])
+            else:
+                inserts.append(dict(values, status='pending', owner_id=owner_id))
+
+        if inserts:
+            db.bulk_insert_mappings(Recommendation, inserts)
+        if updates:
+            db.bulk_update_mappings(Recommendation, updates)
+        if removed:
+            db.query(Recommendation).filter(Recommendation.id.in_(removed)).delete(synchronize_session=False)
+        db.commit()
+
+        counts.update(inserted=len(inserts), updated=len(updates), removed=len(removed))
+        return counts
+
+    def _meta(self, recommendation, key, digest, stable):
+        entity, rule_id = key
+        reference = {k: v for k, v in recommendation.items()
+                     if k not in ('type', 'title', 'description', 'potential_value', 'priority', 'rule_id')}
+        return dict(reference, entity=entity, rule_id=rule_id, content_hash=digest, stable_hash=stable)
+
+    def _latest_metrics(self, db, client_ids):
+        """Latest support ticket count per client, in one query"""
+        if not client_ids:
+            return {}
+        latest = db.query(
+            ClientMetric.client_id, func.max(ClientMetric.id).label("id")
+        ).filter(
+            ClientMetric.client_id.in_(client_ids),
+            ClientMetric.metric_type == "support_tickets"
+        ).group_by(ClientMetric.client_id).subquery()
+        rows = db.query(ClientMetric).join(latest, ClientMetric.id == latest.c.id).all()
+        return {row.client_id: {row.metric_type: row.value} for row in rows}
+
+
+recommendation_service = RecommendationService()
+
+
+def refresh_quietly(refresh, db, *args, **kwargs):
+    """
+    Run a recommendation refresh after a client or license write
+
+    The write is already committed, and the refresh loads the ML service's
+    rule engine in-process, which a deployment may not ship. A failure is
+    logged and rolled back instead of failing the write.
+
+    Returns:
+        dict: The refresh counts, or None if it failed
+    """
+    try:
+        return refresh(db, *args, **kwargs)
+    except Exception:
+        db.rollback()
+        logger.exception("Recommendation refresh failed; stored recommendations may be stale")
+        return None
@@ -0,0 +1,171 @@
+"""
+In-process health scoring
+Runs the ML service's HealthScoreCalculator inside the API with a per-client cache
+"""
+
+import importlib
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+
+from sqlalchemy import desc
+
+from config import settings
+from models.models import ClientMetric
+
+HEALTH_SCORE_METRIC = "health_score"
+# ClientMetric types the health score reads
+SCORED_METRICS = ("support_tickets", "satisfaction")
+ML_PACKAGE = "pulseops_ml"
+
+
+def load_ml_module(name):
+    """
+    Load a module from the ML service's ``models`` package
+
+    The API has its own ``models`` package, so the ML one is mounted as the
+    ``pulseops_ml`` namespace instead. Its ``__init__`` is not executed, so
+    only the requested module and its own imports are loaded.
+    """
+    if ML_PACKAGE not in sys.modules:
+        package = types.ModuleType(ML_PACKAGE)
+        package.__path__ = [os.path.join(settings.ML_SERVICE_PATH, "models")]
+        sys.modules[ML_PACKAGE] = package
+
+    return importlib.import_module(f"{ML_PACKAGE}.{name}")
+
+
+def client_health_inputs(client, metrics=None):
+    """
+    Build HealthScoreCalculator inputs from a Client row
+
+    Ages are measured at ``client.updated_at`` so a given client version
+    always scores the same. Missing values fall back to the calculator's
+    defaults.
+    """
+    metrics = metrics or {}
+    as_of = client.updated_at or client.created_at
+
+    data = {
+        'contract_value': client.contract_value,
+        'monthly_spend': client.monthly_spend,
+        'total_licenses': client.total_licenses,
+        'total_users': client.total_users,
+        'support_tickets_per_month': metrics.get('support_tickets'),
+        'support_satisfaction': metrics.get('satisfaction'),
+    }
+    if client.created_at and as_of:
+        data['contract_age_days'] = max((as_of - client.created_at).days, 0)
+    if client.last_support_ticket and as_of:
+        data['days_since_last_contact'] = max((as_of - client.last_support_ticket).days, 0)
+
+    return {k: v for k, v in data.items() if v is not None}
+
+
+class HealthScoringService:
+    """
+    Scores clients in-process and caches breakdowns by client version
+
+    A client's version is its ``updated_at`` plus its latest support
+    metric, since metrics are recorded without touching the client row.
+    When a client changes, only the health factors whose inputs changed are
+    recomputed (see the ML service's IncrementalHealthScorer). Reading a
+    breakdown never writes: score history is recorded by the rescoring job
+    (rescore_clients.py).
+    """
+
+    def __init__(self, cache_size=None):
+        self.cache_size = cache_size or settings.HEALTH_SCORE_CACHE_SIZE
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._scorer = None
+
+    @property
+    def scorer(self):
+        if self._scorer is None:
+            module = load_ml_module("incremental_health_scorer")
+            self._scorer = module.IncrementalHealthScorer(cache_size=self.cache_size)
+        return self._scorer
+
+    @property
+    def calculator(self):
+        return self.scorer.calculator
+
+    def get_breakdown(self, db, client):
+        """
+        Get the health score breakdown for a client
+
+        Args:
+            db: Database session, used for metrics and score history
+            client (Client): Client row
+
+        Returns:
+            dict: HealthScoreCalculator result
+        """
+        metrics = self._latest_metrics(db, client)
+        version = (client.updated_at, max((row.id for row in metrics.values()), default=None))
+
+        with self._lock:
+            cached = self._cache.get(client.id)
+            if cached and cached[0] == version:
+                self._cache.move_to_end(client.id)
+                return cached[1]
+
+        result = self._score(db, client, metrics)
+
+        with self._lock:
+            self._cache[client.id] = (version, result)
+            self._cache.move_to_end(client.id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def invalidate(self, client_id=None):
+        """Drop one client's cached breakdown and factor scores, or all of them"""
+        with self._lock:
+            if client_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(client_id, None)
+        self.scorer.invalidate(client_id)
+
+    def stats(self):
+        """Factor cache hit rates (see IncrementalHealthScorer.stats)"""
+        return self.scorer.stats()
+
+    def _latest_metrics(self, db, client):
+        """Latest row of each scored metric type"""
+        rows = db.query(ClientMetric).filter(
+            ClientMetric.client_id == client.id,
+            ClientMetric.metric_type.in_(SCORED_METRICS)
+        ).order_by(ClientMetric.timestamp).all()
+        return {row.metric_type: row for row in rows}
+
+    def _score(self, db, client, metrics):
+        history = db.query(ClientMetric).filter(
+            ClientMetric.client_id == client.id,
+            ClientMetric.metric_type == HEALTH_SCORE_METRIC
+        ).order_by(desc(ClientMetric.timestamp), desc(ClientMetric.id)).limit(2).all()
+
+        # A row newer than the client's last update and its latest metric
+        # already scores this version, so the previous score is the one before
+        changed_at = [t for t in [client.updated_at] + [row.timestamp for row in metrics.values()] if t is not None]
+        already_scored = bool(history) and bool(changed_at) and history[0].timestamp >= max(changed_at)
+        if already_scored:
+            previous = history[1] if len(history) > 1 else None
+        else:
+            previous = history[0] if history else None
+
+        data = client_health_inputs(client, {metric_type: row.value for metric_type, row in metrics.items()})
+        if previous is not None:
+            data['previous_health_score'] = previous.value
+
+        result = self.scorer.calculate(client.id, data)
+        result["previous_score"] = previous.value if previous is not None else None
+        return result
+
+
+health_scoring_service = HealthScoringService()
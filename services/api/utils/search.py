@@ -0,0 +1,171 @@
+"""
+Full-text and prefix search
+FTS5 on SQLite, tsvector + pg_trgm on PostgreSQL
+"""
+
+import re
+
+from sqlalchemy import event, text, or_
+
+from models.models import Client, SoftwareLicense
+
+# Searchable columns per table
+SEARCH_COLUMNS = {
+    Client.__tablename__: ['name', 'industry', 'contact', 'email'],
+    SoftwareLicense.__tablename__: ['software_name', 'vendor', 'category'],
+}
+
+# Column used for trigram (typo-tolerant) matching on PostgreSQL
+TRIGRAM_COLUMN = {
+    Client.__tablename__: 'name',
+    SoftwareLicense.__tablename__: 'software_name',
+}
+
+MAX_SEARCH_RESULTS = 100
+
+
+def _tsvector(table):
+    """tsvector expression shared by the GIN index and the search query"""
+    columns = " || ' ' || ".join(f"coalesce({table}.{c}, '')" for c in SEARCH_COLUMNS[table])
+    return f"to_tsvector('simple', {columns})"
+
+
+def _sqlite_ddl(table):
+    """FTS5 external-content table kept in sync by triggers"""
+    columns = SEARCH_COLUMNS[table]
+    names = ', '.join(columns)
+    new_values = ', '.join(f"new.{c}" for c in columns)
+    old_values = ', '.join(f"old.{c}" for c in columns)
+    fts = f"{table}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _postgresql_ddl(table):
+    """GIN indexes for full-text and trigram matching"""
+    trigram = TRIGRAM_COLUMN[table]
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_tsv ON {table} USING GIN ({_tsvector(table)})",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_{trigram}_trgm ON {table} USING GIN ({trigram} gin_trgm_ops)",
+    ]
+
+
+def _create_search_index(target, connection, **kw):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statements = _sqlite_ddl(target.name)
+    elif dialect == 'postgresql':
+        statements = _postgresql_ddl(target.name)
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f"DROP TABLE IF EXISTS {target.name}_fts"))
+
+
+for _model in (Client, SoftwareLicense):
+    event.listen(_model.__table__, 'after_create', _create_search_index)
+    event.listen(_model.__table__, 'before_drop', _drop_search_index)
+
+
+_ready_binds = set()
+
+
+def ensure_search_indexes(bind):
+    """Create search indexes for tables that existed before this module"""
+    key = str(bind.url)
+    if key in _ready_binds:
+        return
+    with bind.begin() as connection:
+        if connection.dialect.name == 'sqlite':
+            existing = {
+                row[0] for row in connection.execute(
+                    text("SELECT name FROM sqlite_master WHERE type = 'table'")
+                )
+            }
+            for model in (Client, SoftwareLicense):
+                if f"{model.__tablename__}_fts" not in existing:
+                    _create_search_index(model.__table__, connection)
+        else:
+            for model in (Client, SoftwareLicense):
+                _create_search_index(model.__table__, connection)
+    _ready_binds.add(key)
+
+
+def _tokens(term):
+    return re.findall(r"\w+", term or '')
+
+
+def ranked_search(db, model, term, owner_id, limit=20):
+    """
+    Ranked prefix search over the model's searchable columns
+
+    Args:
+        db: Database session
+        model: Client or SoftwareLicense
+        term (str): User query; every word is matched as a prefix
+        owner_id (int): Tenant scope
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Matching rows ordered by relevance
+    """
+    tokens = _tokens(term)
+    if not tokens:
+        return []
+
+    limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+    table = model.__tablename__
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == 'sqlite':
+        ensure_search_indexes(bind)
+        match = ' '.join('"{}"*'.format(t.replace('"', '""')) for t in tokens)
+        statement = text(
+            f"SELECT {table}.* FROM {table}_fts "
+            f"JOIN {table} ON {table}.id = {table}_fts.rowid "
+            f"WHERE {table}_fts MATCH :match AND {table}.owner_id = :owner_id "
+            f"ORDER BY bm25({table}_fts) LIMIT :limit"
+        )
+        params = {'match': match, 'owner_id': owner_id, 'limit': limit}
+    elif dialect == 'postgresql':
+        ensure_search_indexes(bind)
+        trigram = TRIGRAM_COLUMN[table]
+        statement = text(
+            f"SELECT {table}.* FROM {table}, to_tsquery('simple', :tsquery) AS query "
+            f"WHERE {table}.owner_id = :owner_id "
+            f"AND ({_tsvector(table)} @@ query OR {table}.{trigram} % :term) "
+            f"ORDER BY ts_rank({_tsvector(table)}, query) DESC, "
+            f"similarity({table}.{trigram}, :term) DESC LIMIT :limit"
+        )
+        params = {
+            'tsquery': ' & '.join(f"{t}:*" for t in tokens),
+            'term': term,
+            'owner_id': owner_id,
+            'limit': limit
+        }
+    else:
+        # No index support; fall back to a substring scan
+        columns = [getattr(model, c) for c in SEARCH_COLUMNS[table]]
+        query = db.query(model).filter(model.owner_id == owner_id)
+        for token in tokens:
+            query = query.filter(or_(*[c.ilike(f"%{token}%") for c in columns]))
+        return query.limit(limit).all()
+
+    return db.query(model).from_statement(statement).params(**params).all()
@@ -0,0 +1,59 @@
+"""
+Churn batch prediction benchmark
+Compares per-client /api/predict/churn calls with /api/predict/churn/batch
+
+Run from services/ml:
+    python benchmarks/bench_churn_batch.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+
+
+def make_clients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "client_id": f"CLT-{i:06d}",
+            "contract_value": float(rng.uniform(5000, 100000)),
+            "monthly_spend": float(rng.uniform(500, 10000)),
+            "total_licenses": int(rng.integers(10, 500)),
+            "total_users": int(rng.integers(10, 1000)),
+            "support_ticket_frequency": float(rng.uniform(0, 1)),
+            "payment_history_score": float(rng.uniform(0.5, 1.0)),
+            "engagement_score": float(rng.uniform(0.2, 1.0)),
+        }
+        for i in range(n)
+    ]
+
+
+def bench(batch_size, single_limit=1000):
+    client = app.test_client()
+    clients = make_clients(batch_size)
+
+    # Per-client calls (capped and extrapolated for large batches)
+    sample = clients[:single_limit]
+    start = time.perf_counter()
+    for c in sample:
+        client.post('/api/predict/churn', json=c)
+    single = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    response = client.post('/api/predict/churn/batch', json={"clients": clients})
+    batch = time.perf_counter() - start
+    assert response.status_code == 200, response.get_json()
+
+    print(f"{batch_size:>6} clients | single: {1 / single:>9.0f} clients/s | "
+          f"batch: {batch_size / batch:>9.0f} clients/s | speedup {single * batch_size / batch:>6.1f}x")
+
+
+if __name__ == '__main__':
+    for size in (1, 100, 10000):
+        bench(size)
@@ -0,0 +1,60 @@
+"""
+Churn micro-batching benchmark
+p99 latency and throughput of per-request predict() vs MicroBatcher
+under concurrent load
+
+Run from services/ml:
+    python benchmarks/bench_churn_microbatch.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.churn_predictor import ChurnPredictor
+from utils.micro_batching import MicroBatcher
+
+REQUESTS_PER_THREAD = 200
+
+
+def run_load(score, concurrency):
+    latencies = [[] for _ in range(concurrency)]
+    features = {"contract_value": 25000, "monthly_spend": 1000, "engagement_score": 0.4}
+
+    def worker(i):
+        for _ in range(REQUESTS_PER_THREAD):
+            start = time.perf_counter()
+            score(features)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate(latencies) * 1000
+    return len(all_latencies) / elapsed, np.percentile(all_latencies, 50), np.percentile(all_latencies, 99)
+
+
+if __name__ == '__main__':
+    predictor = ChurnPredictor()
+
+    for window_ms, max_size in ((1, 32), (2, 64), (5, 128)):
+        batcher = MicroBatcher(predictor.predict_batch, max_batch_size=max_size, max_wait_ms=window_ms)
+        print(f"\nwindow={window_ms}ms max_batch={max_size}")
+        for concurrency in (1, 8, 32, 64):
+            direct = run_load(predictor.predict, concurrency)
+            batcher.stats.update(batches=0, items=0)
+            batched = run_load(batcher.submit, concurrency)
+            mean_batch = batcher.stats["items"] / max(batcher.stats["batches"], 1)
+            print(f"  {concurrency:>3} threads | direct: {direct[0]:>7.0f} req/s p50 {direct[1]:6.2f}ms "
+                  f"p99 {direct[2]:7.2f}ms | batched: {batched[0]:>7.0f} req/s p50 {batched[1]:6.2f}ms "
+                  f"p99 {batched[2]:7.2f}ms (mean batch {mean_batch:.1f})")
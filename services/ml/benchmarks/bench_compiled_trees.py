@@ -0,0 +1,87 @@
+"""
+Compiled churn model benchmark
+Compares sklearn predict_proba with the pure-NumPy CompiledTreeEnsemble,
+per call and from a cold process start
+
+Run from services/ml:
+    python benchmarks/bench_compiled_trees.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+from models.churn_predictor import ChurnPredictor
+from models.compiled_trees import CompiledTreeEnsemble
+from models.model_registry import ModelRegistry
+
+COLD_START = {
+    "sklearn": (
+        "import joblib, numpy as np\n"
+        "bundle = '{path}'\n"
+        "model, scaler = joblib.load(bundle + '/model.pkl'), joblib.load(bundle + '/scaler.pkl')\n"
+        "model.predict_proba(scaler.transform(np.ones((1, 9))))\n"
+    ),
+    "compiled": (
+        "import joblib, numpy as np\n"
+        "from models.compiled_trees import CompiledTreeEnsemble\n"
+        "bundle = '{path}'\n"
+        "CompiledTreeEnsemble(joblib.load(bundle + '/compiled.pkl')).predict_proba(np.ones((1, 9)))\n"
+    )
+}
+# Peak RSS of the new process image (ru_maxrss would include the parent's)
+RSS = "print(next(l for l in open('/proc/self/status') if l.startswith('VmHWM')).split()[1])\n"
+
+
+def time_call(fn, X, min_seconds=0.5):
+    runs, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn(X)
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+
+def cold_start(kind, path, runs=5):
+    script = COLD_START[kind].format(path=path) + RSS
+    times, rss = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", script], cwd=ML_DIR,
+                                capture_output=True, text=True, check=True)
+        times.append(time.perf_counter() - start)
+        rss.append(int(result.stdout.split()[-1]) / 1024)
+    return np.median(times) * 1000, np.median(rss)
+
+
+if __name__ == '__main__':
+    registry = ModelRegistry(tempfile.mkdtemp())
+    ChurnPredictor(registry=registry).model_version  # publishes the demo model
+    bundle = registry.load(ChurnPredictor.MODEL_NAME)
+    model, scaler = bundle['model'], bundle['scaler']
+    compiled = CompiledTreeEnsemble(bundle['compiled'])
+
+    def sklearn_proba(X):
+        return model.predict_proba(scaler.transform(X))
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(100000, 9)) * [1e4, 1e3, 100, 100, 50, 1, 1, 300, 1] + \
+        [5e4, 5e3, 200, 300, 100, 0.5, 0.8, 500, 0.6]
+    assert np.array_equal(sklearn_proba(X), compiled.predict_proba(X))
+
+    print("Per call:")
+    for n in (1, 100, 10000, 100000):
+        sk, cp = time_call(sklearn_proba, X[:n]), time_call(compiled.predict_proba, X[:n])
+        print(f"  {n:>6} rows | predict_proba {sk * 1000:8.3f} ms | "
+              f"compiled {cp * 1000:8.3f} ms | speedup {sk / cp:5.1f}x")
+
+    print("Cold start (new process: imports, model load, first prediction):")
+    for kind in ("sklearn", "compiled"):
+        ms, rss = cold_start(kind, bundle.version_dir)
+        print(f"  {kind:>8} | {ms:6.0f} ms | peak RSS {rss:5.0f} MB")
@@ -0,0 +1,54 @@
+"""
+Feature store benchmark
+Extracting client features vs reading them back from the memory and snapshot tiers
+
+Run from services/ml:
+    python benchmarks/bench_feature_store.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_feature_extraction import make_clients, timed
+from models.feature_store import FeatureStore
+from utils.feature_engineering import CLIENT_FEATURE_COLUMNS, FeatureEngineer
+
+N_CLIENTS = 200000
+
+
+if __name__ == '__main__':
+    engineer = FeatureEngineer()
+    clients = make_clients(N_CLIENTS)
+    records = clients.to_dict('records')
+    ids = [f'client-{i}' for i in range(N_CLIENTS)]
+    versions = np.full(N_CLIENTS, time.time_ns(), dtype=np.int64)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = FeatureStore('client', CLIENT_FEATURE_COLUMNS, root=root, cache_size=N_CLIENTS)
+        extract, features = timed(lambda: engineer.extract_client_features_batch(records))
+        put, _ = timed(lambda: store.put_many(ids, versions, features))
+        memory, _ = timed(lambda: store.get_many(ids, versions))
+        write, _ = timed(store.snapshot)
+
+        # A fresh worker: empty memory tier, snapshot mapped from disk
+        worker = FeatureStore('client', CLIENT_FEATURE_COLUMNS, root=root)
+        mapped, (values, found) = timed(lambda: worker.get_many(ids, versions))
+        assert found.all() and np.array_equal(values, features.to_numpy())
+
+        rows = [
+            ("extract, list of dicts", extract),
+            ("put_many", put),
+            ("get_many, memory tier", memory),
+            ("snapshot write", write),
+            ("get_many, mapped snapshot", mapped),
+        ]
+
+    print(f"{N_CLIENTS} clients, {len(CLIENT_FEATURE_COLUMNS)} features")
+    for label, seconds in rows:
+        print(f"  {label:26s} | {seconds:7.3f} s")
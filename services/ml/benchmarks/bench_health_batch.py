@@ -0,0 +1,65 @@
+"""
+Health score benchmark
+calculate() per client vs calculate_batch() over 1M clients
+
+Run from services/ml:
+    python benchmarks/bench_health_batch.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.health_score_calculator import HealthScoreCalculator
+
+N_CLIENTS = 1000000
+N_SCALAR = 20000
+
+
+def make_clients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'on_time_payments': rng.uniform(0.5, 1.0, n),
+        'payment_history_months': rng.integers(0, 48, n),
+        'support_tickets_per_month': rng.integers(0, 12, n),
+        'avg_resolution_time_days': rng.uniform(0, 10, n),
+        'support_satisfaction': rng.uniform(0.3, 1.0, n),
+        'total_licenses': rng.integers(1, 500, n),
+        'total_users': rng.integers(0, 500, n),
+        'contract_age_days': rng.integers(0, 1500, n),
+        'contract_value': rng.uniform(1000, 100000, n),
+        'monthly_spend': rng.uniform(100, 10000, n),
+        'features_used': rng.integers(0, 15, n),
+        'features_available': np.full(n, 15),
+        'days_since_last_contact': rng.integers(0, 120, n)
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    calculator = HealthScoreCalculator()
+    clients = make_clients(N_CLIENTS)
+    records = clients.head(N_SCALAR).to_dict('records')
+    columns = {name: clients[name].to_numpy() for name in clients}
+
+    scalar, _ = timed(lambda: [calculator.calculate(r) for r in records])
+    scalar *= N_CLIENTS / N_SCALAR
+    from_frame, result = timed(lambda: calculator.calculate_batch(clients))
+    from_columns, _ = timed(lambda: calculator.calculate_batch(columns))
+
+    print(f"{N_CLIENTS} clients")
+    print(f"  calculate() per client     | {scalar:7.2f} s (extrapolated)")
+    print(f"  calculate_batch, DataFrame | {from_frame:7.2f} s")
+    print(f"  calculate_batch, columns   | {from_columns:7.2f} s")
+    print(f"  mean score {result['overall_score'].mean():.1f}, "
+          f"{int((result['health_status'] == 'at_risk').sum())} at risk")
@@ -0,0 +1,53 @@
+"""
+Time series feature benchmark
+create_time_series_features per series vs the batch version over monthly histories
+
+Run from services/ml:
+    python benchmarks/bench_time_series_features.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.feature_engineering import FeatureEngineer
+
+N_SERIES = 200000
+N_MONTHS = 36
+N_SCALAR = 20000
+
+
+def make_series(n, seed=0):
+    """Monthly costs with a trend, padded with NaN after each history's length"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, N_MONTHS + 1, n)
+    values = rng.uniform(100, 10000, (n, 1)) * (1 + rng.normal(0.01, 0.05, (n, N_MONTHS)).cumsum(axis=1))
+    values[np.arange(N_MONTHS) >= lengths[:, None]] = np.nan
+    return values, lengths
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    engineer = FeatureEngineer()
+    values, lengths = make_series(N_SERIES)
+    ragged = [row[:length].tolist() for row, length in zip(values, lengths)]
+
+    scalar, _ = timed(lambda: [engineer.create_time_series_features(s) for s in ragged[:N_SCALAR]])
+    rows = [
+        ("per series", scalar * N_SERIES / N_SCALAR),
+        ("batch, padded array", timed(lambda: engineer.create_time_series_features_batch(values))[0]),
+        ("batch, list of lists", timed(lambda: engineer.create_time_series_features_batch(ragged))[0]),
+    ]
+
+    print(f"{N_SERIES} series, up to {N_MONTHS} values")
+    for label, seconds in rows:
+        print(f"  {label:22s} | {seconds:7.2f} s")
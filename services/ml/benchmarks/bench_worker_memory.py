@@ -0,0 +1,113 @@
+"""
+Worker memory benchmark
+Per-worker memory of N forked ML service workers when each worker loads
+its own models vs. sharing memory-mapped artifacts loaded before fork
+(what gunicorn.conf.py does)
+
+Run from services/ml (Linux only, reads /proc/<pid>/smaps_rollup):
+    python benchmarks/bench_worker_memory.py [--workers 4]
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+
+MODES = {
+    # name: (models memory-mapped, app imported and loaded before fork)
+    "per-worker load": (False, False),
+    "per-worker mmap": (True, False),
+    "pre-fork load": (False, True),
+    "pre-fork + mmap": (True, True)
+}
+REQUESTS = 200
+
+
+def memory_kb():
+    """Rss, Pss and private (unshared) memory of this process in kB"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"]
+    }
+
+
+def load_app():
+    import main
+    main.churn_predictor.model_version
+    main.churn_predictor.model  # the sklearn artifacts too, as before compilation
+    return main.app
+
+
+def serve(app):
+    client = app.test_client()
+    for i in range(REQUESTS):
+        client.post('/api/predict/churn', json={"contract_value": 20000 + i, "engagement_score": 0.4})
+
+
+def run_mode(mode, workers):
+    """Fork workers in this process and print their memory as JSON"""
+    _, prefork = MODES[mode]
+    app = None
+    if prefork:
+        app = load_app()
+        gc.freeze()
+
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        if os.fork() == 0:
+            os.close(read_fd)
+            serve(app or load_app())
+            os.write(write_fd, json.dumps(memory_kb()).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append(read_fd)
+
+    results = []
+    for read_fd in pipes:
+        with os.fdopen(read_fd) as f:
+            results.append(json.loads(f.read()))
+        os.wait()
+    print(json.dumps(results))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.workers)
+        sys.exit(0)
+
+    registry_dir = tempfile.mkdtemp()
+    env = {**os.environ, "MODEL_REGISTRY_DIR": registry_dir}
+    # Publish the model once so workers only load it
+    subprocess.run([sys.executable, "-c", "from models.churn_predictor import ChurnPredictor; "
+                    "ChurnPredictor().model_version"], cwd=ML_DIR, env=env, check=True)
+
+    print(f"{args.workers} workers, {REQUESTS} churn requests each (MB per worker, mean)")
+    for mode, (mmap, _) in MODES.items():
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode, "--workers", str(args.workers)],
+            cwd=ML_DIR, env={**env, "MODEL_MMAP_MODE": "r" if mmap else ""},
+            capture_output=True, text=True, check=True
+        )
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        mean = {key: sum(s[key] for s in stats) / len(stats) / 1024 for key in stats[0]}
+        print(f"  {mode:>16} | RSS {mean['rss']:6.1f} | PSS {mean['pss']:6.1f} | "
+              f"private {mean['private']:6.1f} | total PSS {mean['pss'] * len(stats):6.1f}")
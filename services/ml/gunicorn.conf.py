@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration for the ML service
+
+    gunicorn -c gunicorn.conf.py main:app
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+# Concurrent requests in a worker are what the churn micro-batcher groups
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Import the app (sklearn, numpy, models) once in the master. Forked
+# workers share those pages copy-on-write instead of each loading a copy
+preload_app = True
+
+def when_ready(server):
+    import main
+    
+    # Finish loading before any fork, so no worker inherits a half-loaded
+    # model or a lock held by the preload thread
+    main.churn_predictor.model_version
+    main.license_model.model_version
+    
+    # Keep the cyclic GC from writing to (and so un-sharing) pre-fork objects
+    gc.freeze()
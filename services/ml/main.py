@@ -11,20 +11,76 @@ from datetime import datetime
 
 from models.churn_predictor import ChurnPredictor
 from models.anomaly_detector import AnomalyDetector
+from models.license_anomaly_model import LicenseAnomalyModel
+from models.streaming_anomaly_detector import StreamingAnomalyDetector
 from models.recommendation_engine import RecommendationEngine
 from models.health_score_calculator import HealthScoreCalculator
-from utils.feature_engineering import FeatureEngineer
+from models.incremental_health_scorer import IncrementalHealthScorer
+from models.feature_store import FeatureStore
+from utils.feature_engineering import FeatureEngineer, CLIENT_FEATURE_COLUMNS, SOFTWARE_FEATURE_COLUMNS
+from utils.micro_batching import MicroBatcher
 
 app = Flask(__name__)
 api = Api(app)
 
-# Initialize ML models
-churn_predictor = ChurnPredictor()
-anomaly_detector = AnomalyDetector()
-recommendation_engine = RecommendationEngine()
+# Initialize ML models (the churn model loads in the background)
+churn_predictor = ChurnPredictor(preload=True)
+# Multivariate license model; each worker retrains on what it has observed
+license_model = LicenseAnomalyModel(
+    n_jobs=int(os.getenv("LICENSE_ANOMALY_N_JOBS", "-1")),
+    retrain_interval=float(os.getenv("LICENSE_ANOMALY_RETRAIN_SECONDS", "3600")) or None,
+    min_new_samples=int(os.getenv("LICENSE_ANOMALY_MIN_NEW_SAMPLES", "100"))
+)
+anomaly_detector = AnomalyDetector(license_model=license_model)
+streaming_detector = StreamingAnomalyDetector()
+# Rules are reloaded when the file changes, checked at most this often
+recommendation_engine = RecommendationEngine(
+    rules_path=os.getenv("RECOMMENDATION_RULES_PATH") or None,
+    reload_interval=float(os.getenv("RECOMMENDATION_RULES_RELOAD_SECONDS", "1")) or None
+)
 health_calculator = HealthScoreCalculator()
+health_scorer = IncrementalHealthScorer(health_calculator)
 feature_engineer = FeatureEngineer()
 
+# Extracted features by entity id and updated_at: an in-memory LRU per
+# worker, plus memory-mapped snapshots every worker shares
+feature_stores = {
+    kind: FeatureStore(
+        kind, columns,
+        cache_size=int(os.getenv("FEATURE_STORE_CACHE_SIZE", "100000")),
+        ttl=float(os.getenv("FEATURE_STORE_TTL_SECONDS", "3600")) or None
+    ) for kind, columns in (("client", CLIENT_FEATURE_COLUMNS), ("software", SOFTWARE_FEATURE_COLUMNS))
+}
+feature_extractors = {
+    "client": feature_engineer.extract_client_features_batch,
+    "software": feature_engineer.extract_software_features_batch
+}
+
+def entity_id(record):
+    return record.get("client_id", record.get("id"))
+
+def stored_features(kind, records):
+    """
+    Extract features, reusing stored ones for records with an id and updated_at
+
+    Records must be database rows sent with their own updated_at; the
+    store doesn't compare the other fields, so a record changed without a
+    newer updated_at gets the features stored for that version.
+    """
+    return feature_stores[kind].get_or_compute(
+        [entity_id(record) for record in records],
+        [record.get("updated_at") for record in records],
+        lambda rows: feature_extractors[kind]([records[i] for i in rows])
+    )
+
+# Concurrent single-client churn requests are scored together
+churn_batcher = MicroBatcher(
+    churn_predictor.predict_batch,
+    max_batch_size=int(os.getenv("CHURN_BATCH_MAX_SIZE", "64")),
+    max_wait_ms=float(os.getenv("CHURN_BATCH_WINDOW_MS", "2")),
+    timeout=float(os.getenv("CHURN_BATCH_TIMEOUT_SECONDS", "30"))
+)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -52,8 +108,8 @@ class ChurnPrediction(Resource):
             # Extract features
             features = feature_engineer.extract_client_features(data)
             
-            # Make prediction
-            result = churn_predictor.predict(features)
+            # Make prediction (micro-batched with concurrent requests)
+            result = churn_batcher.submit(features)
             
             return {
                 "churn_probability": result["probability"],
@@ -64,6 +120,65 @@ class ChurnPrediction(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class ChurnBatchPrediction(Resource):
+    MAX_BATCH_SIZE = 50000
+    
+    def post(self):
+        """Predict churn for many clients in one call"""
+        try:
+            data = request.get_json()
+            clients = data.get("clients", [])
+            
+            if len(clients) > self.MAX_BATCH_SIZE:
+                return {"error": f"Batch too large. Maximum is {self.MAX_BATCH_SIZE} clients."}, 400
+            
+            # Extract features column by column, skipping clients whose
+            # features are stored for their updated_at
+            features = stored_features("client", clients)
+            
+            # One feature matrix, one predict_proba call
+            results = churn_predictor.predict_batch(features)
+            
+            return {
+                "predictions": [
+                    {
+                        "client_id": entity_id(client),
+                        "churn_probability": result["probability"],
+                        "churn_risk": result["risk_level"],
+                        "risk_factors": result["factors"],
+                        "recommendations": result["recommendations"]
+                    } for client, result in zip(clients, results)
+                ],
+                "count": len(results)
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class ChurnModelVersions(Resource):
+    def get(self):
+        """List churn model versions and the one serving predictions"""
+        try:
+            registry = churn_predictor.registry
+            name = ChurnPredictor.MODEL_NAME
+            
+            return {
+                "active_version": registry.current_version(name),
+                "serving_version": churn_predictor.model_version,
+                "versions": [registry.get_metadata(name, v) for v in registry.list_versions(name)]
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+    
+    def post(self):
+        """Activate a churn model version without restarting"""
+        try:
+            data = request.get_json() or {}
+            version = churn_predictor.activate_version(data.get("version"))
+            
+            return {"serving_version": version}, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
 class AnomalyDetection(Resource):
     def post(self):
         """Detect cost anomalies in software spending"""
@@ -75,8 +190,8 @@ class AnomalyDetection(Resource):
             current_cost = data.get("current_cost")
             software_name = data.get("software_name")
             
-            # Detect anomalies
-            result = anomaly_detector.detect(cost_data, current_cost)
+            # Detect anomalies; a series_id lets the seasonal fit be reused
+            result = anomaly_detector.detect(cost_data, current_cost, data.get("series_id"))
             
             return {
                 "is_anomaly": result["is_anomaly"],
@@ -90,14 +205,162 @@ class AnomalyDetection(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class AnomalyBatchDetection(Resource):
+    MAX_BATCH_SIZE = 100000
+    
+    def post(self):
+        """Detect cost anomalies for many software cost series in one call"""
+        try:
+            data = request.get_json()
+            series = data.get("series", [])
+            
+            if len(series) > self.MAX_BATCH_SIZE:
+                return {"error": f"Batch too large. Maximum is {self.MAX_BATCH_SIZE} series."}, 400
+            
+            current_costs = [s.get("current_cost") for s in series]
+            
+            # One padded matrix for all series
+            results = anomaly_detector.detect_batch(
+                [s.get("cost_history", []) for s in series],
+                current_costs,
+                as_records=True,
+                series_ids=[s.get("series_id") for s in series]
+            )
+            
+            return {
+                "results": [
+                    {
+                        "software_name": s.get("software_name"),
+                        "is_anomaly": result["is_anomaly"],
+                        "anomaly_score": result["score"],
+                        "expected_cost": result["expected_cost"],
+                        "actual_cost": current_cost,
+                        "variance_percent": result["variance_percent"],
+                        "severity": result["severity"],
+                        "explanation": result["explanation"]
+                    } for s, current_cost, result in zip(series, current_costs, results)
+                ],
+                "count": len(results),
+                "anomaly_count": sum(result["is_anomaly"] for result in results)
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class LicenseAnomalyDetection(Resource):
+    MAX_BATCH_SIZE = 100000
+    
+    def post(self):
+        """Score licenses on cost and usage features jointly"""
+        try:
+            data = request.get_json()
+            licenses = data.get("licenses", [])
+            
+            if len(licenses) > self.MAX_BATCH_SIZE:
+                return {"error": f"Batch too large. Maximum is {self.MAX_BATCH_SIZE} licenses."}, 400
+            
+            # Observed licenses feed the next scheduled retrain
+            results = anomaly_detector.detect_multivariate(licenses, observe=data.get("observe", True))
+            
+            return {
+                "results": [
+                    {
+                        "license_id": license.get("license_id", license.get("id")),
+                        "software_name": license.get("software_name"),
+                        **result
+                    } for license, result in zip(licenses, results)
+                ],
+                "count": len(results),
+                "anomaly_count": sum(result["is_anomaly"] for result in results)
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class LicenseAnomalyModelVersions(Resource):
+    def get(self):
+        """List license anomaly model versions and retraining status"""
+        try:
+            registry = license_model.registry
+            name = LicenseAnomalyModel.MODEL_NAME
+            
+            return {
+                "active_version": registry.current_version(name),
+                "serving_version": license_model.model_version,
+                "pending_samples": license_model.pending_count,
+                "retrain_interval_seconds": license_model.retrain_interval,
+                "versions": [registry.get_metadata(name, v) for v in registry.list_versions(name)]
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+    
+    def post(self):
+        """Retrain now on the current window, queued observations and any licenses sent"""
+        try:
+            data = request.get_json() or {}
+            version = license_model.retrain(data.get("licenses"))
+            
+            if version is None:
+                return {"error": "No new observations to retrain on"}, 400
+            return {"serving_version": version}, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class StreamingAnomalyIngest(Resource):
+    def post(self):
+        """Add cost observations to running per-series state, flagging anomalies"""
+        try:
+            data = request.get_json()
+            
+            if "observations" not in data:
+                return streaming_detector.update(data.get("series_id"), data.get("value"), data.get("timestamp")), 200
+            
+            results = streaming_detector.update_many(data["observations"])
+            
+            return {
+                "results": results,
+                "count": len(results),
+                "anomaly_count": sum(result["is_anomaly"] for result in results)
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class StreamingAnomalySeries(Resource):
+    def get(self, series_id):
+        """Running statistics for one series"""
+        state = streaming_detector.get(series_id)
+        if state is None:
+            return {"error": f"Unknown series: {series_id}"}, 404
+        return state, 200
+
+class StreamingAnomalySnapshots(Resource):
+    def get(self):
+        """List saved snapshots of the streaming state"""
+        return {"snapshots": streaming_detector.list_snapshots(), "series_count": streaming_detector.count()}, 200
+    
+    def post(self):
+        """Snapshot the streaming state, or restore one with {"restore": name}"""
+        try:
+            data = request.get_json(silent=True) or {}
+            
+            if data.get("restore"):
+                streaming_detector.restore(data["restore"])
+                return {"restored": data["restore"], "series_count": streaming_detector.count()}, 200
+            
+            return {"snapshot": streaming_detector.snapshot(data.get("name"))}, 201
+        except Exception as e:
+            return {"error": str(e)}, 400
+
 class HealthScoreCalculation(Resource):
     def post(self):
         """Calculate client health score"""
         try:
             data = request.get_json()
             
-            # Calculate health score
-            result = health_calculator.calculate(data)
+            # With a client_id, factors whose inputs are unchanged since
+            # that client's last request are reused
+            if data.get("client_id") is not None:
+                result = health_scorer.calculate(data["client_id"], data)
+            else:
+                result = health_calculator.calculate(data)
             
             return {
                 "health_score": result["overall_score"],
@@ -108,6 +371,14 @@ class HealthScoreCalculation(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class HealthScoreCacheStats(Resource):
+    def get(self):
+        """Hit rates of the per-client factor score cache"""
+        try:
+            return health_scorer.stats(), 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
 class RecommendationGeneration(Resource):
     def post(self):
         """Generate AI-powered recommendations"""
@@ -126,6 +397,80 @@ class RecommendationGeneration(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class RecommendationRuleStats(Resource):
+    def get(self):
+        """Loaded rule file version and per-rule evaluation counters"""
+        try:
+            return recommendation_engine.rule_stats(), 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+    
+    def post(self):
+        """Reload the rule file now"""
+        try:
+            if not recommendation_engine.reload():
+                return {"error": recommendation_engine.last_error}, 400
+            return recommendation_engine.rule_stats(), 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class FeatureExtraction(Resource):
+    MAX_BATCH_SIZE = 50000
+    
+    def post(self, kind):
+        """Client or software features for many records, from the feature store where possible"""
+        try:
+            if kind not in feature_stores:
+                return {"error": f"Unknown feature set: {kind}"}, 404
+            
+            records = (request.get_json() or {}).get("records", [])
+            if len(records) > self.MAX_BATCH_SIZE:
+                return {"error": f"Batch too large. Maximum is {self.MAX_BATCH_SIZE} records."}, 400
+            
+            features = stored_features(kind, records)
+            
+            return {
+                "columns": list(features.columns),
+                "features": features.to_numpy().tolist(),
+                "count": len(features)
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
+class FeatureStoreState(Resource):
+    def get(self, kind):
+        """Feature store hit rates and snapshots"""
+        if kind not in feature_stores:
+            return {"error": f"Unknown feature set: {kind}"}, 404
+        store = feature_stores[kind]
+        return dict(store.stats(), snapshots=store.list_snapshots()), 200
+    
+    def post(self, kind):
+        """
+        Invalidate with {"entities": [{"id", "updated_at"}]} (rows older than
+        the database's updated_at) or {"ids": [...]}, otherwise snapshot
+        """
+        try:
+            if kind not in feature_stores:
+                return {"error": f"Unknown feature set: {kind}"}, 404
+            store = feature_stores[kind]
+            data = request.get_json(silent=True) or {}
+            
+            if data.get("entities") is not None:
+                entities = data["entities"]
+                dropped = store.invalidate_stale(
+                    [entity_id(entity) for entity in entities],
+                    [entity.get("updated_at") for entity in entities]
+                )
+                return {"invalidated": len(entities), "dropped": dropped}, 200
+            if data.get("ids") is not None:
+                store.invalidate(data["ids"])
+                return {"invalidated": len(data["ids"])}, 200
+            
+            return {"snapshot": store.snapshot(data.get("name")), "rows": store.stats()["snapshot_rows"]}, 201
+        except Exception as e:
+            return {"error": str(e)}, 400
+
 class UtilizationOptimization(Resource):
     def post(self):
         """Optimize license utilization and identify savings"""
@@ -163,9 +508,21 @@ class UtilizationOptimization(Resource):
 
 # Register API endpoints
 api.add_resource(ChurnPrediction, '/api/predict/churn')
+api.add_resource(ChurnBatchPrediction, '/api/predict/churn/batch')
+api.add_resource(ChurnModelVersions, '/api/models/churn')
 api.add_resource(AnomalyDetection, '/api/detect/anomaly')
+api.add_resource(AnomalyBatchDetection, '/api/detect/anomaly/batch')
+api.add_resource(LicenseAnomalyDetection, '/api/detect/anomaly/license')
+api.add_resource(LicenseAnomalyModelVersions, '/api/models/license-anomaly')
+api.add_resource(StreamingAnomalyIngest, '/api/stream/anomaly')
+api.add_resource(StreamingAnomalySnapshots, '/api/stream/anomaly/snapshots')
+api.add_resource(StreamingAnomalySeries, '/api/stream/anomaly/<string:series_id>')
 api.add_resource(HealthScoreCalculation, '/api/calculate/health-score')
+api.add_resource(HealthScoreCacheStats, '/api/calculate/health-score/stats')
 api.add_resource(RecommendationGeneration, '/api/generate/recommendations')
+api.add_resource(RecommendationRuleStats, '/api/generate/recommendations/rules')
+api.add_resource(FeatureExtraction, '/api/features/<string:kind>')
+api.add_resource(FeatureStoreState, '/api/features/<string:kind>/store')
 api.add_resource(UtilizationOptimization, '/api/optimize/utilization')
 
 # Lambda handler for AWS Lambda deployment
@@ -2,14 +2,51 @@
 Initialize models package
 """
 
-from .churn_predictor import ChurnPredictor
-from .anomaly_detector import AnomalyDetector
-from .recommendation_engine import RecommendationEngine
-from .health_score_calculator import HealthScoreCalculator
+import importlib
+
+# Exports are imported on first use, so scoring paths that only need
+# NumPy (e.g. compiled churn models) don't pay for sklearn and scipy
+_EXPORTS = {
+    'ChurnPredictor': 'churn_predictor',
+    'AnomalyDetector': 'anomaly_detector',
+    'StreamingAnomalyDetector': 'streaming_anomaly_detector',
+    'SeasonalBaseline': 'seasonal_baseline',
+    'UsageAnomalyDetector': 'usage_anomaly_detector',
+    'LicenseAnomalyModel': 'license_anomaly_model',
+    'RecommendationEngine': 'recommendation_engine',
+    'SoftwareCatalog': 'software_catalog',
+    'HealthScoreCalculator': 'health_score_calculator',
+    'IncrementalHealthScorer': 'incremental_health_scorer',
+    'FeatureColumns': 'feature_pipeline',
+    'FeatureStore': 'feature_store',
+    'ModelRegistry': 'model_registry',
+    'ModelHandle': 'model_registry',
+    'ModelBundle': 'model_registry',
+    'CompiledTreeEnsemble': 'compiled_trees',
+    'export_gradient_boosting': 'compiled_trees'
+}
 
 __all__ = [
     'ChurnPredictor',
     'AnomalyDetector',
+    'StreamingAnomalyDetector',
+    'SeasonalBaseline',
+    'UsageAnomalyDetector',
+    'LicenseAnomalyModel',
     'RecommendationEngine',
-    'HealthScoreCalculator'
-]
\ No newline at end of file
+    'SoftwareCatalog',
+    'HealthScoreCalculator',
+    'IncrementalHealthScorer',
+    'FeatureColumns',
+    'FeatureStore',
+    'ModelRegistry',
+    'ModelHandle',
+    'ModelBundle',
+    'CompiledTreeEnsemble',
+    'export_gradient_boosting'
+]
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
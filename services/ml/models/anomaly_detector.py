@@ -4,30 +4,72 @@ Detects unusual patterns in cost and usage data
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-from scipy import stats
-import joblib
-import os
+from itertools import chain
+
+from .license_anomaly_model import LicenseAnomalyModel
+from .seasonal_baseline import SeasonalBaseline
+from .usage_anomaly_detector import UsageAnomalyDetector
+
+# Change-point batches up to this size are scanned one series at a time
+SCALAR_SCAN_MAX_SERIES = 32
 
 class AnomalyDetector:
-    def __init__(self):
-        self.model = IsolationForest(
-            contamination=0.1,
-            random_state=42,
-            n_estimators=100
-        )
-        self.scaler = StandardScaler()
-        self.trained = False
+    def __init__(self, season_length=12, license_model=None):
+        """
+        Args:
+            season_length (int): Season of the Holt-Winters expected-cost
+                baseline, used once a series has two seasons of history;
+                None scores every series against its mean
+            license_model (LicenseAnomalyModel): Multivariate model for
+                detect_multivariate; defaults to one on MODEL_REGISTRY_DIR
+        """
+        self.seasonal = SeasonalBaseline(season_length) if season_length else None
+        self.license_model = license_model or LicenseAnomalyModel()
+    
+    @property
+    def model(self):
+        """The fitted IsolationForest behind detect_multivariate"""
+        return self.license_model.model
+    
+    @property
+    def scaler(self):
+        return self.license_model.scaler
+    
+    def detect_multivariate(self, licenses, observe=False):
+        """
+        Detect licenses whose cost and usage are unusual taken together
+        
+        Scores cost, active users, utilization, cost per seat and
+        month-over-month changes jointly with the persisted IsolationForest,
+        one score_samples call for the whole batch.
+        
+        Args:
+            licenses: DataFrame or list of dicts with monthly_cost,
+                active_users, total_licenses and optionally
+                utilization_percent, previous_monthly_cost and
+                previous_active_users
+            observe (bool): Also queue the licenses for the next
+                incremental retrain
+            
+        Returns:
+            list: One result per license (is_anomaly, anomaly_score,
+                top_feature, top_feature_z, model_version)
+        """
+        results = self.license_model.score(licenses)
+        if observe:
+            self.license_model.observe(licenses)
+        return results
     
-    def detect(self, historical_costs, current_cost):
+    def detect(self, historical_costs, current_cost, series_id=None):
         """
         Detect if current cost is anomalous compared to historical data
         
         Args:
             historical_costs (list): List of historical cost values
             current_cost (float): Current cost to check
+            series_id (str): Optional key for caching the seasonal fit, so
+                the next call with this history extended only applies the
+                new points
             
         Returns:
             dict: Anomaly detection results
@@ -44,20 +86,21 @@ class AnomalyDetector:
         std_cost = np.std(costs)
         median_cost = np.median(costs)
         
-        # Calculate expected cost using exponential moving average
-        alpha = 0.3
-        ema_cost = costs[-1]
-        for i in range(len(costs) - 2, -1, -1):
-            ema_cost = alpha * costs[i] + (1 - alpha) * ema_cost
+        # Expected cost and spread: the seasonal forecast and its one-step
+        # error when there is enough history, otherwise mean and std
+        expected_cost, spread = mean_cost, std_cost
+        baseline = self.seasonal.forecast(costs, series_id) if self.seasonal else None
+        if baseline is not None:
+            expected_cost, spread = baseline
         
         # Use statistical approach for anomaly detection
-        z_score = abs((current_cost - mean_cost) / std_cost) if std_cost > 0 else 0
+        z_score = abs((current_cost - expected_cost) / spread) if spread > 0 else 0
         
         # Check if anomaly using z-score
         is_anomaly = z_score > 2.5  # 2.5 standard deviations
         
         # Calculate variance
-        variance_percent = ((current_cost - mean_cost) / mean_cost * 100) if mean_cost > 0 else 0
+        variance_percent = ((current_cost - expected_cost) / expected_cost * 100) if expected_cost > 0 else 0
         
         # Determine severity
         if abs(variance_percent) > 50:
@@ -68,13 +111,7 @@ class AnomalyDetector:
             severity = "low"
         
         # Generate explanation
-        if is_anomaly:
-            if current_cost > mean_cost:
-                explanation = f"Cost is {abs(variance_percent):.1f}% higher than expected. Possible causes: increased usage, new features, or billing errors."
-            else:
-                explanation = f"Cost is {abs(variance_percent):.1f}% lower than expected. Possible causes: decreased usage or service disruption."
-        else:
-            explanation = "Cost is within normal range."
+        explanation = self._explain(is_anomaly, current_cost, expected_cost, variance_percent)
         
         # Calculate anomaly score (0-1, higher = more anomalous)
         anomaly_score = min(z_score / 5.0, 1.0)  # Normalize to 0-1
@@ -82,7 +119,7 @@ class AnomalyDetector:
         return {
             "is_anomaly": is_anomaly,
             "score": float(anomaly_score),
-            "expected_cost": float(mean_cost),
+            "expected_cost": float(expected_cost),
             "variance_percent": float(variance_percent),
             "severity": severity,
             "explanation": explanation,
@@ -90,10 +127,160 @@ class AnomalyDetector:
                 "mean": float(mean_cost),
                 "median": float(median_cost),
                 "std_dev": float(std_cost),
-                "z_score": float(z_score)
+                "z_score": float(z_score),
+                "baseline": "seasonal" if baseline is not None else "mean"
             }
         }
     
+    def detect_batch(self, cost_histories, current_costs, lengths=None, as_records=False, series_ids=None):
+        """
+        Detect cost anomalies for many series at once
+        
+        Same rules as detect() for every series, computed with NumPy over
+        a padded (n_series, max_len) matrix instead of one call per series.
+        Seasonal baselines for all long-enough series are fitted together.
+        
+        Args:
+            cost_histories: Ragged list of cost lists, or a 2-D array padded
+                with NaN (or with `lengths` giving each row's valid prefix)
+            current_costs (array-like): Current cost per series
+            lengths (array-like): Valid values per row of a padded array
+            as_records (bool): Return one detect()-shaped dict per series
+                instead of columns
+            series_ids (list): Optional id per series for caching seasonal fits
+            
+        Returns:
+            dict: Arrays keyed by is_anomaly, score, expected_cost,
+                variance_percent, severity, mean, median, std_dev, z_score
+                seasonal and n_points; statistics are NaN for series with
+                fewer than 3 points (list of dicts if as_records)
+        """
+        costs, valid = self._pad_series(cost_histories, lengths)
+        current = np.asarray(current_costs, dtype=float)
+        if len(current) != len(costs):
+            raise ValueError("Expected one current cost per series")
+        
+        counts = valid.sum(axis=1)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            masked = np.where(valid, costs, 0.0)
+            mean = masked.sum(axis=1) / counts
+            deviations = np.where(valid, costs - mean[:, None], 0.0)
+            std = np.sqrt((deviations ** 2).sum(axis=1) / counts)
+            
+            median = self._masked_median(costs, valid)
+            
+        if self.seasonal is not None:
+            forecast, residual_std = self.seasonal.fit_batch(costs, valid, series_ids)
+        else:
+            forecast = residual_std = np.full(len(costs), np.nan)
+        seasonal = ~np.isnan(forecast)
+        expected = np.where(seasonal, forecast, mean)
+        spread = np.where(seasonal, residual_std, std)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z_score = np.where(spread > 0, np.abs((current - expected) / spread), 0.0)
+            variance_percent = np.where(expected > 0, (current - expected) / expected * 100, 0.0)
+        
+        abs_variance = np.abs(variance_percent)
+        full = counts >= 3
+        
+        # Short series fall back to the simple threshold check
+        is_anomaly = np.where(full, z_score > 2.5, abs_variance > 30)
+        score = np.where(full, np.minimum(z_score / 5.0, 1.0), np.minimum(abs_variance / 100, 1.0))
+        severity = np.select(
+            [abs_variance > 50, abs_variance > np.where(full, 25, 30)],
+            ["high", "medium"],
+            "low"
+        )
+        
+        results = {
+            "is_anomaly": is_anomaly,
+            "score": score,
+            "expected_cost": np.where(counts > 0, expected, current),
+            "variance_percent": variance_percent,
+            "severity": severity,
+            "mean": np.where(full, mean, np.nan),
+            "median": np.where(full, median, np.nan),
+            "std_dev": np.where(full, std, np.nan),
+            "z_score": np.where(full, z_score, np.nan),
+            "seasonal": seasonal,
+            "n_points": counts
+        }
+        
+        return self._batch_records(results, current) if as_records else results
+    
+    def _masked_median(self, values, valid):
+        """Median of each row's valid values; NaN for rows with none"""
+        counts = valid.sum(axis=1)
+        if not values.shape[1]:
+            return np.full(len(values), np.nan)
+        
+        # NaN sorts last, so each row's median comes from its valid prefix
+        rows = np.arange(len(values))
+        ordered = np.sort(np.where(valid, values, np.nan), axis=1)
+        lower = ordered[rows, np.maximum(counts - 1, 0) // 2]
+        upper = ordered[rows, counts // 2]
+        return np.where(counts > 0, (lower + upper) / 2, np.nan)
+    
+    def _pad_series(self, cost_histories, lengths=None):
+        """Padded float matrix and validity mask for ragged or padded input"""
+        if isinstance(cost_histories, np.ndarray) and cost_histories.ndim == 2:
+            costs = cost_histories.astype(float)
+            if lengths is None:
+                return costs, ~np.isnan(costs)
+            return costs, np.arange(costs.shape[1]) < np.asarray(lengths)[:, None]
+        
+        counts = np.fromiter((len(c) for c in cost_histories), dtype=np.int64, count=len(cost_histories))
+        width = int(counts.max()) if len(counts) else 0
+        valid = np.arange(width) < counts[:, None]
+        
+        costs = np.full((len(counts), width), np.nan)
+        if width:
+            costs[valid] = np.fromiter(chain.from_iterable(cost_histories), dtype=float, count=int(counts.sum()))
+        return costs, valid
+    
+    def _batch_records(self, results, current_costs):
+        """Convert detect_batch columns to detect()-shaped dicts"""
+        records = []
+        for i in range(len(current_costs)):
+            n_points = int(results["n_points"][i])
+            variance_percent = float(results["variance_percent"][i])
+            record = {
+                "is_anomaly": bool(results["is_anomaly"][i]),
+                "score": float(results["score"][i]),
+                "expected_cost": float(results["expected_cost"][i]),
+                "variance_percent": variance_percent,
+                "severity": str(results["severity"][i])
+            }
+            
+            if n_points == 0:
+                record["explanation"] = "Insufficient historical data for anomaly detection"
+            elif n_points < 3:
+                record["explanation"] = f"Limited data available. Current cost differs by {abs(variance_percent):.1f}%"
+            else:
+                record["explanation"] = self._explain(
+                    record["is_anomaly"], current_costs[i], record["expected_cost"], variance_percent
+                )
+                record["statistics"] = {
+                    "mean": float(results["mean"][i]),
+                    "median": float(results["median"][i]),
+                    "std_dev": float(results["std_dev"][i]),
+                    "z_score": float(results["z_score"][i]),
+                    "baseline": "seasonal" if results["seasonal"][i] else "mean"
+                }
+            records.append(record)
+        
+        return records
+    
+    def _explain(self, is_anomaly, current_cost, expected_cost, variance_percent):
+        """Human-readable explanation of a cost anomaly result"""
+        if not is_anomaly:
+            return "Cost is within normal range."
+        if current_cost > expected_cost:
+            return f"Cost is {abs(variance_percent):.1f}% higher than expected. Possible causes: increased usage, new features, or billing errors."
+        return f"Cost is {abs(variance_percent):.1f}% lower than expected. Possible causes: decreased usage or service disruption."
+    
     def _simple_threshold_check(self, historical_costs, current_cost):
         """Simple threshold-based check when insufficient data"""
         if not historical_costs:
@@ -162,12 +349,33 @@ class AnomalyDetector:
             "std_usage": float(std_usage)
         }
     
-    def detect_trend_anomaly(self, time_series_data):
+    def detect_grouped_usage_anomalies(self, usage, group_by=("license_id", "department"), top_k=10, threshold=3.5):
+        """
+        Detect usage anomalies against each user's license/department peers
+        
+        Columnar and robust (median/MAD) counterpart of detect_usage_anomaly,
+        for large usage logs; see UsageAnomalyDetector.
+        
+        Args:
+            usage: DataFrame, dict of columns, or iterable of usage records
+                (e.g. LicenseUsage rows joined with the license department)
+            group_by (tuple): Columns identifying a peer group
+            top_k (int): Most anomalous users returned per group
+            threshold (float): Modified z-score above which usage is anomalous
+            
+        Returns:
+            dict: Per-group anomaly results
+        """
+        return UsageAnomalyDetector(group_by, threshold, top_k).detect(usage)
+    
+    def detect_trend_anomaly(self, time_series_data, method="diff"):
         """
         Detect anomalous trends in time series data
         
         Args:
             time_series_data (list): Time series of values
+            method (str): "diff" flags outlying day-over-day changes;
+                "changepoint" finds level shifts (see detect_change_points)
             
         Returns:
             dict: Trend anomaly detection results
@@ -175,6 +383,11 @@ class AnomalyDetector:
         if len(time_series_data) < 7:
             return {"has_anomaly": False, "message": "Insufficient data for trend analysis"}
         
+        if method == "changepoint":
+            return self.detect_change_points([time_series_data])[0]
+        if method != "diff":
+            raise ValueError(f"Unknown trend method: {method}")
+        
         # Convert to numpy array
         data = np.array(time_series_data)
         
@@ -206,4 +419,162 @@ class AnomalyDetector:
                 "avg_daily_change": float(mean_change)
             }
         
-        return {"has_anomaly": False, "message": "Normal trend detected"}
\ No newline at end of file
+        return {"has_anomaly": False, "message": "Normal trend detected"}
+    
+    def detect_change_points(self, series, threshold=8.0, drift=0.5, min_segment=5):
+        """
+        Find level shifts in many time series with a two-sided CUSUM
+        
+        One pass over time, vectorized across series. Each series is
+        standardized by a robust noise scale (MAD of its day-over-day
+        changes) and compared with the running mean of its current segment.
+        When either cumulative sum exceeds the threshold, the change point
+        is placed at the best single split of that segment so far (largest
+        difference of means, from prefix sums) and a new segment starts
+        there.
+        
+        Args:
+            series: Ragged list of value lists, or a NaN-padded 2-D array
+            threshold (float): Alarm level for the cumulative sums, in
+                noise standard deviations
+            drift (float): Slack subtracted per step, in noise standard
+                deviations; shifts smaller than about twice this are ignored
+            min_segment (int): Points a segment needs before the next
+                change can be raised, so its reference mean is settled
+            
+        Returns:
+            list: Per series, change points (index, before/after means,
+                change_percent, severity), segments (start, end, mean) and
+                the overall trend
+        """
+        values, valid = self._pad_series(series)
+        n_series, width = values.shape
+        counts = valid.sum(axis=1)
+        
+        filled = np.where(valid, values, 0.0)
+        prefix = np.zeros((n_series, width + 1))
+        np.cumsum(filled, axis=1, out=prefix[:, 1:])
+        
+        # Day-over-day changes are unaffected by level shifts except at the
+        # shift itself, so their spread estimates the noise
+        diffs = np.diff(filled, axis=1)
+        steps = valid[:, 1:]
+        n_diffs = np.maximum(steps.sum(axis=1), 1)
+        with np.errstate(invalid='ignore'):
+            center = self._masked_median(diffs, steps)
+            noise = 1.4826 * self._masked_median(np.abs(diffs - center[:, None]), steps) / np.sqrt(2)
+            spread = np.where(steps, diffs - (np.where(steps, diffs, 0.0).sum(axis=1) / n_diffs)[:, None], 0.0)
+            fallback = np.sqrt((spread ** 2).sum(axis=1) / n_diffs) / np.sqrt(2)
+        noise = np.where(noise > 0, noise, np.nan_to_num(fallback))
+        scale = np.where(noise > 0, noise, 1.0)
+        
+        if n_series <= SCALAR_SCAN_MAX_SERIES:
+            # Per-step NumPy overhead outweighs vectorizing a few series
+            changes = [
+                self._cusum_scan(values[i], prefix[i], int(counts[i]), float(scale[i]), threshold, drift, min_segment)
+                for i in range(n_series)
+            ]
+        else:
+            changes = self._cusum_scan_batch(values, valid, prefix, scale, threshold, drift, min_segment)
+        
+        return [
+            self._change_point_record(prefix[i], changes[i], int(counts[i]), float(noise[i]))
+            for i in range(n_series)
+        ]
+    
+    def _cusum_scan_batch(self, values, valid, prefix, scale, threshold, drift, min_segment):
+        """Change points of every series, stepping through time once"""
+        n_series, width = values.shape
+        rows = np.arange(n_series)
+        segment_start = np.zeros(n_series, dtype=np.int64)
+        upper = np.zeros(n_series)
+        lower = np.zeros(n_series)
+        changes = [[] for _ in range(n_series)]
+        
+        for t in range(width):
+            step = valid[:, t]
+            reference = (prefix[:, t] - prefix[rows, segment_start]) / np.maximum(t - segment_start, 1)
+            reference = np.where(t > segment_start, reference, values[:, t])
+            z = np.where(step, (values[:, t] - reference) / scale, 0.0)
+            
+            upper = np.maximum(0.0, upper + z - drift)
+            lower = np.maximum(0.0, lower - z - drift)
+            
+            settled = t - segment_start >= min_segment
+            alarm = step & settled & ((upper > threshold) | (lower > threshold))
+            for i in np.flatnonzero(alarm):
+                start = self._best_split(prefix[i], segment_start[i], t + 1)
+                changes[i].append(start)
+                segment_start[i] = start
+            upper[alarm] = 0.0
+            lower[alarm] = 0.0
+        
+        return changes
+    
+    def _cusum_scan(self, values, prefix, n_points, scale, threshold, drift, min_segment):
+        """Change points of one series; same arithmetic as _cusum_scan_batch"""
+        values = values.tolist()
+        prefix_values = prefix.tolist()
+        segment_start = 0
+        upper = lower = 0.0
+        changes = []
+        
+        for t in range(n_points):
+            if t > segment_start:
+                reference = (prefix_values[t] - prefix_values[segment_start]) / (t - segment_start)
+            else:
+                reference = values[t]
+            z = (values[t] - reference) / scale
+            
+            upper = max(0.0, upper + z - drift)
+            lower = max(0.0, lower - z - drift)
+            
+            if t - segment_start >= min_segment and (upper > threshold or lower > threshold):
+                segment_start = self._best_split(prefix, segment_start, t + 1)
+                changes.append(segment_start)
+                upper = lower = 0.0
+        
+        return changes
+    
+    def _best_split(self, prefix, start, end):
+        """Split of values[start:end] with the largest weighted mean difference"""
+        split = np.arange(start + 1, end)
+        left = split - start
+        right = end - split
+        left_mean = (prefix[split] - prefix[start]) / left
+        right_mean = (prefix[end] - prefix[split]) / right
+        return int(split[np.argmax(left * right * (left_mean - right_mean) ** 2)])
+    
+    def _change_point_record(self, prefix, change_points, n_points, noise):
+        """Segments and change point details for one series"""
+        bounds = [0] + change_points + [n_points]
+        segments = [
+            {"start": start, "end": end - 1, "mean": float((prefix[end] - prefix[start]) / (end - start))}
+            for start, end in zip(bounds[:-1], bounds[1:])
+            if end > start
+        ]
+        
+        details = []
+        for before, after in zip(segments[:-1], segments[1:]):
+            change_percent = ((after["mean"] - before["mean"]) / before["mean"] * 100) if before["mean"] != 0 else 0.0
+            if abs(change_percent) > 50:
+                severity = "high"
+            elif abs(change_percent) > 25:
+                severity = "medium"
+            else:
+                severity = "low"
+            details.append({
+                "index": after["start"],
+                "before_mean": before["mean"],
+                "after_mean": after["mean"],
+                "change_percent": float(change_percent),
+                "severity": severity
+            })
+        
+        return {
+            "has_anomaly": len(details) > 0,
+            "change_points": details,
+            "segments": segments,
+            "trend": "increasing" if segments and segments[-1]["mean"] > segments[0]["mean"] else "decreasing",
+            "noise_std": noise
+        }
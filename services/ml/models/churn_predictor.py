@@ -4,43 +4,119 @@ Predicts the probability of client churn using ML
 """
 
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 from datetime import datetime, timedelta
 
+from .feature_pipeline import FeatureColumns, days_between, utc_now
+from .model_registry import ModelRegistry, ModelHandle
+from .compiled_trees import CompiledTreeEnsemble, export_gradient_boosting
+
+LOW_RISK_THRESHOLD = 0.3
+HIGH_RISK_THRESHOLD = 0.6
+
 class ChurnPredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
+    MODEL_NAME = 'churn'
+    
+    def __init__(self, registry=None, preload=False):
+        """
+        Args:
+            registry (ModelRegistry): Model store; defaults to MODEL_REGISTRY_DIR
+            preload (bool): Start loading the model on a background thread
+                instead of on the first prediction
+        """
         self.feature_names = [
             'contract_value', 'monthly_spend', 'total_licenses', 'total_users',
             'days_since_last_ticket', 'support_ticket_frequency',
             'payment_history_score', 'contract_age_days', 'engagement_score'
         ]
-        self._initialize_model()
+        self.registry = registry or ModelRegistry()
+        # Serving only needs the compiled trees; the sklearn model and
+        # scaler (and sklearn itself) load on first access
+        self._handle = ModelHandle(
+            self.registry, self.MODEL_NAME,
+            bootstrap=self._bootstrap_model,
+            artifacts=('compiled',)
+        )
+        
+        if preload:
+            self._handle.preload(background=True)
+    
+    @property
+    def model(self):
+        return self._handle.get()['model']
+    
+    @property
+    def scaler(self):
+        return self._handle.get()['scaler']
+    
+    @property
+    def model_version(self):
+        return self._handle.get().version
+    
+    def activate_version(self, version=None):
+        """
+        Switch to a model version without blocking in-flight predictions
+        
+        Args:
+            version (str): Version to activate; defaults to the registry's
+                active version (e.g. one published by train_models.py)
+            
+        Returns:
+            str: The version now serving predictions
+        """
+        if version is not None:
+            self.registry.activate(self.MODEL_NAME, version)
+        return self._handle.swap(version).version
+    
+    def create_model(self):
+        """New, untrained churn model with the default hyperparameters"""
+        from sklearn.ensemble import GradientBoostingClassifier
+        
+        return GradientBoostingClassifier(
+            n_estimators=100,
+            learning_rate=0.1,
+            max_depth=5,
+            random_state=42
+        )
+    
+    def model_artifacts(self, model, scaler):
+        """
+        Registry artifacts for a fitted model and scaler
+        
+        Returns:
+            dict: The sklearn objects plus their compiled NumPy form
+        """
+        return {
+            'model': model,
+            'scaler': scaler,
+            'compiled': export_gradient_boosting(model, scaler)
+        }
     
-    def _initialize_model(self):
-        """Initialize or load the churn prediction model"""
-        model_path = os.path.join('trained_models', 'churn_model.pkl')
+    def _bootstrap_model(self, registry):
+        """Publish a first model version when the registry is empty"""
+        # Models saved before the registry existed sit directly in the root
+        legacy_model = os.path.join(registry.root, 'churn_model.pkl')
+        legacy_scaler = os.path.join(registry.root, 'churn_scaler.pkl')
         
-        if os.path.exists(model_path):
-            self.model = joblib.load(model_path)
+        if os.path.exists(legacy_model) and os.path.exists(legacy_scaler):
+            model, scaler = joblib.load(legacy_model), joblib.load(legacy_scaler)
+            source = 'legacy'
         else:
-            # Initialize a new model with default parameters
-            self.model = GradientBoostingClassifier(
-                n_estimators=100,
-                learning_rate=0.1,
-                max_depth=5,
-                random_state=42
-            )
             # Train with synthetic data for demo
-            self._train_demo_model()
+            model, scaler = self._train_demo_model()
+            source = 'demo'
+        
+        return registry.save(
+            self.MODEL_NAME,
+            self.model_artifacts(model, scaler),
+            metadata={'source': source, 'feature_names': self.feature_names}
+        )
     
     def _train_demo_model(self):
         """Train model with synthetic data for demonstration"""
+        from sklearn.preprocessing import StandardScaler
+        
         # Generate synthetic training data
         np.random.seed(42)
         n_samples = 1000
@@ -67,13 +143,12 @@ class ChurnPredictor:
             y[i] = 1 if score > 0.5 else 0
         
         # Fit scaler and model
-        X_scaled = self.scaler.fit_transform(X)
-        self.model.fit(X_scaled, y)
+        model = self.create_model()
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        model.fit(X_scaled, y)
         
-        # Save model
-        os.makedirs('trained_models', exist_ok=True)
-        joblib.dump(self.model, os.path.join('trained_models', 'churn_model.pkl'))
-        joblib.dump(self.scaler, os.path.join('trained_models', 'churn_scaler.pkl'))
+        return model, scaler
     
     def predict(self, features):
         """
@@ -88,19 +163,14 @@ class ChurnPredictor:
         # Extract and prepare features
         X = self._prepare_features(features)
         
-        # Scale features
-        X_scaled = self.scaler.transform(X.reshape(1, -1))
+        # One model version for the whole request, even if a swap happens
+        bundle = self._handle.get()
         
         # Get prediction probability
-        churn_probability = self.model.predict_proba(X_scaled)[0][1]
+        churn_probability = self._predict_proba(bundle, X.reshape(1, -1))[0]
         
         # Determine risk level
-        if churn_probability < 0.3:
-            risk_level = "low"
-        elif churn_probability < 0.6:
-            risk_level = "medium"
-        else:
-            risk_level = "high"
+        risk_level = self.risk_level(churn_probability)
         
         # Identify risk factors
         risk_factors = self._identify_risk_factors(features, X)
@@ -115,43 +185,174 @@ class ChurnPredictor:
             "recommendations": recommendations
         }
     
-    def _prepare_features(self, features):
-        """Prepare features for prediction"""
-        feature_values = []
-        
-        # Extract features in the correct order
-        feature_values.append(features.get('contract_value', 10000))
-        feature_values.append(features.get('monthly_spend', 2000))
-        feature_values.append(features.get('total_licenses', 50))
-        feature_values.append(features.get('total_users', 100))
-        
-        # Calculate days since last support ticket
-        last_ticket = features.get('last_support_ticket')
-        if last_ticket:
-            if isinstance(last_ticket, str):
-                last_ticket = datetime.fromisoformat(last_ticket.replace('Z', '+00:00'))
-            days_since = (datetime.utcnow() - last_ticket).days
+    def predict_batch(self, features_list):
+        """
+        Predict churn for many clients with a single predict_proba call
+        
+        Args:
+            features_list: Client feature dicts, a DataFrame or dict of columns
+            
+        Returns:
+            list: One result dict per client, same shape as predict()
+        """
+        if len(features_list) == 0:
+            return []
+        
+        X = self._prepare_feature_matrix(features_list)
+        probabilities = self._predict_proba(self._handle.get(), X)
+        
+        risk_levels = self.risk_levels(probabilities)
+        
+        # Scatter each factor to the rows its mask selects, in predict() order
+        risk_factors = [[] for _ in range(len(X))]
+        for factor, mask in self._risk_factor_masks(X).items():
+            for i in np.flatnonzero(mask):
+                risk_factors[i].append(self._risk_factor(factor, X[i]))
+        
+        results = []
+        recommendation_cache = {}
+        for probability, risk_level, factors in zip(probabilities, risk_levels, risk_factors):
+            risk_level = str(risk_level)
+            key = (risk_level, tuple(f["factor"] for f in factors))
+            if key not in recommendation_cache:
+                recommendation_cache[key] = self._generate_recommendations(risk_level, factors)
+            
+            results.append({
+                "probability": float(probability),
+                "risk_level": risk_level,
+                "factors": factors,
+                "recommendations": list(recommendation_cache[key])
+            })
+        
+        return results
+    
+    def predict_proba_batch(self, features_list):
+        """
+        Predict churn probabilities for many clients at once
+        
+        Args:
+            features_list: Client feature dicts, a DataFrame or dict of columns
+            
+        Returns:
+            np.ndarray: Churn probability per client, in input order
+        """
+        if len(features_list) == 0:
+            return np.empty(0)
+        
+        X = self._prepare_feature_matrix(features_list)
+        
+        # One scaler pass and one predict_proba call for the whole batch
+        return self._predict_proba(self._handle.get(), X)
+    
+    def _predict_proba(self, bundle, X):
+        """Churn probabilities for a feature matrix from one model version"""
+        if 'compiled' in bundle:
+            # Built once per loaded version, not per request
+            evaluator = bundle.derived('compiled', lambda b: CompiledTreeEnsemble(b['compiled']))
+            return evaluator.predict_proba(X)[:, 1]
+        
+        # Versions published before models were compiled
+        return bundle['model'].predict_proba(bundle['scaler'].transform(X))[:, 1]
+    
+    def risk_level(self, probability):
+        """Get churn risk label for a probability"""
+        if probability < LOW_RISK_THRESHOLD:
+            return "low"
+        elif probability < HIGH_RISK_THRESHOLD:
+            return "medium"
         else:
-            days_since = 365
-        feature_values.append(days_since)
+            return "high"
+    
+    def risk_levels(self, probabilities):
+        """
+        Churn risk labels for many probabilities, e.g. predict_proba_batch output
         
-        # Support ticket frequency (estimated)
-        feature_values.append(features.get('support_ticket_frequency', 0.1))
+        Returns:
+            np.ndarray: "low", "medium" or "high" per probability
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        return np.select(
+            [probabilities < LOW_RISK_THRESHOLD, probabilities < HIGH_RISK_THRESHOLD],
+            ["low", "medium"],
+            "high"
+        )
+    
+    def _prepare_feature_matrix(self, features_list):
+        """
+        Build the (n_clients, n_features) matrix in feature_names order
         
-        # Payment history score (simulated)
-        feature_values.append(features.get('payment_history_score', 0.8))
+        Args:
+            features_list: Feature dicts (raw client data or
+                FeatureEngineer output), a DataFrame or a dict of columns
         
-        # Contract age in days
-        created_at = features.get('created_at', datetime.utcnow())
-        if isinstance(created_at, str):
-            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-        contract_age = (datetime.utcnow() - created_at).days
-        feature_values.append(contract_age)
+        Days since the last ticket and contract age are taken as given when
+        present (FeatureEngineer computes them), else derived from
+        last_support_ticket and created_at, parsed per column.
+        """
+        c = FeatureColumns(features_list)
+        now = utc_now()
+        
+        days_since = c.numeric('days_since_last_ticket')
+        missing = np.isnan(days_since)
+        if missing.any():
+            days_since[missing] = days_between(c.timestamps('last_support_ticket')[missing], now)
         
-        # Engagement score (simulated)
-        feature_values.append(features.get('engagement_score', 0.7))
+        contract_age = c.numeric('contract_age_days')
+        missing = np.isnan(contract_age)
+        if missing.any():
+            contract_age[missing] = days_between(c.timestamps('created_at')[missing], now)
         
-        return np.array(feature_values)
+        return np.column_stack([
+            c.numeric('contract_value', 10000),
+            c.numeric('monthly_spend', 2000),
+            c.numeric('total_licenses', 50),
+            c.numeric('total_users', 100),
+            np.nan_to_num(days_since, nan=365),  # No ticket on record
+            c.numeric('support_ticket_frequency', 0.1),  # Estimated
+            c.numeric('payment_history_score', 0.8),  # Simulated
+            np.nan_to_num(contract_age, nan=0),
+            c.numeric('engagement_score', 0.7)  # Simulated
+        ])
+    
+    def _prepare_features(self, features):
+        """Prepare features for prediction"""
+        return self._prepare_feature_matrix([features])[0]
+    
+    def _risk_factor_masks(self, X):
+        """Vectorized risk factor checks over a feature matrix"""
+        return {
+            "Low engagement": X[:, 4] > 60,
+            "High support burden": X[:, 5] > 0.5,
+            "Underutilization": X[:, 1] < X[:, 0] * 0.05,
+            "Declining engagement": X[:, 8] < 0.5
+        }
+    
+    def _risk_factor(self, factor, x):
+        """Build the risk factor entry for one client's feature row"""
+        if factor == "Low engagement":
+            return {
+                "factor": "Low engagement",
+                "severity": "high",
+                "description": f"No support tickets in {int(x[4])} days"
+            }
+        elif factor == "High support burden":
+            return {
+                "factor": "High support burden",
+                "severity": "medium",
+                "description": "Above average support ticket frequency"
+            }
+        elif factor == "Underutilization":
+            return {
+                "factor": "Underutilization",
+                "severity": "medium",
+                "description": "Monthly spend much lower than contract value"
+            }
+        else:
+            return {
+                "factor": "Declining engagement",
+                "severity": "high",
+                "description": "User engagement trending downward"
+            }
     
     def _identify_risk_factors(self, features, X):
         """Identify key risk factors contributing to churn"""
@@ -159,32 +360,16 @@ class ChurnPredictor:
         
         # Check various risk indicators
         if X[4] > 60:  # Days since last ticket
-            factors.append({
-                "factor": "Low engagement",
-                "severity": "high",
-                "description": f"No support tickets in {int(X[4])} days"
-            })
+            factors.append(self._risk_factor("Low engagement", X))
         
         if X[5] > 0.5:  # High ticket frequency
-            factors.append({
-                "factor": "High support burden",
-                "severity": "medium",
-                "description": "Above average support ticket frequency"
-            })
+            factors.append(self._risk_factor("High support burden", X))
         
         if X[1] < features.get('contract_value', 10000) * 0.05:  # Low spend relative to contract
-            factors.append({
-                "factor": "Underutilization",
-                "severity": "medium",
-                "description": "Monthly spend much lower than contract value"
-            })
+            factors.append(self._risk_factor("Underutilization", X))
         
         if X[8] < 0.5:  # Low engagement score
-            factors.append({
-                "factor": "Declining engagement",
-                "severity": "high",
-                "description": "User engagement trending downward"
-            })
+            factors.append(self._risk_factor("Declining engagement", X))
         
         return factors
     
@@ -0,0 +1,238 @@
+"""
+Compiled Tree Ensembles
+Flattens trained gradient boosting models into NumPy arrays and scores
+them without scikit-learn
+"""
+
+import math
+
+import numpy as np
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 1024
+
+# Leaf bitmask dtype -> (float type holding one set bit exactly, its integer
+# view, mantissa bits, exponent bias)
+_MASK_TYPES = {
+    32: (np.uint32, np.float32, np.int32, 23, 127),
+    64: (np.uint64, np.float64, np.int64, 52, 1023)
+}
+
+def _expit(x):
+    # libm exp, as scipy.special.expit uses; np.exp's SIMD kernels can
+    # differ from it in the last bit
+    try:
+        return 1.0 / (1.0 + math.exp(-x))
+    except OverflowError:
+        return 0.0
+
+def _float32_floor(thresholds):
+    """Largest float32 <= each float64 threshold"""
+    rounded = thresholds.astype(np.float32)
+    above = rounded > thresholds
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+def export_gradient_boosting(model, scaler=None):
+    """
+    Flatten a fitted binary GradientBoostingClassifier
+
+    Uses the QuickScorer layout: each tree's leaves are numbered left to
+    right and every split stores a bitmask of the leaves it rules out when
+    a row goes right. Splits are grouped by feature and sorted by
+    threshold, and the masks are pre-combined per threshold prefix, so
+    scoring a feature is one searchsorted plus one row lookup.
+
+    Args:
+        model: Fitted sklearn GradientBoostingClassifier (two classes, at
+            most 64 leaves per tree)
+        scaler: Optional fitted StandardScaler applied before the trees
+
+    Returns:
+        dict: Plain NumPy arrays and scalars; pickles and loads with
+            NumPy alone
+    """
+    from sklearn.dummy import DummyClassifier
+
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Only binary gradient boosting models can be compiled")
+
+    if isinstance(model.init_, str) and model.init_ == 'zero':
+        init_raw = 0.0
+    elif isinstance(model.init_, DummyClassifier):
+        # The prior is constant, so any row gives the same raw prediction
+        init_raw = float(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0])
+    else:
+        raise ValueError("Only models with a constant init estimator can be compiled")
+
+    trees = [estimator[0].tree_ for estimator in model.estimators_]
+    max_leaves = max(tree.n_leaves for tree in trees)
+    if max_leaves > 64:
+        raise ValueError(f"Trees with more than 64 leaves cannot be compiled (got {max_leaves})")
+    leaf_bits = 32 if max_leaves <= 32 else 64
+    mask_type = _MASK_TYPES[leaf_bits][0]
+    all_leaves = (1 << leaf_bits) - 1
+
+    n_features = model.n_features_in_
+    n_trees = len(trees)
+    leaf_values = np.zeros((n_trees, leaf_bits))
+    splits = [[] for _ in range(n_features)]
+
+    for tree_index, tree in enumerate(trees):
+        leaves = []
+
+        def walk(node):
+            if tree.children_left[node] == -1:
+                leaf_values[tree_index, len(leaves)] = tree.value[node, 0, 0]
+                leaves.append(node)
+                return (1 << (len(leaves) - 1))
+
+            left_leaves = walk(tree.children_left[node])
+            right_leaves = walk(tree.children_right[node])
+            splits[tree.feature[node]].append(
+                (tree.threshold[node], tree_index, all_leaves & ~left_leaves)
+            )
+            return left_leaves | right_leaves
+
+        walk(0)
+
+    split_features, thresholds, threshold_offsets, tables = [], [], [0], []
+    for feature, feature_splits in enumerate(splits):
+        if not feature_splits:
+            continue
+        feature_splits.sort(key=lambda split: split[0])
+
+        # Row p holds the combined masks once the first p thresholds are passed
+        table = np.full((len(feature_splits) + 1, n_trees), all_leaves, dtype=mask_type)
+        for p, (_, tree_index, mask) in enumerate(feature_splits, start=1):
+            table[p] = table[p - 1]
+            table[p, tree_index] &= mask_type(mask)
+
+        split_features.append(feature)
+        thresholds.append(_float32_floor(np.array([split[0] for split in feature_splits])))
+        threshold_offsets.append(threshold_offsets[-1] + len(feature_splits))
+        tables.append(table)
+
+    scaler_mean = np.zeros(n_features)
+    scaler_scale = np.ones(n_features)
+    if scaler is not None:
+        if scaler.mean_ is not None:
+            scaler_mean = np.asarray(scaler.mean_, dtype=np.float64)
+        if scaler.scale_ is not None:
+            scaler_scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    return {
+        'format_version': FORMAT_VERSION,
+        'n_features': int(n_features),
+        'n_trees': int(n_trees),
+        'leaf_bits': leaf_bits,
+        'learning_rate': float(model.learning_rate),
+        'init_raw': init_raw,
+        'split_features': np.array(split_features, dtype=np.int32),
+        'thresholds': np.concatenate(thresholds) if thresholds else np.empty(0, np.float32),
+        'threshold_offsets': np.array(threshold_offsets, dtype=np.int64),
+        'tables': np.concatenate(tables) if tables else np.empty((0, n_trees), mask_type),
+        'leaf_values': leaf_values.ravel(),
+        'scaler_mean': scaler_mean,
+        'scaler_scale': scaler_scale
+    }
+
+class CompiledTreeEnsemble:
+    """
+    Pure-NumPy evaluator for arrays produced by export_gradient_boosting
+
+    Reproduces sklearn's arithmetic step for step: features are scaled in
+    float64 and compared as float32, and tree outputs are accumulated in
+    boosting order, so probabilities match predict_proba exactly.
+    """
+
+    def __init__(self, arrays):
+        if arrays.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format: {arrays.get('format_version')}")
+
+        # Memory-mapped arrays are viewed as plain ndarrays, so results
+        # don't come back as np.memmap
+        arrays = {key: np.asarray(value) if isinstance(value, np.ndarray) else value
+                  for key, value in arrays.items()}
+
+        self.n_features = arrays['n_features']
+        self.n_trees = arrays['n_trees']
+        self.learning_rate = arrays['learning_rate']
+        self.init_raw = arrays['init_raw']
+        self.leaf_values = arrays['leaf_values']
+        self.scaler_mean = arrays['scaler_mean']
+        self.scaler_scale = arrays['scaler_scale']
+
+        leaf_bits = arrays['leaf_bits']
+        self._mask_type, self._float_type, self._int_type, self._shift, bias = _MASK_TYPES[leaf_bits]
+        self._all_leaves = self._mask_type((1 << leaf_bits) - 1)
+        # Offsets from a lowest set bit's float exponent to its leaf value
+        self._leaf_offsets = (np.arange(self.n_trees) * leaf_bits - bias).astype(self._int_type)
+
+        # (feature, sorted thresholds, prefix mask table) per split feature
+        offsets = arrays['threshold_offsets']
+        self._features = [
+            (
+                int(feature),
+                arrays['thresholds'][offsets[i]:offsets[i + 1]],
+                arrays['tables'][offsets[i] + i:offsets[i + 1] + i + 1]
+            )
+            for i, feature in enumerate(arrays['split_features'])
+        ]
+
+    def decision_function(self, X):
+        """
+        Raw (log-odds) predictions
+
+        Args:
+            X (np.ndarray): Unscaled features, shape (n_features,) or
+                (n_samples, n_features)
+
+        Returns:
+            np.ndarray: Raw prediction per row
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+
+        X = ((X - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+
+        raw = np.empty(len(X))
+        for start in range(0, len(X), CHUNK_SIZE):
+            raw[start:start + CHUNK_SIZE] = self._decision_chunk(X[start:start + CHUNK_SIZE])
+        return raw
+
+    def _decision_chunk(self, X):
+        # Start with every leaf reachable and knock out the ones each
+        # passed threshold rules out
+        reachable = np.full((len(X), self.n_trees), self._all_leaves)
+        for feature, thresholds, table in self._features:
+            reachable &= table[np.searchsorted(thresholds, X[:, feature])]
+
+        # The exit leaf is the leftmost one still reachable: isolate the
+        # lowest set bit and read its index off the float exponent
+        reachable &= self._mask_type(0) - reachable
+        leaf = reachable.astype(self._float_type).view(self._int_type) >> self._shift
+        leaf += self._leaf_offsets
+
+        # Accumulate row by row in boosting order, as sklearn does
+        terms = np.empty((self.n_trees + 1, len(X)))
+        terms[0] = self.init_raw
+        np.multiply(self.learning_rate, self.leaf_values.take(leaf.T), out=terms[1:])
+        return np.cumsum(terms, axis=0)[-1]
+
+    def predict_proba(self, X):
+        """
+        Class probabilities, shape (n_samples, 2) like sklearn
+
+        Args:
+            X (np.ndarray): Unscaled features
+
+        Returns:
+            np.ndarray: [P(no churn), P(churn)] per row
+        """
+        raw = self.decision_function(X)
+        positive = np.fromiter(map(_expit, raw.tolist()), dtype=np.float64, count=len(raw))
+        return np.column_stack([1.0 - positive, positive])
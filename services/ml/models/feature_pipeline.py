@@ -0,0 +1,162 @@
+"""
+Feature Pipeline
+Columnar access to client and license records shared by churn, health and recommendations
+"""
+
+import sys
+import time
+import warnings
+from collections.abc import Mapping
+
+import numpy as np
+
+NANOSECONDS_PER_DAY = 86400 * 10**9
+
+
+class FeatureColumns:
+    """
+    Records as columns, whatever shape they arrive in
+
+    Accepts a DataFrame, a dict of columns or a list of dicts, and hands
+    back one NumPy array per field: numbers with defaults filled in, and
+    timestamps parsed once per column as datetime64 instead of one
+    datetime.fromisoformat() per value.
+
+    Nothing here imports pandas unless it is given a DataFrame or values
+    NumPy can't parse, so the compiled churn path stays pandas-free.
+    """
+
+    def __init__(self, records):
+        """
+        Args:
+            records: DataFrame, dict of columns or list of dicts
+        """
+        self._frame = self._columns = self._records = None
+        if _is_frame(records):
+            self._frame = records
+            self.n = len(records)
+        elif isinstance(records, Mapping):
+            self._columns = records
+            self.n = len(next(iter(records.values()))) if records else 0
+        else:
+            self._records = records if isinstance(records, list) else list(records)
+            self.n = len(self._records)
+
+    def __len__(self):
+        return self.n
+
+    def raw(self, name):
+        """
+        A field's values as given
+
+        Returns:
+            np.ndarray: One value per record (None where a dict lacks the
+                field), or None if a DataFrame or dict of columns doesn't
+                have it
+        """
+        if self._frame is not None:
+            return self._frame[name].to_numpy() if name in self._frame else None
+        if self._columns is not None:
+            return np.asarray(self._columns[name]) if name in self._columns else None
+        values = np.empty(self.n, dtype=object)
+        values[:] = [r.get(name) for r in self._records]
+        return values
+
+    def numeric(self, name, default=np.nan):
+        """
+        A field as floats
+
+        Missing, None and non-numeric values become the default.
+        """
+        if self._records is not None:
+            values = [r.get(name) for r in self._records]
+        else:
+            values = self.raw(name)
+            if values is None:
+                return np.full(self.n, default, dtype=float)
+        try:
+            values = np.array(values, dtype=float)
+        except (TypeError, ValueError):
+            import pandas as pd
+            values = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+        if not np.isnan(default):
+            values[np.isnan(values)] = default
+        return values
+
+    def timestamps(self, name):
+        """
+        A field as UTC datetime64[ns]
+
+        ISO 8601 strings (with or without an offset or 'Z'), datetimes and
+        Timestamps are accepted; naive values are taken as UTC. Missing or
+        unparseable values are NaT.
+        """
+        values = self.raw(name)
+        if values is None:
+            return np.full(self.n, np.datetime64('NaT'), dtype='datetime64[ns]')
+        return parse_timestamps(values)
+
+
+def parse_timestamps(values):
+    """Parse a column of timestamps in one call (see FeatureColumns.timestamps)"""
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]')
+
+    parsed = _parse_naive(values)
+    if parsed is None and values.dtype.kind in 'OU':
+        # Trailing 'Z' (UTC) is the common offset in JSON payloads
+        parsed = _parse_naive(np.array(
+            [v[:-1] if isinstance(v, str) and v.endswith('Z') else v for v in values.tolist()],
+            dtype=values.dtype
+        ))
+    if parsed is None:
+        parsed = _parse_with_pandas(values)
+    return parsed
+
+
+def utc_now():
+    """The current UTC time as a naive datetime64[ns]"""
+    return np.datetime64(time.time_ns(), 'ns')
+
+
+def days_between(start, end):
+    """
+    Whole days from start to end, rounded down like timedelta.days
+
+    Returns:
+        np.ndarray: Float days, NaN where either side is NaT
+    """
+    start = np.asarray(start, dtype='datetime64[ns]')
+    end = np.asarray(end, dtype='datetime64[ns]')
+    delta = (end - start).astype(np.int64)
+    days = np.floor_divide(delta, NANOSECONDS_PER_DAY).astype(float)
+    days[np.isnat(start) | np.isnat(end)] = np.nan
+    return days
+
+
+def _is_frame(records):
+    # Without pandas loaded, nothing can be a DataFrame
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(records, pd.DataFrame)
+
+
+def _parse_naive(values):
+    """NumPy's ISO 8601 parser for naive values and datetimes, or None if any value needs more"""
+    try:
+        with warnings.catch_warnings():
+            # NumPy warns (and will raise) on UTC offsets; pandas handles those
+            warnings.simplefilter('error', DeprecationWarning)
+            return values.astype('datetime64[ns]')
+    except (TypeError, ValueError, OverflowError, DeprecationWarning):
+        return None
+
+
+def _parse_with_pandas(values):
+    """UTC offsets, tz-aware datetimes and unparseable values (NaT)"""
+    import pandas as pd
+
+    # An object column is parsed as given, without pandas' type inference pass first
+    series = pd.Series(values, dtype=object if values.dtype == object else None)
+    parsed = pd.to_datetime(series, errors='coerce', utc=True, format='ISO8601')
+    return parsed.dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
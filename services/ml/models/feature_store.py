@@ -0,0 +1,575 @@
+"""
+Feature Store
+Extracted features keyed by entity id and version, in memory and in memory-mapped snapshots
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .feature_pipeline import parse_timestamps
+
+# Durable, under the streaming anomaly state next to trained_models/
+DEFAULT_STORE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'state', 'features'
+)
+CURRENT_FILE = 'CURRENT'
+COLUMNS_FILE = 'columns.json'
+SNAPSHOT_NAME = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+# Version of an entity without an updated_at; it never matches a stored entry
+NO_VERSION = np.iinfo(np.int64).min
+_NO_FLOOR = (NO_VERSION, float('-inf'))
+# Last use of a free slot, so eviction never picks one
+_UNUSED = np.iinfo(np.int64).max
+
+class Snapshot:
+    """One on-disk snapshot, its arrays memory-mapped and sorted by id"""
+
+    ARRAYS = ('ids', 'versions', 'stored_at', 'values')
+
+    def __init__(self, name, path, mmap_mode='r'):
+        self.name = name
+        self.path = path
+        for key in self.ARRAYS:
+            setattr(self, key, np.load(os.path.join(path, f'{key}.npy'), mmap_mode=mmap_mode))
+        with open(os.path.join(path, COLUMNS_FILE)) as f:
+            self.columns = json.load(f)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find(self, ids):
+        """
+        Row of each id, by binary search over the sorted ids
+
+        Returns:
+            tuple: (row positions, mask of ids present)
+        """
+        if not len(self.ids):
+            return np.zeros(len(ids), dtype=np.intp), np.zeros(len(ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return positions, self.ids[positions] == ids
+
+class MemoryTier:
+    """
+    LRU of feature rows held in preallocated arrays
+
+    A dict maps entity ids to slots, and versions, store times, last use
+    and feature values are arrays indexed by slot. A batch costs one dict
+    lookup per id; everything else is array indexing. Not thread-safe on
+    its own (FeatureStore holds a lock around it).
+    """
+
+    def __init__(self, width, capacity):
+        self.width = width
+        self.capacity = capacity
+        self.clear()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def clear(self):
+        self.slots = {}
+        self._keys = np.empty(0, dtype=object)
+        self._free = []
+        self._tick = 0
+        self.versions = np.empty(0, dtype=np.int64)
+        self.stored_at = np.empty(0)
+        self.last_used = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, self.width))
+
+    def find(self, ids):
+        """Slot of each id, -1 where it isn't held"""
+        get = self.slots.get
+        return np.fromiter((get(entity_id, -1) for entity_id in ids), dtype=np.intp, count=len(ids))
+
+    def touch(self, slots):
+        self._tick += 1
+        self.last_used[slots] = self._tick
+
+    def put(self, ids, versions, stored_at, values):
+        if len(ids) > self.capacity:
+            ids, versions, values = ids[-self.capacity:], versions[-self.capacity:], values[-self.capacity:]
+        slots = self.find(ids)
+        # Rows being replaced are the most recent, so they aren't evicted
+        self.touch(slots[slots >= 0])
+
+        missing = np.flatnonzero(slots < 0)
+        if len(missing):
+            new_ids = [ids[i] for i in missing]
+            unique = list(dict.fromkeys(new_ids))
+            new = dict(zip(unique, self._allocate(len(unique))))
+            self.slots.update(new)
+            self._keys[list(new.values())] = unique
+            slots[missing] = [new[entity_id] for entity_id in new_ids]
+
+        self.versions[slots] = versions
+        self.stored_at[slots] = stored_at
+        self.values[slots] = values
+        self.touch(slots)
+
+    def remove(self, ids):
+        for entity_id in ids:
+            slot = self.slots.pop(entity_id, None)
+            if slot is not None:
+                self._keys[slot] = None
+                self.last_used[slot] = _UNUSED
+                self._free.append(slot)
+
+    def _allocate(self, n):
+        short = n - len(self._free)
+        size = len(self._keys)
+        if short > 0 and size < self.capacity:
+            grown = min(self.capacity, max(2 * size, size + short))
+            self._keys = np.concatenate([self._keys, np.empty(grown - size, dtype=object)])
+            self.versions = np.concatenate([self.versions, np.zeros(grown - size, dtype=np.int64)])
+            self.stored_at = np.concatenate([self.stored_at, np.zeros(grown - size)])
+            self.last_used = np.concatenate([self.last_used, np.full(grown - size, _UNUSED)])
+            self.values = np.concatenate([self.values, np.empty((grown - size, self.width))])
+            self._free.extend(range(grown - 1, size - 1, -1))
+            short = n - len(self._free)
+        if short > 0:
+            # Full: evict the least recently used rows
+            for slot in np.argpartition(self.last_used, short - 1)[:short].tolist():
+                del self.slots[self._keys[slot]]
+                self._free.append(slot)
+        allocated = self._free[-n:]
+        del self._free[-n:]
+        return allocated
+
+class FeatureStore:
+    """
+    Two-tier cache of extracted feature rows
+
+    Rows are keyed by entity id and version, the entity's ``updated_at``
+    in the API database as int64 nanoseconds. A lookup with a version only
+    hits a row stored for that version or a later one, so a changed entity
+    misses until its features are recomputed. The version is trusted: a
+    caller must send the entity's fields and ``updated_at`` as read from
+    the database together, or a payload edited without a newer
+    ``updated_at`` is served the features stored for the original.
+
+    The memory tier is an LRU of recent rows. Snapshots write every live
+    row to ``<root>/<name>/<snapshot>/`` as ``.npy`` arrays sorted by id,
+    staged in a hidden directory and published by replacing the CURRENT
+    pointer. They're memory-mapped read-only, so every worker process
+    shares the same page-cache pages and picks up a snapshot another
+    process wrote. Rows in both tiers expire ``ttl`` seconds after they
+    were computed, which also bounds how stale time-based features get.
+    """
+
+    def __init__(self, name, columns, root=None, cache_size=100000, ttl=3600,
+                 keep_snapshots=2, refresh_interval=30.0, clock=time.time):
+        """
+        Args:
+            name (str): Feature set name, e.g. 'client'
+            columns (list): Feature names, in stored column order
+            root (str): Snapshot directory; defaults to FEATURE_STORE_DIR
+            cache_size (int): Rows kept in memory
+            ttl (float): Seconds a row stays valid; None keeps rows until
+                they're invalidated
+            keep_snapshots (int): Snapshots kept on disk
+            refresh_interval (float): Seconds between checks for a newer
+                snapshot written by another process
+            clock: Wall-clock time source (shared across processes)
+        """
+        self.name = name
+        self.columns = list(columns)
+        self.root = root or os.getenv('FEATURE_STORE_DIR', DEFAULT_STORE_DIR)
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.keep_snapshots = keep_snapshots
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+
+        self._memory = MemoryTier(len(self.columns), cache_size)
+        # Entity id -> (oldest version still valid, time its rows were
+        # dropped), from invalidations; checked against snapshot rows
+        self._floors = {}
+        # Rows stored before this were all invalidated
+        self._cleared_at = float('-inf')
+        self._snapshot = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    @property
+    def directory(self):
+        return os.path.join(self.root, self.name)
+
+    def put_many(self, ids, versions, values):
+        """
+        Store feature rows
+
+        Args:
+            ids (list): Entity ids
+            versions (list): updated_at per entity (datetimes, ISO strings
+                or int64 nanoseconds)
+            values: DataFrame with the store's columns, or a 2-D array in
+                column order
+        """
+        ids = _entity_ids(ids)
+        versions = _versions(versions, len(ids))
+        values = self._matrix(values)
+        if len(values) != len(ids):
+            raise ValueError(f"Got {len(values)} feature rows for {len(ids)} ids")
+
+        now = self.clock()
+        with self._lock:
+            keep = versions != NO_VERSION
+            if self._floors:
+                # Versions older than an invalidation are stale already
+                keep &= versions >= np.array([self._floors.get(entity_id, _NO_FLOOR)[0] for entity_id in ids],
+                                             dtype=np.int64)
+            rows = np.flatnonzero(keep)
+            self._memory.put([ids[i] for i in rows], versions[rows], now, values[rows])
+            self._puts += len(rows)
+
+    def put(self, entity_id, version, features):
+        """Store one entity's features (a dict by column, or a row)"""
+        if isinstance(features, dict):
+            features = [[features.get(column, np.nan) for column in self.columns]]
+        self.put_many([entity_id], [version], np.asarray(features, dtype=float).reshape(1, -1))
+
+    def get_many(self, ids, versions=None):
+        """
+        Look up feature rows, memory first, then the snapshot
+
+        Args:
+            ids (list): Entity ids
+            versions (list): Minimum version per entity; None accepts any
+                stored version
+
+        Returns:
+            tuple: (n x len(columns) float array, NaN where missing; bool
+                array of the rows found)
+        """
+        ids = _entity_ids(ids)
+        versions = None if versions is None else _versions(versions, len(ids))
+        values = np.full((len(ids), len(self.columns)), np.nan)
+        found = np.zeros(len(ids), dtype=bool)
+        now = self.clock()
+        self._maybe_refresh(now)
+
+        with self._lock:
+            if len(self._memory):
+                memory = self._memory
+                slots = memory.find(ids)
+                held = np.flatnonzero(slots >= 0)
+                slots = slots[held]
+                valid = self._live(memory.stored_at[slots], now)
+                if versions is not None:
+                    valid &= memory.versions[slots] >= versions[held]
+                rows, slots = held[valid], slots[valid]
+                values[rows] = memory.values[slots]
+                found[rows] = True
+                memory.touch(slots)
+            memory_hits = int(found.sum())
+            snapshot, floors = self._snapshot, dict(self._floors) if self._floors else {}
+
+        snapshot_hits = 0
+        if snapshot is not None and not found.all():
+            missing = np.flatnonzero(~found)
+            missing_ids = [ids[i] for i in missing]
+            positions, present = snapshot.find(np.array(missing_ids, dtype=str))
+            valid = present & self._live(snapshot.stored_at[positions], now)
+            if versions is not None:
+                valid &= snapshot.versions[positions] >= versions[missing]
+            valid &= self._above_floors(snapshot, positions, missing_ids, floors)
+            rows = missing[valid]
+            values[rows] = snapshot.values[positions[valid]]
+            found[rows] = True
+            snapshot_hits = len(rows)
+
+        with self._lock:
+            self._memory_hits += memory_hits
+            self._snapshot_hits += snapshot_hits
+            self._misses += len(ids) - memory_hits - snapshot_hits
+
+        return values, found
+
+    def get(self, entity_id, version=None):
+        """One entity's features as a dict, or None if not stored"""
+        values, found = self.get_many([entity_id], None if version is None else [version])
+        return dict(zip(self.columns, values[0].tolist())) if found[0] else None
+
+    def get_or_compute(self, ids, versions, compute):
+        """
+        Features for a batch, computing only what isn't stored
+
+        Args:
+            ids (list): Entity ids (None for entities that can't be cached)
+            versions (list): updated_at per entity (None likewise)
+            compute: Called with the positions of the rows to compute;
+                returns their features as a DataFrame or 2-D array
+
+        Returns:
+            pd.DataFrame: One row per entity, in the store's columns
+        """
+        n = len(ids)
+        cacheable = np.array([i is not None and v is not None for i, v in zip(ids, versions)], dtype=bool)
+        keys = np.flatnonzero(cacheable)
+        values = np.full((n, len(self.columns)), np.nan)
+        found = np.zeros(n, dtype=bool)
+
+        if len(keys):
+            cached, hit = self.get_many([ids[i] for i in keys], [versions[i] for i in keys])
+            values[keys[hit]] = cached[hit]
+            found[keys[hit]] = True
+
+        todo = np.flatnonzero(~found)
+        if len(todo):
+            values[todo] = self._matrix(compute(todo.tolist()))
+            store = todo[cacheable[todo]]
+            if len(store):
+                self.put_many([ids[i] for i in store], [versions[i] for i in store], values[store])
+
+        return pd.DataFrame(values, columns=self.columns)
+
+    def invalidate(self, ids=None):
+        """Drop entities' rows from both tiers (all of them without ids)"""
+        with self._lock:
+            now = self.clock()
+            if ids is None:
+                self._memory.clear()
+                self._floors.clear()
+                self._cleared_at = now
+                return
+            ids = _entity_ids(ids)
+            self._memory.remove(ids)
+            for entity_id in ids:
+                self._floors[entity_id] = (self._floors.get(entity_id, _NO_FLOOR)[0], now)
+
+    def invalidate_stale(self, ids, updated_at):
+        """
+        Drop rows older than each entity's updated_at in the API database
+
+        Later lookups and puts for an entity ignore versions before its
+        updated_at, in memory and in the snapshot.
+
+        Returns:
+            int: Rows dropped from memory
+        """
+        ids = _entity_ids(ids)
+        versions = _versions(updated_at, len(ids))
+        with self._lock:
+            stale = []
+            slots = self._memory.find(ids)
+            for entity_id, version, slot in zip(ids, versions.tolist(), slots.tolist()):
+                if version == NO_VERSION:
+                    continue
+                floor_version, dropped_at = self._floors.get(entity_id, _NO_FLOOR)
+                self._floors[entity_id] = (max(version, floor_version), dropped_at)
+                if slot >= 0 and self._memory.versions[slot] < version:
+                    stale.append(entity_id)
+            self._memory.remove(stale)
+        return len(stale)
+
+    def snapshot(self, name=None):
+        """
+        Write every live row, memory and current snapshot merged, to a new
+        snapshot and make it current
+
+        Returns:
+            str: Snapshot name
+        """
+        name = name or datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+        if not SNAPSHOT_NAME.match(name):
+            raise ValueError(f"Invalid snapshot name: {name}")
+        now = self.clock()
+
+        with self._lock:
+            memory = self._memory
+            slots = np.fromiter(memory.slots.values(), dtype=np.intp, count=len(memory))
+            live = self._live(memory.stored_at[slots], now)
+            ids = np.array(list(memory.slots), dtype=str)[live]
+            slots = slots[live]
+            versions, stored_at, values = memory.versions[slots], memory.stored_at[slots], memory.values[slots]
+            snapshot, floors = self._snapshot, dict(self._floors)
+
+        if snapshot is not None and len(snapshot):
+            # Older rows the memory tier doesn't replace
+            positions = np.arange(len(snapshot))
+            keep = ~np.isin(snapshot.ids, ids) & self._live(snapshot.stored_at, now) & \
+                self._above_floors(snapshot, positions, snapshot.ids.tolist(), floors)
+            ids = np.concatenate([ids, snapshot.ids[keep]])
+            versions = np.concatenate([versions, snapshot.versions[keep]])
+            stored_at = np.concatenate([stored_at, snapshot.stored_at[keep]])
+            values = np.concatenate([values, snapshot.values[keep]])
+
+        order = np.argsort(ids, kind='stable')
+        arrays = {'ids': ids[order], 'versions': versions[order], 'stored_at': stored_at[order],
+                  'values': values[order]}
+
+        os.makedirs(self.directory, exist_ok=True)
+        final_dir = os.path.join(self.directory, name)
+        if os.path.exists(final_dir):
+            raise ValueError(f"Snapshot {name} of feature set '{self.name}' already exists")
+
+        staging_dir = tempfile.mkdtemp(prefix=f'.{name}-', dir=self.directory)
+        try:
+            for key, array in arrays.items():
+                np.save(os.path.join(staging_dir, f'{key}.npy'), array)
+            with open(os.path.join(staging_dir, COLUMNS_FILE), 'w') as f:
+                json.dump(self.columns, f)
+            os.rename(staging_dir, final_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        pointer = os.path.join(self.directory, CURRENT_FILE)
+        tmp_pointer = f'{pointer}.{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_pointer, 'w') as f:
+            f.write(name)
+        os.replace(tmp_pointer, pointer)
+
+        loaded = Snapshot(name, final_dir)
+        with self._lock:
+            self._snapshot = loaded
+            self._checked_at = now
+            # Invalidated rows aren't in the new snapshot
+            for entity_id, version in floors.items():
+                if self._floors.get(entity_id) == version:
+                    del self._floors[entity_id]
+        self._prune(name)
+        return name
+
+    def load_snapshot(self):
+        """
+        Map the current snapshot, if there is one with this store's columns
+
+        Returns:
+            str: Snapshot name, or None
+        """
+        loaded = None
+        pointer = os.path.join(self.directory, CURRENT_FILE)
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                name = f.read().strip()
+            current = self._snapshot
+            if current is not None and current.name == name:
+                loaded = current
+            elif name and os.path.isdir(os.path.join(self.directory, name)):
+                loaded = Snapshot(name, os.path.join(self.directory, name))
+                # Rows of a different feature definition are useless
+                if loaded.columns != self.columns:
+                    loaded = None
+
+        with self._lock:
+            self._snapshot = loaded
+            self._checked_at = self.clock()
+        return loaded.name if loaded is not None else None
+
+    def list_snapshots(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            s for s in os.listdir(self.directory)
+            if not s.startswith('.') and os.path.isdir(os.path.join(self.directory, s))
+        )
+
+    def stats(self):
+        """
+        Lookups since creation or the last reset
+
+        Returns:
+            dict: memory_hits, snapshot_hits, misses, hit_rate, puts,
+                memory_rows, and the current snapshot's name and row count
+        """
+        with self._lock:
+            lookups = self._memory_hits + self._snapshot_hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "snapshot_hits": self._snapshot_hits,
+                "misses": self._misses,
+                "hit_rate": (self._memory_hits + self._snapshot_hits) / lookups if lookups else 0.0,
+                "puts": self._puts,
+                "memory_rows": len(self._memory),
+                "snapshot": self._snapshot.name if self._snapshot is not None else None,
+                "snapshot_rows": len(self._snapshot) if self._snapshot is not None else 0
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_counters()
+
+    def _reset_counters(self):
+        self._memory_hits = 0
+        self._snapshot_hits = 0
+        self._misses = 0
+        self._puts = 0
+
+    def _matrix(self, values):
+        if isinstance(values, pd.DataFrame):
+            missing = [column for column in self.columns if column not in values]
+            if missing:
+                raise ValueError(f"Features missing columns {missing}")
+            return values[self.columns].to_numpy(dtype=float)
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 2 or values.shape[1] != len(self.columns):
+            raise ValueError(f"Expected rows of {len(self.columns)} features, got shape {values.shape}")
+        return values
+
+    def _live(self, stored_at, now):
+        """Rows stored at these times that haven't expired or been cleared"""
+        live = stored_at > self._cleared_at
+        if self.ttl is not None:
+            live &= now - stored_at < self.ttl
+        return live
+
+    def _above_floors(self, snapshot, positions, ids, floors):
+        """Snapshot rows that no invalidation of their entity ruled out"""
+        valid = np.ones(len(positions), dtype=bool)
+        if not floors:
+            return valid
+        index = pd.Index(list(floors)).get_indexer(ids)
+        limited = index >= 0
+        limits = list(floors.values())
+        floor_versions = np.array([limits[i][0] for i in index[limited]], dtype=np.int64)
+        dropped_at = np.array([limits[i][1] for i in index[limited]], dtype=float)
+        rows = positions[limited]
+        valid[limited] = (snapshot.versions[rows] >= floor_versions) & (snapshot.stored_at[rows] > dropped_at)
+        return valid
+
+    def _maybe_refresh(self, now):
+        """Pick up a snapshot another process published"""
+        checked_at = self._checked_at
+        if checked_at is not None and (self.refresh_interval is None or now - checked_at < self.refresh_interval):
+            return
+        self._checked_at = now
+        self.load_snapshot()
+
+    def _prune(self, current):
+        # Oldest first by when they were written, since custom names don't
+        # sort by age. Mapped arrays of a removed snapshot stay readable
+        # until unmapped
+        old = sorted(
+            (s for s in self.list_snapshots() if s != current),
+            key=lambda s: os.stat(os.path.join(self.directory, s)).st_mtime_ns
+        )
+        for name in old[:max(len(old) - self.keep_snapshots + 1, 0)]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+def _entity_ids(ids):
+    """Entity ids as strings, so ids from JSON and the database compare equal"""
+    return [str(entity_id) for entity_id in ids]
+
+def _versions(values, n):
+    """Versions as int64 nanoseconds, NO_VERSION where missing"""
+    values = np.asarray(values) if len(values) else np.zeros(0, dtype=np.int64)
+    if len(values) != n:
+        raise ValueError(f"Got {len(values)} versions for {n} ids")
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int64)
+    parsed = parse_timestamps(values)
+    versions = parsed.view(np.int64).copy()
+    versions[np.isnat(parsed)] = NO_VERSION
+    return versions
@@ -6,6 +6,35 @@ Calculates comprehensive health scores for clients
 import numpy as np
 from datetime import datetime, timedelta
 
+from .feature_pipeline import FeatureColumns
+
+# Value used for an input the client data doesn't have
+DEFAULTS = {
+    'on_time_payments': 0.95,
+    'payment_history_months': 12,
+    'support_tickets_per_month': 2,
+    'avg_resolution_time_days': 2,
+    'support_satisfaction': 0.85,
+    'total_licenses': 50,
+    'total_users': 40,
+    'contract_age_days': 365,
+    'contract_value': 10000,
+    'monthly_spend': 2000,
+    'features_used': 8,
+    'features_available': 15,
+    'days_since_last_contact': 30
+}
+
+# Inputs each factor score reads
+FACTOR_INPUTS = {
+    'payment_history': ('on_time_payments', 'payment_history_months'),
+    'support_engagement': ('support_tickets_per_month', 'avg_resolution_time_days', 'support_satisfaction'),
+    'license_utilization': ('total_licenses', 'total_users'),
+    'contract_stability': ('contract_age_days', 'contract_value', 'monthly_spend'),
+    'feature_adoption': ('features_used', 'features_available'),
+    'communication_frequency': ('days_since_last_contact',)
+}
+
 class HealthScoreCalculator:
     def __init__(self):
         # Weight for each health factor
@@ -38,6 +67,37 @@ class HealthScoreCalculator:
         factor_scores['feature_adoption'] = self._calculate_adoption_score(client_data)
         factor_scores['communication_frequency'] = self._calculate_communication_score(client_data)
         
+        return self.summarize(client_data, factor_scores)
+    
+    def score_factor(self, factor, client_data):
+        """
+        Score one factor (0-100)
+        
+        Args:
+            factor (str): A key of self.weights
+            client_data (dict): Client information; only the factor's
+                FACTOR_INPUTS are read
+        """
+        return {
+            'payment_history': self._calculate_payment_score,
+            'support_engagement': self._calculate_support_score,
+            'license_utilization': self._calculate_utilization_score,
+            'contract_stability': self._calculate_contract_score,
+            'feature_adoption': self._calculate_adoption_score,
+            'communication_frequency': self._calculate_communication_score
+        }[factor](client_data)
+    
+    def summarize(self, client_data, factor_scores):
+        """
+        Overall score, trend, insights and status from factor scores
+        
+        Args:
+            client_data (dict): Client information (for the previous score)
+            factor_scores (dict): Score per factor
+            
+        Returns:
+            dict: Health score results with factor breakdown
+        """
         # Calculate weighted overall score
         overall_score = sum(
             factor_scores[factor] * self.weights[factor]
@@ -58,11 +118,129 @@ class HealthScoreCalculator:
             "health_status": self._get_health_status(overall_score)
         }
     
+    def calculate_batch(self, clients):
+        """
+        Calculate health scores for many clients at once
+        
+        Same rules as calculate() for every client, computed with NumPy
+        over one column per input. Scores are identical to the scalar path.
+        Insights are not generated; call calculate() for one client's
+        breakdown.
+        
+        Args:
+            clients: DataFrame, dict of columns, or list of client dicts.
+                Missing columns and missing (None/NaN) values take the
+                same defaults as calculate()
+            
+        Returns:
+            dict: overall_score, trend and health_status arrays, and
+                factor_scores as one array per factor
+        """
+        columns = self._batch_columns(clients)
+        
+        factor_scores = {
+            'payment_history': self._payment_scores(columns),
+            'support_engagement': self._support_scores(columns),
+            'license_utilization': self._utilization_scores(columns),
+            'contract_stability': self._contract_scores(columns),
+            'feature_adoption': self._adoption_scores(columns),
+            'communication_frequency': self._communication_scores(columns)
+        }
+        
+        # Accumulated factor by factor in calculate()'s order, so the sums
+        # (and the labels thresholded on them) match it to the last bit
+        overall_score = np.zeros(columns['n'])
+        for factor, weight in self.weights.items():
+            overall_score = overall_score + factor_scores[factor] * weight
+        
+        previous = columns['previous_health_score']
+        has_previous = ~np.isnan(previous) & (previous != 0)
+        trend = np.select(
+            [has_previous & (overall_score > previous + 5), has_previous & (overall_score < previous - 5)],
+            ["improving", "declining"],
+            "stable"
+        )
+        health_status = np.select(
+            [overall_score >= 85, overall_score >= 70, overall_score >= 50],
+            ["excellent", "good", "fair"],
+            "at_risk"
+        )
+        
+        return {
+            "overall_score": overall_score,
+            "factor_scores": factor_scores,
+            "trend": trend,
+            "health_status": health_status
+        }
+    
+    def _batch_columns(self, clients):
+        """Float column per input, with defaults filled in"""
+        columns = FeatureColumns(clients)
+        batch = {'n': len(columns)}
+        for name in list(DEFAULTS) + ['previous_health_score']:
+            batch[name] = columns.numeric(name, DEFAULTS.get(name, np.nan))
+        return batch
+    
+    def _payment_scores(self, c):
+        history_bonus = np.minimum(c['payment_history_months'] / 24 * 10, 10)
+        return np.minimum(c['on_time_payments'] * 100 + history_bonus, 100)
+    
+    def _support_scores(self, c):
+        tickets = c['support_tickets_per_month']
+        frequency_score = np.select(
+            [(tickets >= 1) & (tickets <= 4), tickets < 1, tickets > 8],
+            [100, 70, 60],
+            85
+        )
+        resolution_score = np.maximum(0, 100 - (c['avg_resolution_time_days'] * 10))
+        return (frequency_score * 0.3 + resolution_score * 0.3 + c['support_satisfaction'] * 100 * 0.4)
+    
+    def _utilization_scores(self, c):
+        total_licenses = c['total_licenses']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            utilization = (c['total_users'] / total_licenses) * 100
+        return np.select(
+            [
+                total_licenses == 0,
+                (utilization >= 70) & (utilization <= 90),
+                ((utilization >= 60) & (utilization < 70)) | ((utilization > 90) & (utilization <= 95)),
+                utilization > 95
+            ],
+            [50, 100, 85, 75],
+            np.maximum(0, utilization)
+        )
+    
+    def _contract_scores(self, c):
+        age_score = np.minimum(c['contract_age_days'] / 730 * 100, 100)
+        contract_value = c['contract_value']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            spend_ratio = (c['monthly_spend'] * 12) / contract_value
+        spend_score = np.where(contract_value > 0, np.minimum(spend_ratio * 100, 100), 50)
+        return (age_score * 0.5 + spend_score * 0.5)
+    
+    def _adoption_scores(self, c):
+        features_available = c['features_available']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            adoption_rate = (c['features_used'] / features_available) * 100
+        return np.select(
+            [features_available == 0, adoption_rate >= 70, adoption_rate >= 50],
+            [50, 100, 85],
+            np.maximum(adoption_rate, 30)
+        )
+    
+    def _communication_scores(self, c):
+        days = c['days_since_last_contact']
+        return np.select(
+            [days <= 14, days <= 30, days <= 60, days <= 90],
+            [100, 85, 70, 50],
+            np.maximum(0, 100 - days)
+        )
+    
     def _calculate_payment_score(self, data):
         """Calculate payment history score (0-100)"""
         # Simulated based on payment timeliness and history
-        on_time_payments = data.get('on_time_payments', 0.95)
-        payment_history_months = data.get('payment_history_months', 12)
+        on_time_payments = data.get('on_time_payments', DEFAULTS['on_time_payments'])
+        payment_history_months = data.get('payment_history_months', DEFAULTS['payment_history_months'])
         
         base_score = on_time_payments * 100
         
@@ -76,9 +254,9 @@ class HealthScoreCalculator:
         # Moderate support tickets are good (shows engagement)
         # Too many or too few is concerning
         
-        tickets_per_month = data.get('support_tickets_per_month', 2)
-        avg_resolution_time = data.get('avg_resolution_time_days', 2)
-        satisfaction_score = data.get('support_satisfaction', 0.85)
+        tickets_per_month = data.get('support_tickets_per_month', DEFAULTS['support_tickets_per_month'])
+        avg_resolution_time = data.get('avg_resolution_time_days', DEFAULTS['avg_resolution_time_days'])
+        satisfaction_score = data.get('support_satisfaction', DEFAULTS['support_satisfaction'])
         
         # Optimal ticket frequency is 1-4 per month
         if 1 <= tickets_per_month <= 4:
@@ -98,8 +276,8 @@ class HealthScoreCalculator:
     
     def _calculate_utilization_score(self, data):
         """Calculate license utilization score (0-100)"""
-        total_licenses = data.get('total_licenses', 50)
-        active_users = data.get('total_users', 40)
+        total_licenses = data.get('total_licenses', DEFAULTS['total_licenses'])
+        active_users = data.get('total_users', DEFAULTS['total_users'])
         
         if total_licenses == 0:
             return 50
@@ -118,9 +296,9 @@ class HealthScoreCalculator:
     
     def _calculate_contract_score(self, data):
         """Calculate contract stability score (0-100)"""
-        contract_age_days = data.get('contract_age_days', 365)
-        contract_value = data.get('contract_value', 10000)
-        monthly_spend = data.get('monthly_spend', 2000)
+        contract_age_days = data.get('contract_age_days', DEFAULTS['contract_age_days'])
+        contract_value = data.get('contract_value', DEFAULTS['contract_value'])
+        monthly_spend = data.get('monthly_spend', DEFAULTS['monthly_spend'])
         
         # Longer contracts are more stable
         age_score = min(contract_age_days / 730 * 100, 100)  # 2 years = max
@@ -137,8 +315,8 @@ class HealthScoreCalculator:
     def _calculate_adoption_score(self, data):
         """Calculate feature adoption score (0-100)"""
         # Based on features used vs available
-        features_used = data.get('features_used', 8)
-        features_available = data.get('features_available', 15)
+        features_used = data.get('features_used', DEFAULTS['features_used'])
+        features_available = data.get('features_available', DEFAULTS['features_available'])
         
         if features_available == 0:
             return 50
@@ -155,7 +333,7 @@ class HealthScoreCalculator:
     
     def _calculate_communication_score(self, data):
         """Calculate communication frequency score (0-100)"""
-        days_since_last_contact = data.get('days_since_last_contact', 30)
+        days_since_last_contact = data.get('days_since_last_contact', DEFAULTS['days_since_last_contact'])
         
         # Optimal contact is within 30 days
         if days_since_last_contact <= 14:
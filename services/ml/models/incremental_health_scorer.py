@@ -0,0 +1,117 @@
+"""
+Incremental Health Scorer
+Rescores only the health factors whose inputs changed since a client's last score
+"""
+
+import threading
+from collections import OrderedDict
+
+from .health_score_calculator import HealthScoreCalculator, FACTOR_INPUTS
+
+class IncrementalHealthScorer:
+    """
+    HealthScoreCalculator with per-client, per-factor memoization
+
+    Each factor's score is cached with a fingerprint of the inputs it reads
+    (its FACTOR_INPUTS values). When a client is scored again, factors whose
+    fingerprint is unchanged reuse the cached score; only the others are
+    recomputed before the overall score, trend and insights are re-derived.
+    Results are identical to HealthScoreCalculator.calculate().
+    """
+
+    def __init__(self, calculator=None, cache_size=100000):
+        """
+        Args:
+            calculator (HealthScoreCalculator): Scoring rules and weights
+            cache_size (int): Clients whose factor scores are kept
+        """
+        self.calculator = calculator or HealthScoreCalculator()
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def calculate(self, client_id, client_data):
+        """
+        Calculate a client's health score, reusing unchanged factors
+
+        Args:
+            client_id: Key the client's factor scores are cached under
+            client_data (dict): Client information and metrics
+
+        Returns:
+            dict: Same as HealthScoreCalculator.calculate()
+        """
+        with self._lock:
+            cached = self._cache.get(client_id)
+            if cached is not None:
+                self._cache.move_to_end(client_id)
+
+        entry = {}
+        reused = []
+        for factor, inputs in FACTOR_INPUTS.items():
+            fingerprint = tuple(client_data.get(name) for name in inputs)
+            if cached is not None and cached[factor][0] == fingerprint:
+                entry[factor] = cached[factor]
+                reused.append(True)
+            else:
+                entry[factor] = (fingerprint, self.calculator.score_factor(factor, client_data))
+                reused.append(False)
+
+        with self._lock:
+            self._cache[client_id] = entry
+            self._cache.move_to_end(client_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+            self._requests += 1
+            self._full_hits += all(reused)
+            for factor, hit in zip(FACTOR_INPUTS, reused):
+                self._factor_hits[factor] += hit
+                self._factor_misses[factor] += not hit
+
+        return self.calculator.summarize(client_data, {factor: score for factor, (_, score) in entry.items()})
+
+    def stats(self):
+        """
+        Cache effectiveness since creation or the last reset
+
+        Returns:
+            dict: requests, cached_clients, factor hit and miss totals, the
+                overall factor hit_rate, full_hit_rate (requests with no
+                factor recomputed) and the hit rate of each factor
+        """
+        with self._lock:
+            hits = sum(self._factor_hits.values())
+            misses = sum(self._factor_misses.values())
+            return {
+                "requests": self._requests,
+                "cached_clients": len(self._cache),
+                "factor_hits": hits,
+                "factor_misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "full_hit_rate": self._full_hits / self._requests if self._requests else 0.0,
+                "factors": {
+                    factor: self._factor_hits[factor] / self._requests if self._requests else 0.0
+                    for factor in FACTOR_INPUTS
+                }
+            }
+
+    def invalidate(self, client_id=None):
+        """Drop one client's cached factor scores, or all of them"""
+        with self._lock:
+            if client_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(client_id, None)
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_counters()
+
+    def _reset_counters(self):
+        self._requests = 0
+        self._full_hits = 0
+        self._factor_hits = dict.fromkeys(FACTOR_INPUTS, 0)
+        self._factor_misses = dict.fromkeys(FACTOR_INPUTS, 0)
@@ -0,0 +1,264 @@
+"""
+License Anomaly Model
+Multivariate IsolationForest over per-license cost and usage features
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .model_registry import ModelRegistry, ModelHandle
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = [
+    'monthly_cost', 'active_users', 'utilization_percent',
+    'cost_per_seat', 'cost_change', 'active_users_change'
+]
+
+def license_features(licenses):
+    """
+    Feature matrix for license observations
+
+    Args:
+        licenses: DataFrame or list of dicts with monthly_cost,
+            active_users, total_licenses and optionally
+            utilization_percent, previous_monthly_cost and
+            previous_active_users (last month's values)
+
+    Returns:
+        np.ndarray: (n_licenses, len(FEATURE_NAMES)) features; changes are
+            month-over-month fractions, 0 without a previous value
+    """
+    df = licenses if isinstance(licenses, pd.DataFrame) else pd.DataFrame(list(licenses))
+
+    def column(name):
+        if name not in df:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+
+    cost = np.nan_to_num(column('monthly_cost'))
+    users = np.nan_to_num(column('active_users'))
+    seats = np.nan_to_num(column('total_licenses'))
+    previous_cost = np.nan_to_num(column('previous_monthly_cost'))
+    previous_users = np.nan_to_num(column('previous_active_users'))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        utilization = column('utilization_percent')
+        utilization = np.where(np.isnan(utilization), np.where(seats > 0, users / seats * 100, 0.0), utilization)
+        cost_per_seat = np.where(seats > 0, cost / seats, 0.0)
+        cost_change = np.where(previous_cost > 0, (cost - previous_cost) / previous_cost, 0.0)
+        users_change = np.where(previous_users > 0, (users - previous_users) / previous_users, 0.0)
+
+    return np.column_stack([cost, users, utilization, cost_per_seat, cost_change, users_change])
+
+class LicenseAnomalyModel:
+    """
+    Scores licenses on all features jointly with an IsolationForest
+
+    The fitted forest, its scaler and the training window (the most recent
+    feature rows it was trained on) are published to the model registry.
+    Retraining is incremental: new observations are appended to the active
+    version's window, the oldest rows beyond window_size are dropped, and
+    a new forest is fitted on the result.
+    """
+
+    MODEL_NAME = 'license_anomaly'
+
+    def __init__(self, registry=None, n_jobs=-1, n_estimators=200, contamination=0.05,
+                 window_size=50000, retrain_interval=None, min_new_samples=100):
+        """
+        Args:
+            registry (ModelRegistry): Model store; defaults to MODEL_REGISTRY_DIR
+            n_jobs (int): Parallel jobs for fitting the forest (-1: all cores)
+            n_estimators (int): Trees per forest
+            contamination (float): Expected share of anomalies in training data
+            window_size (int): Most recent feature rows kept for retraining
+            retrain_interval (float): Seconds between scheduled retrains; None
+                disables the schedule
+            min_new_samples (int): Observations needed before a scheduled
+                retrain publishes a new version
+        """
+        self.registry = registry or ModelRegistry()
+        self.n_jobs = n_jobs
+        self.n_estimators = n_estimators
+        self.contamination = contamination
+        self.window_size = window_size
+        self.retrain_interval = retrain_interval
+        self.min_new_samples = min_new_samples
+        self.stats = {"retrains": 0, "last_retrain": None}
+
+        self._handle = ModelHandle(self.registry, self.MODEL_NAME, bootstrap=self._bootstrap_model)
+        self._pending = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+    @property
+    def model(self):
+        return self._handle.get()['model']
+
+    @property
+    def scaler(self):
+        return self._handle.get()['scaler']
+
+    @property
+    def model_version(self):
+        return self._handle.get().version
+
+    @property
+    def pending_count(self):
+        """Observations queued for the next retrain"""
+        return len(self._pending)
+
+    def score(self, licenses):
+        """
+        Score license observations in one batch
+
+        Args:
+            licenses: DataFrame or list of dicts (see license_features)
+
+        Returns:
+            list: Per license, is_anomaly, anomaly_score (0-1, higher is more
+                anomalous), the feature furthest from typical and its
+                standardized value
+        """
+        X = license_features(licenses)
+        if not len(X):
+            return []
+
+        bundle = self._handle.get()
+        scaled = bundle['scaler'].transform(X)
+        # score_samples is the negated anomaly score; below offset_ is an outlier
+        raw = bundle['model'].score_samples(scaled)
+        is_anomaly = raw < bundle['model'].offset_
+        driver = np.argmax(np.abs(scaled), axis=1)
+
+        return [
+            {
+                "is_anomaly": bool(is_anomaly[i]),
+                "anomaly_score": float(-raw[i]),
+                "top_feature": FEATURE_NAMES[driver[i]],
+                "top_feature_z": float(scaled[i, driver[i]]),
+                "model_version": bundle.version
+            } for i in range(len(X))
+        ]
+
+    def observe(self, licenses):
+        """Queue observations for the next incremental retrain"""
+        X = license_features(licenses)
+        with self._lock:
+            self._pending.extend(X)
+        if self.retrain_interval is not None:
+            self._ensure_scheduler()
+        return len(X)
+
+    def fit(self, licenses, metadata=None):
+        """
+        Train on licenses alone, replacing the training window
+
+        Returns:
+            str: The published version
+        """
+        return self._publish(license_features(licenses), dict(metadata or {}, source='fit'))
+
+    def retrain(self, licenses=None, min_new_samples=1):
+        """
+        Incrementally retrain on the active window plus new observations
+
+        Args:
+            licenses: Extra observations to include besides the queued ones
+            min_new_samples (int): Skip retraining with fewer new rows
+
+        Returns:
+            str: The published version, or None if skipped
+        """
+        with self._lock:
+            new = list(self._pending)
+            self._pending.clear()
+        if licenses is not None:
+            new.extend(license_features(licenses))
+
+        if len(new) < min_new_samples:
+            with self._lock:
+                self._pending.extendleft(reversed(new))
+            return None
+
+        # One worker publishes at a time, each on top of the latest window
+        self._handle.get()
+        with self._publish_lock():
+            latest = self.registry.load(self.MODEL_NAME, artifacts=('training_window',))
+            window = np.concatenate([np.asarray(latest['training_window']), np.array(new)])
+            return self._publish(window[-self.window_size:], {'source': 'retrain', 'new_samples': len(new)})
+
+    def _train(self, X):
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler()
+        model = IsolationForest(
+            n_estimators=self.n_estimators,
+            contamination=self.contamination,
+            n_jobs=self.n_jobs,
+            random_state=42
+        )
+        model.fit(scaler.fit_transform(X))
+        return model, scaler
+
+    def _save(self, registry, X, metadata):
+        model, scaler = self._train(X)
+        return registry.save(
+            self.MODEL_NAME,
+            {'model': model, 'scaler': scaler, 'training_window': np.ascontiguousarray(X)},
+            metadata=dict(metadata, feature_names=FEATURE_NAMES, n_samples=len(X))
+        )
+
+    def _publish(self, X, metadata):
+        version = self._save(self.registry, X, metadata)
+        self._handle.swap(version)
+        self.stats["retrains"] += 1
+        self.stats["last_retrain"] = version
+        return version
+
+    def _publish_lock(self):
+        return self.registry.lock(self.MODEL_NAME)
+
+    def _ensure_scheduler(self):
+        # Started lazily so forked worker processes each get their own thread
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return
+        with self._lock:
+            if self._scheduler is None or not self._scheduler.is_alive():
+                self._scheduler = threading.Thread(
+                    target=self._run_schedule, name=f'{self.MODEL_NAME}-retrain', daemon=True
+                )
+                self._scheduler.start()
+
+    def _run_schedule(self):
+        while True:
+            time.sleep(self.retrain_interval)
+            try:
+                self.retrain(min_new_samples=self.min_new_samples)
+            except Exception:
+                # Keep serving the current version; try again next interval
+                logger.exception("Scheduled license anomaly retrain failed")
+
+    def _bootstrap_model(self, registry):
+        """Publish a first version trained on synthetic licenses"""
+        rng = np.random.default_rng(42)
+        n = 2000
+        seats = rng.integers(10, 500, n)
+        users = np.round(seats * rng.uniform(0.4, 1.0, n))
+        cost = seats * rng.uniform(5, 60, n)
+        licenses = pd.DataFrame({
+            'monthly_cost': cost,
+            'active_users': users,
+            'total_licenses': seats,
+            'previous_monthly_cost': cost * rng.normal(1.0, 0.05, n),
+            'previous_active_users': users * rng.normal(1.0, 0.05, n)
+        })
+
+        return self._save(registry, license_features(licenses), {'source': 'demo'})
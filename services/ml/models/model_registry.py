@@ -0,0 +1,351 @@
+"""
+Model Registry
+Versioned model artifacts with lazy loading and atomic hot swap
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import joblib
+
+DEFAULT_REGISTRY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trained_models'
+)
+CURRENT_FILE = 'CURRENT'
+METADATA_FILE = 'metadata.json'
+
+class ModelBundle:
+    """
+    Artifacts and metadata for one loaded model version
+
+    Artifacts not loaded up front are read from disk on first access, so
+    a serving path can skip artifacts it never uses (and their imports).
+    Objects built from the artifacts, such as an evaluator, can be kept
+    with derived(), so they live and are swapped out with the version.
+    """
+
+    def __init__(self, name, version, artifacts, metadata, version_dir=None, mmap_mode=None):
+        self.name = name
+        self.version = version
+        self.artifacts = artifacts
+        self.metadata = metadata
+        self.version_dir = version_dir
+        self.mmap_mode = mmap_mode
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.artifacts or key in self.metadata.get('artifacts', ())
+
+    def __getitem__(self, key):
+        if key not in self.artifacts:
+            if key not in self:
+                raise KeyError(key)
+            with self._lock:
+                if key not in self.artifacts:
+                    self.artifacts[key] = joblib.load(
+                        os.path.join(self.version_dir, f'{key}.pkl'), mmap_mode=self.mmap_mode
+                    )
+        return self.artifacts[key]
+
+    def derived(self, key, build):
+        """
+        Object built from this version once, by build(bundle), and reused
+
+        Returns:
+            The cached result of build
+        """
+        if key not in self._derived:
+            value = build(self)
+            with self._lock:
+                self._derived.setdefault(key, value)
+        return self._derived[key]
+
+class ModelRegistry:
+    """
+    On-disk registry laid out as ``<root>/<name>/<version>/``
+
+    Each version directory holds one ``<artifact>.pkl`` per artifact and a
+    ``metadata.json``. ``<root>/<name>/CURRENT`` names the active version.
+    Versions are staged in a hidden directory and renamed into place, and
+    the pointer is replaced with ``os.replace``, so readers never see a
+    half-written version.
+
+    Artifacts are written uncompressed and, by default, their NumPy arrays
+    are memory-mapped read-only on load. Every worker process then maps
+    the same page-cache pages instead of holding a private copy.
+    """
+
+    def __init__(self, root=None, mmap_mode=None):
+        """
+        Args:
+            root (str): Registry directory; defaults to MODEL_REGISTRY_DIR
+            mmap_mode (str): joblib mmap_mode for loaded arrays; defaults
+                to MODEL_MMAP_MODE ('r'). '' loads private copies
+        """
+        self.root = root or os.getenv('MODEL_REGISTRY_DIR', DEFAULT_REGISTRY_DIR)
+        if mmap_mode is None:
+            mmap_mode = os.getenv('MODEL_MMAP_MODE', 'r')
+        self.mmap_mode = mmap_mode or None
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def save(self, name, artifacts, metadata=None, version=None, activate=True):
+        """
+        Publish a new model version
+
+        Args:
+            name (str): Model name, e.g. 'churn'
+            artifacts (dict): Artifact name -> object (model, scaler, ...)
+            metadata (dict): Extra metadata such as metrics or feature names
+            version (str): Version id; defaults to a UTC timestamp
+            activate (bool): Point CURRENT at the new version
+
+        Returns:
+            str: The published version
+        """
+        version = version or datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        final_dir = os.path.join(model_dir, version)
+        if os.path.exists(final_dir):
+            raise ValueError(f"Version {version} of model '{name}' already exists")
+
+        staging_dir = tempfile.mkdtemp(prefix=f'.{version}-', dir=model_dir)
+        try:
+            for key, obj in artifacts.items():
+                joblib.dump(obj, os.path.join(staging_dir, f'{key}.pkl'))
+
+            full_metadata = dict(metadata or {})
+            full_metadata.update({
+                'name': name,
+                'version': version,
+                'created_at': datetime.utcnow().isoformat(),
+                'artifacts': sorted(artifacts)
+            })
+            with open(os.path.join(staging_dir, METADATA_FILE), 'w') as f:
+                json.dump(full_metadata, f, indent=2, default=str)
+
+            os.rename(staging_dir, final_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(name, version)
+
+        return version
+
+    def activate(self, name, version):
+        """Atomically point CURRENT at an existing version"""
+        if version not in self.list_versions(name):
+            raise ValueError(f"Unknown version {version} of model '{name}'")
+
+        pointer = os.path.join(self._model_dir(name), CURRENT_FILE)
+        tmp_pointer = f'{pointer}.{os.getpid()}.{threading.get_ident()}'
+        with open(tmp_pointer, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+
+    def lock(self, name):
+        """
+        Exclusive lock for publishing a model, shared across processes
+
+        Returns:
+            A context manager holding ``<root>/.<name>.lock``
+        """
+        os.makedirs(self.root, exist_ok=True)
+        return _FileLock(os.path.join(self.root, f'.{name}.lock'))
+
+    def current_version(self, name):
+        """Active version, falling back to the newest one"""
+        pointer = os.path.join(self._model_dir(name), CURRENT_FILE)
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                version = f.read().strip()
+            if version:
+                return version
+
+        versions = self.list_versions(name)
+        return versions[-1] if versions else None
+
+    def list_versions(self, name):
+        """All published versions, oldest first"""
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(
+            v for v in os.listdir(model_dir)
+            if not v.startswith('.') and os.path.exists(os.path.join(model_dir, v, METADATA_FILE))
+        )
+
+    def get_metadata(self, name, version):
+        with open(os.path.join(self._model_dir(name), version, METADATA_FILE)) as f:
+            return json.load(f)
+
+    def load(self, name, version=None, artifacts=None):
+        """
+        Load a model version (default: the active one)
+
+        Args:
+            name (str): Model name
+            version (str): Version to load
+            artifacts (iterable): Artifacts to load now; None loads all.
+                The rest are loaded on first access
+
+        Returns:
+            ModelBundle: Loaded artifacts and metadata
+        """
+        version = version or self.current_version(name)
+        if version is None:
+            raise LookupError(f"No versions of model '{name}' in {self.root}")
+
+        metadata = self.get_metadata(name, version)
+        version_dir = os.path.join(self._model_dir(name), version)
+        keys = metadata['artifacts'] if artifacts is None else \
+            [key for key in artifacts if key in metadata['artifacts']]
+        loaded = {
+            key: joblib.load(os.path.join(version_dir, f'{key}.pkl'), mmap_mode=self.mmap_mode)
+            for key in keys
+        }
+        return ModelBundle(name, version, loaded, metadata, version_dir, self.mmap_mode)
+
+class ModelHandle:
+    """
+    Lazily loaded, hot-swappable reference to a registry model
+
+    Callers take one bundle from get() per request and use it throughout.
+    A swap loads the new version off to the side and then replaces the
+    reference in one assignment, so in-flight requests finish on the
+    bundle they started with.
+    """
+
+    def __init__(self, registry, name, bootstrap=None, refresh_interval=30.0, artifacts=None):
+        """
+        Args:
+            registry (ModelRegistry): Where versions are stored
+            name (str): Model name
+            bootstrap (callable): Called with the registry to publish a
+                first version when none exists; returns the version
+            refresh_interval (float): Seconds between checks of the CURRENT
+                pointer for versions activated by other processes; None
+                disables the check
+            artifacts (iterable): Artifacts to load eagerly on every load
+                and swap; None loads all
+        """
+        self.registry = registry
+        self.name = name
+        self.bootstrap = bootstrap
+        self.refresh_interval = refresh_interval
+        self.artifacts = artifacts
+
+        self._bundle = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._swap_thread = None
+
+    def get(self):
+        """Current bundle, loading it on first use"""
+        bundle = self._bundle
+        if bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._bundle = self._load_current()
+            return self._bundle
+
+        if self.refresh_interval is not None and \
+                time.monotonic() - self._last_check > self.refresh_interval:
+            self._check_for_update(bundle)
+
+        return bundle
+
+    def preload(self, background=True):
+        """Load the model now, optionally on a background thread"""
+        if not background:
+            return self.get()
+        thread = threading.Thread(target=self.get, name=f'{self.name}-preload', daemon=True)
+        thread.start()
+        return thread
+
+    def swap(self, version=None):
+        """
+        Load a version (default: the registry's active one) and make it current
+
+        Returns:
+            ModelBundle: The newly active bundle
+        """
+        bundle = self.registry.load(self.name, version, self.artifacts)
+        self._bundle = bundle
+        self._last_check = time.monotonic()
+        return bundle
+
+    def _load_current(self):
+        version = self.registry.current_version(self.name)
+        if version is None:
+            if self.bootstrap is None:
+                raise LookupError(f"No versions of model '{self.name}' in {self.registry.root}")
+            # Workers starting together on an empty registry publish one
+            # first version: the rest find it once they get the lock
+            with self.registry.lock(self.name):
+                version = self.registry.current_version(self.name)
+                if version is None:
+                    version = self.bootstrap(self.registry)
+        self._last_check = time.monotonic()
+        return self.registry.load(self.name, version, self.artifacts)
+
+    def _check_for_update(self, bundle):
+        self._last_check = time.monotonic()
+        version = self.registry.current_version(self.name)
+        if version == bundle.version:
+            return
+
+        # Load the new version in the background; requests keep using the old one
+        with self._lock:
+            if self._swap_thread is None or not self._swap_thread.is_alive():
+                self._swap_thread = threading.Thread(
+                    target=self.swap, args=(version,), name=f'{self.name}-swap', daemon=True
+                )
+                self._swap_thread.start()
+
+class _FileLock:
+    """
+    Exclusive lock on a file, shared across worker processes
+
+    flock on POSIX; on Windows, where there's no fcntl, msvcrt locks the
+    file's first byte instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._file = open(self.path, 'w')
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+            # LK_LOCK gives up after ~10 s, so keep waiting for the holder
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            self._unlock = lambda: msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            self._unlock = lambda: fcntl.flock(self._file, fcntl.LOCK_UN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._unlock()
+        finally:
+            self._file.close()
@@ -3,246 +3,393 @@ Recommendation Engine
 Generates intelligent recommendations for MSPs and IT teams
 """
 
-import random
-from datetime import datetime, timedelta
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .feature_pipeline import FeatureColumns, days_between, parse_timestamps, utc_now
+from .recommendation_rules import DEFAULT_RULES_PATH, DERIVED_FIELDS, PRIORITIES, RuleError, load_rules
+from .software_catalog import SoftwareCatalog
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
 
 class RecommendationEngine:
-    def __init__(self):
-        self.msp_rules = self._initialize_msp_rules()
-        self.it_rules = self._initialize_it_rules()
-    
-    def _initialize_msp_rules(self):
-        """Initialize recommendation rules for MSPs"""
-        return {
-            'upsell': [
-                {
-                    'trigger': lambda c: c.get('health_score', 0) > 80 and c.get('contract_value', 0) < 50000,
-                    'template': "Client {name} has high satisfaction. Consider upselling premium support or additional services.",
-                    'value_multiplier': 0.3
-                },
-                {
-                    'trigger': lambda c: c.get('license_utilization', 0) > 85,
-                    'template': "Client {name} at {utilization}% license capacity. Recommend capacity expansion.",
-                    'value_multiplier': 0.2
-                }
-            ],
-            'retention': [
-                {
-                    'trigger': lambda c: c.get('churn_risk') == 'high',
-                    'template': "URGENT: Client {name} at high churn risk. Schedule retention call immediately.",
-                    'priority': 'high'
-                },
-                {
-                    'trigger': lambda c: c.get('days_since_contact', 0) > 60,
-                    'template': "Client {name} inactive for {days} days. Proactive outreach recommended.",
-                    'priority': 'medium'
-                }
-            ],
-            'optimization': [
-                {
-                    'trigger': lambda c: c.get('support_tickets_per_month', 0) > 10,
-                    'template': "Client {name} has high ticket volume. Offer training or process optimization.",
-                    'priority': 'medium'
-                }
-            ]
-        }
-    
-    def _initialize_it_rules(self):
-        """Initialize recommendation rules for IT teams"""
-        return {
-            'cost_saving': [
-                {
-                    'trigger': lambda s: s.get('utilization_percent', 100) < 50,
-                    'template': "Software {name}: {unused} unused licenses. Potential monthly savings: ${savings}",
-                    'calculate_value': lambda s: s.get('monthly_cost', 0) * (1 - s.get('utilization_percent', 50) / 100)
-                },
-                {
-                    'trigger': lambda s: s.get('total_licenses', 0) > 100 and s.get('vendor') in ['Microsoft', 'Adobe', 'Salesforce'],
-                    'template': "Software {name}: Large license pool. Negotiate enterprise discount with {vendor}.",
-                    'calculate_value': lambda s: s.get('annual_cost', 0) * 0.15
-                }
-            ],
-            'consolidation': [
-                {
-                    'trigger': lambda ctx: len(ctx.get('duplicate_tools', [])) > 0,
-                    'template': "Overlapping functionality detected: {tools}. Consider consolidation.",
-                    'calculate_value': lambda ctx: sum([t.get('cost', 0) for t in ctx.get('duplicate_tools', [])])
-                }
-            ],
-            'renewal': [
-                {
-                    'trigger': lambda s: s.get('days_until_renewal', 365) < 60,
-                    'template': "Software {name} renewal in {days} days. Negotiate or review alternatives.",
-                    'priority': 'high'
-                }
-            ]
-        }
+    def __init__(self, rules_path=None, catalog=None, reload_interval=1.0):
+        """
+        Args:
+            rules_path (str): YAML or JSON rule file; defaults to
+                recommendation_rules.yaml next to this module
+            catalog (SoftwareCatalog): Categories for consolidation
+            reload_interval (float): Seconds between checks of the rule file
+                for changes; None disables hot reload
+        
+        Raises:
+            RuleError: If the rule file is invalid
+        """
+        self.rules_path = rules_path or DEFAULT_RULES_PATH
+        self.reload_interval = reload_interval
+        # Categories for consolidation, compiled once
+        self.catalog = catalog or SoftwareCatalog()
+        self.last_error = None
+        
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._signature = self._file_signature()
+        self._checked = time.monotonic()
+        self.rules = load_rules(self.rules_path)
+    
+    def reload(self):
+        """
+        Load the rule file again and swap it in
+        
+        The new rules are compiled before they replace the old ones, so a
+        request sees either set in full. An invalid file is logged and the
+        current rules stay in place.
+        
+        Returns:
+            bool: Whether the new rules were loaded
+        """
+        with self._lock:
+            self._signature = self._file_signature()
+            self._checked = time.monotonic()
+            try:
+                rules = load_rules(self.rules_path)
+            except (RuleError, OSError) as e:
+                self.last_error = str(e)
+                logger.warning("Keeping recommendation rules %s: %s", self.rules.version, e)
+                return False
+            
+            self.rules = rules
+            self.last_error = None
+            logger.info("Loaded recommendation rules %s from %s", rules.version, self.rules_path)
+            return True
+    
+    def rule_stats(self):
+        """
+        Evaluation counters per rule since creation or the last reset
+        
+        Returns:
+            dict: Rule file version, path and last load error, and per role
+                and rule id: calls, rows evaluated, matches, selected (in
+                the returned top recommendations), total_ms and mean_ms
+        """
+        with self._lock:
+            rules = {}
+            for (role, rule_id), counters in self._stats.items():
+                rules.setdefault(role, {})[rule_id] = dict(
+                    counters,
+                    mean_ms=counters['total_ms'] / counters['calls'] if counters['calls'] else 0.0
+                )
+            return {
+                "version": self.rules.version,
+                "path": self.rules_path,
+                "last_error": self.last_error,
+                "rules": rules
+            }
+    
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
     
     def generate(self, role, context):
         """
         Generate recommendations based on role and context
         
         Args:
-            role (str): 'msp' or 'it_admin'
-            context (dict): Context data for recommendations
-            
+            role (str): A role in the rule file ('msp' or 'it_admin')
+            context (dict): Context data for recommendations. The role's
+                source ('clients', 'software_licenses') may be a list of
+                dicts, a DataFrame or a dict of columns
+        
         Returns:
             list: List of recommendations
         """
-        if role == 'msp':
-            return self._generate_msp_recommendations(context)
-        elif role == 'it_admin':
-            return self._generate_it_recommendations(context)
-        else:
+        role_rules = self._current().roles.get(role)
+        if role_rules is None:
+            return []
+        return self._generate(role_rules, context)
+    
+    def _current(self):
+        """Rules to use, reloaded first if the file changed"""
+        if self.reload_interval is not None and time.monotonic() - self._checked >= self.reload_interval:
+            self._checked = time.monotonic()
+            if self._file_signature() != self._signature:
+                self.reload()
+        return self.rules
+    
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.rules_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def affected_rules(self, role, changed_fields=None):
+        """
+        Rules whose output can change when the given fields change
+        
+        Args:
+            role (str): A role in the rule file
+            changed_fields: Input fields that changed, or None for all
+        
+        Returns:
+            list: Rule ids in file order
+        """
+        role_rules = self._current().roles.get(role)
+        if role_rules is None:
+            return []
+        if changed_fields is None:
+            return [rule.id for rule in role_rules.rules]
+        changed = set(changed_fields)
+        return [rule.id for rule in role_rules.rules if rule.fields & changed]
+    
+    def evaluate(self, role, records, rule_ids=None):
+        """
+        Every recommendation the given rules make for each record
+        
+        Unlike generate(), nothing is ranked or cut off, so the results for
+        one entity can be stored and refreshed on their own. Consolidation,
+        which compares records with each other, is left to generate().
+        
+        Args:
+            role (str): A role in the rule file
+            records: List of dicts, DataFrame or dict of columns
+            rule_ids: Rules to evaluate; None for all
+        
+        Returns:
+            list: One list per record of its recommendations, each with
+                its 'rule_id', in rule order
+        """
+        role_rules = self._current().roles.get(role)
+        if role_rules is None:
             return []
+        table, record, derived = self._prepare(role_rules, records)
+        recommendations = [[] for _ in range(len(table))]
+        
+        if rule_ids is not None:
+            rule_ids = set(rule_ids)
+        positions = [p for p, rule in enumerate(role_rules.rules) if rule_ids is None or rule.id in rule_ids]
+        selected = []
+        candidates, counters = self._candidates(role_rules, positions, table, record, derived, selected)
+        
+        matches = sorted(
+            (row, position, build)
+            for _, position, rows, _, build in candidates for row in rows.tolist()
+        )
+        for row, position, build in matches:
+            recommendation = build(row)
+            recommendation['rule_id'] = role_rules.rules[position].id
+            recommendations[row].append(recommendation)
+        
+        self._count(role_rules.role, counters, selected)
+        return recommendations
+    
+    def _generate(self, role, context):
+        """
+        Evaluate one role's rules over every row at once
+        
+        Each rule's condition, value and priorities are evaluated as whole
+        columns. Only the recommendations that make the top `limit` are
+        built, with the rule's templates filled from the original records.
+        """
+        table, record, derived = self._prepare(role, context.get(role.source, []))
+        selected = []
+        candidates, counters = self._candidates(role, range(len(role.rules)), table, record, derived, selected)
+        
+        # Check for consolidation opportunities (after every per-row one)
+        if role.consolidation is not None:
+            config = role.consolidation
+            names = table[config['name']].fillna('').astype(str).to_numpy()
+            cost = table[config['cost']].to_numpy(dtype=float)
+            duplicate_tools = self._find_duplicate_tools(names)
+            for offset, (category, rows) in enumerate(duplicate_tools.items()):
+                potential_value = sum(cost[rows].tolist()) * config['savings_rate']
+                recommendation = {
+                    'type': 'consolidation',
+                    'title': config['title'].format(category=category, tools=', '.join(names[rows])),
+                    'description': config['description'].format(category=category, tools=', '.join(names[rows])),
+                    'potential_value': potential_value,
+                    'priority': config.get('priority', 'medium')
+                }
+                candidates.append((
+                    PRIORITY_RANK[recommendation['priority']], len(role.rules) + offset, np.array([len(table)]),
+                    np.array([potential_value]), lambda i, r=recommendation: r
+                ))
+        
+        recommendations = self._select_top(candidates, role.limit)
+        self._count(role.role, counters, selected)
+        return recommendations
+    
+    def _prepare(self, role, records):
+        """Table of the columns the role's rules read, record accessor and derived columns"""
+        fields = {f: role.fields[f] for f in role.fields if f in role.columns or f in DERIVED_FIELDS.values()}
+        table, record = self._table(records, fields)
+        
+        derived = {}
+        if 'renewal_date' in table:
+            days = days_between(utc_now(), parse_timestamps(table['renewal_date'].to_numpy()))
+            table['days_until_renewal'] = days
+            derived['days_until_renewal'] = days
+        return table, record, derived
     
-    def _generate_msp_recommendations(self, context):
-        """Generate MSP-specific recommendations"""
-        recommendations = []
-        clients = context.get('clients', [])
-        
-        for client in clients:
-            # Check upsell opportunities
-            for rule in self.msp_rules['upsell']:
-                if rule['trigger'](client):
-                    potential_value = client.get('monthly_spend', 0) * 12 * rule.get('value_multiplier', 0.2)
-                    recommendations.append({
-                        'type': 'upsell',
-                        'title': f"Upsell Opportunity: {client.get('name')}",
-                        'description': rule['template'].format(
-                            name=client.get('name'),
-                            utilization=client.get('license_utilization', 0)
-                        ),
-                        'potential_value': potential_value,
-                        'priority': 'medium',
-                        'client_id': client.get('client_id')
-                    })
+    def _candidates(self, role, positions, table, record, derived, selected):
+        """
+        Matching rows of each rule, one candidate group per priority
+        
+        Returns:
+            tuple: (candidates for _select_top, per-rule (id, rows, matches,
+                milliseconds) counters)
+        """
+        counters = []
+        candidates = []
+        for position in positions:
+            rule = role.rules[position]
+            started = time.perf_counter()
+            matched = rule.when.mask(table)
+            values = rule.value.values(table)
+            priorities = rule.priorities(table, values)
+            elapsed = (time.perf_counter() - started) * 1000
             
-            # Check retention needs
-            for rule in self.msp_rules['retention']:
-                if rule['trigger'](client):
-                    recommendations.append({
-                        'type': 'churn_prevention',
-                        'title': f"Retention Alert: {client.get('name')}",
-                        'description': rule['template'].format(
-                            name=client.get('name'),
-                            days=client.get('days_since_contact', 0)
-                        ),
-                        'potential_value': client.get('contract_value', 0),
-                        'priority': rule.get('priority', 'high'),
-                        'client_id': client.get('client_id')
-                    })
+            build = self._builder(role, rule, record, derived, priorities, selected)
+            rows = np.flatnonzero(matched)
+            for level in np.unique(priorities[rows]).tolist():
+                group = rows[priorities[rows] == level]
+                candidates.append((PRIORITY_RANK[PRIORITIES[level]], position, group, values[group], build))
+            counters.append((rule.id, len(table), int(matched.sum()), elapsed))
+        return candidates, counters
+    
+    def _builder(self, role, rule, record, derived, priorities, selected):
+        """build(row) -> the recommendation a rule makes for one row"""
+        def build(i):
+            source = record(i)
+            values = {}
+            for field, default in role.fields.items():
+                value = source.get(field)
+                values[field] = default if value is None else value
+            for name, column in derived.items():
+                days = column[i]
+                values[name] = int(days) if days == days else None
             
-            # Check optimization opportunities
-            for rule in self.msp_rules['optimization']:
-                if rule['trigger'](client):
-                    recommendations.append({
-                        'type': 'optimization',
-                        'title': f"Service Optimization: {client.get('name')}",
-                        'description': rule['template'].format(
-                            name=client.get('name')
-                        ),
-                        'potential_value': client.get('monthly_spend', 0) * 0.1,
-                        'priority': rule.get('priority', 'medium'),
-                        'client_id': client.get('client_id')
-                    })
-        
-        # Sort by priority and value
-        recommendations.sort(key=lambda x: (
-            {'high': 0, 'medium': 1, 'low': 2}.get(x['priority'], 2),
-            -x.get('potential_value', 0)
-        ))
-        
-        return recommendations[:10]  # Top 10 recommendations
-    
-    def _generate_it_recommendations(self, context):
-        """Generate IT admin-specific recommendations"""
-        recommendations = []
-        software_licenses = context.get('software_licenses', [])
-        
-        for software in software_licenses:
-            # Check cost saving opportunities
-            for rule in self.it_rules['cost_saving']:
-                if rule['trigger'](software):
-                    potential_value = rule['calculate_value'](software)
-                    unused_licenses = software.get('total_licenses', 0) - software.get('active_users', 0)
-                    
-                    recommendations.append({
-                        'type': 'cost_saving',
-                        'title': f"Cost Savings: {software.get('software_name')}",
-                        'description': rule['template'].format(
-                            name=software.get('software_name'),
-                            unused=unused_licenses,
-                            savings=f"{potential_value:.2f}",
-                            vendor=software.get('vendor', 'vendor')
-                        ),
-                        'potential_value': potential_value,
-                        'priority': 'high' if potential_value > 1000 else 'medium',
-                        'software_id': software.get('id')
-                    })
+            values['value'] = rule.value.scalar(values)
+            values.update({name: param.scalar(values) for name, param in rule.params.items()})
             
-            # Check renewal opportunities
-            renewal_date = software.get('renewal_date')
-            if renewal_date:
-                if isinstance(renewal_date, str):
-                    renewal_date = datetime.fromisoformat(renewal_date.replace('Z', '+00:00'))
-                days_until = (renewal_date - datetime.utcnow()).days
-                
-                if 0 < days_until < 60:
-                    for rule in self.it_rules['renewal']:
-                        if rule['trigger']({'days_until_renewal': days_until}):
-                            recommendations.append({
-                                'type': 'renewal',
-                                'title': f"Upcoming Renewal: {software.get('software_name')}",
-                                'description': rule['template'].format(
-                                    name=software.get('software_name'),
-                                    days=days_until
-                                ),
-                                'potential_value': software.get('annual_cost', 0) * 0.1,
-                                'priority': 'high' if days_until < 30 else 'medium',
-                                'software_id': software.get('id')
-                            })
-        
-        # Check for consolidation opportunities
-        duplicate_tools = self._find_duplicate_tools(software_licenses)
-        if duplicate_tools:
-            for category, tools in duplicate_tools.items():
-                if len(tools) > 1:
-                    total_cost = sum(t.get('monthly_cost', 0) for t in tools)
-                    recommendations.append({
-                        'type': 'consolidation',
-                        'title': f"Consolidation Opportunity: {category}",
-                        'description': f"Multiple {category} tools detected: {', '.join([t.get('software_name') for t in tools])}. Consider consolidation.",
-                        'potential_value': total_cost * 0.3,  # Assume 30% savings
-                        'priority': 'medium'
-                    })
-        
-        # Sort by priority and value
-        recommendations.sort(key=lambda x: (
-            {'high': 0, 'medium': 1, 'low': 2}.get(x['priority'], 2),
-            -x.get('potential_value', 0)
-        ))
-        
-        return recommendations[:15]  # Top 15 recommendations
-    
-    def _find_duplicate_tools(self, software_licenses):
-        """Find duplicate or overlapping software tools"""
-        categories = {
-            'Communication': ['Slack', 'Teams', 'Zoom', 'Google Meet'],
-            'Productivity': ['Microsoft 365', 'Google Workspace', 'Notion'],
-            'Project Management': ['Jira', 'Asana', 'Monday.com', 'Trello'],
-            'CRM': ['Salesforce', 'HubSpot', 'Zoho'],
-            'Analytics': ['Tableau', 'Power BI', 'Looker']
-        }
-        
-        duplicates = {}
-        
-        for category, keywords in categories.items():
-            matching_tools = [
-                s for s in software_licenses
-                if any(kw.lower() in s.get('software_name', '').lower() for kw in keywords)
-            ]
-            if len(matching_tools) > 1:
-                duplicates[category] = matching_tools
-        
-        return duplicates
\ No newline at end of file
+            selected.append(rule.id)
+            recommendation = {
+                'type': rule.type,
+                'title': rule.title.format(**values),
+                'description': rule.description.format(**values),
+                'potential_value': values['value'],
+                'priority': PRIORITIES[priorities[i]]
+            }
+            for key, field in role.reference.items():
+                recommendation[key] = source.get(field)
+            return recommendation
+        return build
+    
+    def _count(self, role, counters, selected):
+        with self._lock:
+            for rule_id, rows, matches, elapsed in counters:
+                stats = self._stats.setdefault((role, rule_id), {
+                    'calls': 0, 'rows': 0, 'matches': 0, 'selected': 0, 'total_ms': 0.0
+                })
+                stats['calls'] += 1
+                stats['rows'] += rows
+                stats['matches'] += matches
+                stats['selected'] += selected.count(rule_id)
+                stats['total_ms'] += elapsed
+    
+    def _select_top(self, candidates, limit):
+        """
+        Best recommendations by priority, then value, then generation order
+        
+        Args:
+            candidates (list): (priority rank, rule position, rows, values,
+                build) groups; rows ascending, build(row) -> recommendation
+            limit (int): Recommendations returned
+        
+        Returns:
+            list: Built recommendations, best first. Ties keep the order a
+                row-by-row loop over rows, then rules, would produce
+        """
+        shortlist = []
+        for rank, position, rows, values, build in candidates:
+            keep = self._top_k(values, limit)
+            shortlist.extend(
+                (rank, -value, row, position, build)
+                for row, value in zip(rows[keep].tolist(), values[keep].tolist())
+            )
+        
+        shortlist.sort(key=lambda c: c[:4])
+        return [build(row) for _, _, row, _, build in shortlist[:limit]]
+    
+    def _top_k(self, values, k):
+        """Positions of the k largest values, the earliest first among ties"""
+        if len(values) <= k:
+            return np.arange(len(values))
+        
+        key = -values
+        kth = np.partition(key, k - 1)[k - 1]
+        better = np.flatnonzero(key < kth)
+        ties = np.flatnonzero(key == kth)[:k - len(better)]
+        return np.concatenate([better, ties])
+    
+    def _table(self, records, fields):
+        """
+        Rule inputs as a DataFrame, and a way back to each original record
+        
+        Args:
+            records: List of dicts, DataFrame or dict of columns
+            fields (dict): Columns to extract and their defaults
+        
+        Returns:
+            tuple: (DataFrame with every field, defaults filled in;
+                record(i) -> dict of row i as the rules' templates read it)
+        """
+        if isinstance(records, (pd.DataFrame, dict)):
+            frame = pd.DataFrame(records)
+            
+            def record(i):
+                return {
+                    k: v.item() if isinstance(v, np.generic) else v
+                    for k, v in frame.iloc[i].items() if not (v is None or v is pd.NaT or v != v)
+                }
+            
+            columns = FeatureColumns(frame)
+        else:
+            records = list(records)
+            record = records.__getitem__
+            columns = FeatureColumns(records)
+        
+        table = pd.DataFrame(index=pd.RangeIndex(len(columns)))
+        for f, default in fields.items():
+            if isinstance(default, (int, float)):
+                table[f] = columns.numeric(f, default)
+                continue
+            raw = columns.raw(f)
+            if raw is None or raw.dtype == object:
+                table[f] = pd.Series(raw if raw is not None else default, index=table.index, dtype=object)
+            else:
+                table[f] = raw
+            if isinstance(default, str):
+                table[f] = table[f].fillna(default).astype(str)
+        
+        return table, record
+    
+    def _find_duplicate_tools(self, names):
+        """
+        Find duplicate or overlapping software tools
+        
+        Args:
+            names (np.ndarray): Software name per license
+            
+        Returns:
+            dict: Row indices of matching licenses per catalog category
+                with more than one match
+        """
+        return {category: rows for category, rows in self.catalog.match(names).items() if len(rows) > 1}
@@ -0,0 +1,334 @@
+"""
+Recommendation Rules
+Declarative rule files compiled into vectorized predicates
+"""
+
+import ast
+import hashlib
+import json
+import operator
+import os
+import string
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recommendation_rules.yaml')
+
+PRIORITIES = ('high', 'medium', 'low')
+# Computed by the engine from other fields: name -> field it needs
+DERIVED_FIELDS = {'days_until_renewal': 'renewal_date'}
+
+_BINARY = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_COMPARE = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne
+}
+
+class RuleError(ValueError):
+    """A rule file that can't be loaded"""
+
+class Expression:
+    """
+    A rule expression, compiled once
+
+    vector() evaluates it over a whole table (Series in, Series out), and
+    scalar() over one row's values, with the same results. Constructs where
+    element-wise and Python semantics differ are rejected when the rule is
+    loaded: ``and``/``or``/``not`` only take comparisons or booleans (the
+    vector form is ``&``/``|``/``~``, not truthiness), and nothing is
+    compared with None (missing values are NaN in a table).
+    """
+
+    def __init__(self, source, names):
+        """
+        Args:
+            source: Expression text, or a number/string/bool constant
+            names (set): Names the expression may reference
+
+        Raises:
+            RuleError: On a syntax error, an unknown name or a construct
+                outside the rule language
+        """
+        self.source = str(source)
+        if isinstance(source, (bool, int, float)) or source is None:
+            self.vector = self.scalar = lambda values: source
+            self.names = set()
+            return
+
+        try:
+            tree = ast.parse(self.source, mode='eval')
+        except SyntaxError as e:
+            raise RuleError(f"Invalid expression '{self.source}': {e.msg}")
+
+        self.names = set()
+        self.vector, self.scalar = self._compile(tree.body, names)
+
+    def _compile(self, node, names):
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                raise RuleError(f"Unknown field '{node.id}' in '{self.source}'")
+            self.names.add(node.id)
+            key = node.id
+            return (lambda t: t[key]), (lambda row: row[key])
+
+        if isinstance(node, ast.Constant) and node.value is None:
+            raise RuleError(f"Can't compare with None in '{self.source}'; a missing field takes its default")
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+            value = node.value
+            return (lambda t: value), (lambda row: value)
+
+        if isinstance(node, ast.BoolOp):
+            self._check_boolean(node.values, node)
+            parts = [self._compile(v, names) for v in node.values]
+            if isinstance(node.op, ast.And):
+                return (
+                    lambda t: reduce(operator.and_, (vec(t) for vec, _ in parts)),
+                    lambda row: all(sca(row) for _, sca in parts)
+                )
+            return (
+                lambda t: reduce(operator.or_, (vec(t) for vec, _ in parts)),
+                lambda row: any(sca(row) for _, sca in parts)
+            )
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+            if isinstance(node.op, ast.Not):
+                self._check_boolean([node.operand], node)
+            vec, sca = self._compile(node.operand, names)
+            if isinstance(node.op, ast.Not):
+                return (lambda t: ~vec(t)), (lambda row: not sca(row))
+            return (lambda t: -vec(t)), (lambda row: -sca(row))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            op = _BINARY[type(node.op)]
+            (lvec, lsca), (rvec, rsca) = self._compile(node.left, names), self._compile(node.right, names)
+            return (lambda t: op(lvec(t), rvec(t))), (lambda row: op(lsca(row), rsca(row)))
+
+        if isinstance(node, ast.Compare):
+            # a < b < c is (a < b) and (b < c)
+            operands = [node.left] + node.comparators
+            checks = [
+                self._comparison(op, operands[i], operands[i + 1], names)
+                for i, op in enumerate(node.ops)
+            ]
+            if len(checks) == 1:
+                return checks[0]
+            return (
+                lambda t: reduce(operator.and_, (vec(t) for vec, _ in checks)),
+                lambda row: all(sca(row) for _, sca in checks)
+            )
+
+        raise RuleError(f"Unsupported syntax '{ast.unparse(node)}' in '{self.source}'")
+
+    def _check_boolean(self, operands, node):
+        """and/or/not operands must be booleans, where & | ~ match Python"""
+        for operand in operands:
+            if not _is_boolean(operand):
+                raise RuleError(
+                    f"'{ast.unparse(node)}' needs comparisons or booleans around "
+                    f"'and'/'or'/'not', not '{ast.unparse(operand)}', in '{self.source}'"
+                )
+
+    def _comparison(self, op, left, right, names):
+        lvec, lsca = self._compile(left, names)
+
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(right, (ast.List, ast.Tuple)) or \
+                    not all(isinstance(e, ast.Constant) and e.value is not None for e in right.elts):
+                raise RuleError(f"'in' needs a list of constants other than None in '{self.source}'")
+            options = [e.value for e in right.elts]
+            negate = isinstance(op, ast.NotIn)
+
+            def vector(t):
+                found = lvec(t)
+                found = found.isin(options) if isinstance(found, pd.Series) else found in options
+                return ~found if negate else found
+
+            return vector, (lambda row: (lsca(row) in options) != negate)
+
+        if type(op) not in _COMPARE:
+            raise RuleError(f"Unsupported comparison in '{self.source}'")
+        compare = _COMPARE[type(op)]
+        rvec, rsca = self._compile(right, names)
+        return (lambda t: compare(lvec(t), rvec(t))), (lambda row: compare(lsca(row), rsca(row)))
+
+    def mask(self, table, size=None):
+        """Boolean array over the table's rows (a DataFrame, or size rows of a dict of columns)"""
+        result = self.vector(table)
+        if isinstance(result, pd.Series):
+            if result.dtype != bool:
+                result = result.fillna(False)
+            return result.to_numpy(dtype=bool)
+        return np.full(len(table) if size is None else size, bool(result))
+
+    def values(self, table):
+        """Float array over the table's rows"""
+        result = self.vector(table)
+        if isinstance(result, pd.Series):
+            return result.to_numpy(dtype=float)
+        return np.full(len(table), float(result))
+
+class Rule:
+    """One compiled recommendation rule"""
+
+    def __init__(self, spec, fields):
+        known = {'id', 'type', 'when', 'value', 'priority', 'params', 'title', 'description'}
+        _check_keys(spec, known, {'id', 'type', 'when', 'title', 'description'}, f"rule {spec.get('id', '?')}")
+
+        self.id = str(spec['id'])
+        self.type = str(spec['type'])
+        self.when = Expression(spec['when'], fields)
+        self.value = Expression(spec.get('value', 0), fields)
+
+        priority = spec.get('priority', 'medium')
+        if isinstance(priority, str):
+            priority = {'default': priority}
+        if not isinstance(priority, dict) or priority.get('default') not in PRIORITIES:
+            raise RuleError(f"Rule {self.id}: priority must be one of {PRIORITIES} or have a default one")
+        if any(level not in PRIORITIES + ('default',) for level in priority):
+            raise RuleError(f"Rule {self.id}: unknown priority in {sorted(priority)}")
+        self.default_priority = priority['default']
+        self.priority = [
+            (level, Expression(condition, fields | {'value'}))
+            for level, condition in priority.items() if level != 'default'
+        ]
+
+        self.params = {name: Expression(expr, fields | {'value'}) for name, expr in (spec.get('params') or {}).items()}
+        self.title = str(spec['title'])
+        self.description = str(spec['description'])
+        templated = _check_template(self.title, fields | {'value'} | set(self.params), self.id) | \
+            _check_template(self.description, fields | {'value'} | set(self.params), self.id)
+
+        # Fields the vectorized parts read (the rest only feed templates)
+        self.columns = (self.when.names | self.value.names | {n for _, e in self.priority for n in e.names}) - {'value'}
+        # Every input the rule's output depends on, derived fields replaced
+        # by what they're derived from
+        read = self.columns | {n for e in self.params.values() for n in e.names} | templated
+        read -= {'value'} | set(self.params)
+        self.fields = {DERIVED_FIELDS.get(name, name) for name in read}
+
+    def priorities(self, table, values):
+        """
+        Priority per row as an index into PRIORITIES: the first level whose
+        condition holds, else the default
+        """
+        default = PRIORITIES.index(self.default_priority)
+        if not self.priority:
+            return np.full(len(table), default, dtype=np.int8)
+        # The columns the conditions read, without copying the table
+        scope = {name: table[name] for _, condition in self.priority for name in condition.names - {'value'}}
+        scope['value'] = pd.Series(values, index=table.index)
+        return np.select(
+            [condition.mask(scope, len(table)) for _, condition in self.priority],
+            [PRIORITIES.index(level) for level, _ in self.priority],
+            default
+        ).astype(np.int8)
+
+class RoleRules:
+    """Rules for one role ('msp' or 'it_admin')"""
+
+    def __init__(self, role, spec):
+        _check_keys(spec, {'source', 'limit', 'reference', 'fields', 'rules', 'consolidation'},
+                    {'source', 'fields', 'rules'}, role)
+        if 'value' in spec['fields']:
+            raise RuleError(f"{role}: 'value' is reserved and can't be a field")
+
+        self.role = role
+        self.source = spec['source']
+        self.limit = int(spec.get('limit', 10))
+        self.reference = dict(spec.get('reference') or {})
+        self.fields = dict(spec['fields'])
+        names = set(self.fields) | {d for d, needs in DERIVED_FIELDS.items() if needs in self.fields}
+
+        self.rules = [Rule(rule, names) for rule in spec['rules'] or []]
+        ids = [rule.id for rule in self.rules]
+        if len(set(ids)) != len(ids):
+            raise RuleError(f"{role}: duplicate rule ids")
+        for key, field in self.reference.items():
+            if field not in self.fields:
+                raise RuleError(f"{role}: reference {key} uses unknown field '{field}'")
+
+        self.consolidation = spec.get('consolidation')
+        if self.consolidation is not None:
+            _check_keys(self.consolidation, {'name', 'cost', 'savings_rate', 'priority', 'title', 'description'},
+                        {'name', 'cost', 'savings_rate', 'title', 'description'}, f"{role} consolidation")
+            for key in ('name', 'cost'):
+                if self.consolidation[key] not in self.fields:
+                    raise RuleError(f"{role} consolidation: {key} uses unknown field '{self.consolidation[key]}'")
+            if self.consolidation.get('priority', 'medium') not in PRIORITIES:
+                raise RuleError(f"{role} consolidation: priority must be one of {PRIORITIES}")
+            for template in (self.consolidation['title'], self.consolidation['description']):
+                _check_template(template, {'category', 'tools'}, f"{role} consolidation")
+
+        self.columns = {name for rule in self.rules for name in rule.columns}
+        if self.consolidation is not None:
+            self.columns |= {self.consolidation['name'], self.consolidation['cost']}
+
+class RuleSet:
+    """Every role's compiled rules from one file"""
+
+    def __init__(self, spec, version=None, path=None):
+        if not isinstance(spec, dict) or not spec:
+            raise RuleError("A rule file maps roles to their rules")
+        self.roles = {role: RoleRules(role, role_spec) for role, role_spec in spec.items()}
+        self.version = version
+        self.path = path
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """
+    Load, validate and compile a YAML or JSON rule file
+
+    Raises:
+        RuleError: If the file can't be parsed or a rule is invalid
+    """
+    with open(path, 'rb') as f:
+        text = f.read()
+
+    if path.endswith('.json'):
+        parse = json.loads
+    else:
+        import yaml
+        parse = yaml.safe_load
+
+    try:
+        spec = parse(text)
+    except Exception as e:
+        # json.JSONDecodeError or yaml.YAMLError
+        raise RuleError(f"Can't parse {path}: {e}")
+
+    return RuleSet(spec, version=hashlib.sha256(text).hexdigest()[:12], path=path)
+
+def _is_boolean(node):
+    """Whether an expression node always evaluates to booleans"""
+    if isinstance(node, ast.Compare):
+        return True
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, bool)
+    if isinstance(node, ast.BoolOp):
+        return all(_is_boolean(v) for v in node.values)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return _is_boolean(node.operand)
+    return False
+
+def _check_keys(spec, allowed, required, where):
+    if not isinstance(spec, dict):
+        raise RuleError(f"{where}: expected a mapping")
+    unknown = set(spec) - allowed
+    missing = required - set(spec)
+    if unknown:
+        raise RuleError(f"{where}: unknown keys {sorted(unknown)}")
+    if missing:
+        raise RuleError(f"{where}: missing keys {sorted(missing)}")
+
+def _check_template(template, names, where):
+    try:
+        fields = [name for _, name, _, _ in string.Formatter().parse(template) if name is not None]
+    except ValueError as e:
+        raise RuleError(f"{where}: bad template '{template}': {e}")
+    used = {name.split('.')[0].split('[')[0] for name in fields}
+    unknown = sorted(used - names)
+    if unknown:
+        raise RuleError(f"{where}: template uses unknown fields {unknown}")
+    return used
@@ -0,0 +1,266 @@
+"""
+Seasonal Baseline
+Additive Holt-Winters expected-cost model, fitted for many series at once
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import product
+
+import numpy as np
+
+# Smoothing parameter grid searched per series (level, trend, season)
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.0, 0.05, 0.2)
+GAMMAS = (0.05, 0.2, 0.5)
+CHUNK_SIZE = 2048
+
+class SeasonalBaseline:
+    """
+    Holt-Winters (additive) baseline for cost series
+
+    fit_batch runs the recursions over time with NumPy operating across
+    all series and all grid parameter combinations at once, then keeps the
+    combination with the lowest one-step-ahead squared error per series.
+    Fitted states are cached per series id; when the same series comes
+    back with new points appended, only those points are applied.
+    """
+
+    def __init__(self, season_length=12, cache_size=100000):
+        """
+        Args:
+            season_length (int): Points per season, e.g. 12 for monthly
+                costs with annual true-ups (quarterly cycles divide it)
+            cache_size (int): Fitted series states kept in memory
+        """
+        self.season_length = season_length
+        self.min_points = 2 * season_length
+        self.cache_size = cache_size
+
+        grid = np.array(list(product(ALPHAS, BETAS, GAMMAS)))
+        self._alpha, self._beta, self._gamma = (grid[:, i:i + 1] for i in range(3))
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fit_batch(self, costs, valid, series_ids=None):
+        """
+        Fit every series with at least two seasons of history
+
+        Args:
+            costs (np.ndarray): (n_series, max_len) costs, left-aligned
+            valid (np.ndarray): Boolean mask of real (non-padding) points
+            series_ids (list): Optional id per series to cache fitted
+                states under; series with a None id are not cached
+
+        Returns:
+            tuple: (forecast, residual_std) arrays for the next point of
+                each series; NaN where a series is too short to fit
+        """
+        costs = np.asarray(costs, dtype=float)
+        counts = valid.sum(axis=1)
+        forecast = np.full(len(costs), np.nan)
+        residual_std = np.full(len(costs), np.nan)
+
+        fitted = np.flatnonzero(counts >= self.min_points)
+        if not len(fitted):
+            return forecast, residual_std
+
+        # Chunks of series keep the (combos, series) working set in cache
+        state = {}
+        for start in range(0, len(fitted), CHUNK_SIZE):
+            rows = fitted[start:start + CHUNK_SIZE]
+            width = counts[rows].max()
+            chunk = self._fit_chunk(costs[rows, :width], valid[rows, :width])
+            for key, value in chunk.items():
+                state.setdefault(key, []).append(value)
+        state = {key: np.concatenate(parts) for key, parts in state.items()}
+
+        n = counts[fitted]
+        forecast[fitted] = self._forecast(state, n)
+        residual_std[fitted] = np.sqrt(state['sse'] / state['n_resid'])
+
+        if series_ids is not None:
+            with self._lock:
+                for j, i in enumerate(fitted):
+                    if series_ids[i] is None:
+                        continue
+                    self._store(series_ids[i], {
+                        'n': int(n[j]),
+                        'tail': costs[i, n[j] - self.season_length:n[j]].copy(),
+                        **{key: value[j] for key, value in state.items()}
+                    })
+
+        return forecast, residual_std
+
+    def _fit_chunk(self, y, mask):
+        """Grid-searched Holt-Winters states for a block of series"""
+        level, trend, season = self._initial_state(y)
+
+        # Every parameter combination for every series: (combos, series)
+        k = len(self._alpha)
+        level = np.repeat(level[None], k, axis=0)
+        trend = np.repeat(trend[None], k, axis=0)
+        season = np.repeat(season[:, None], k, axis=1)
+        sse, n_resid = self._run(y, mask, 0, level, trend, season, self._alpha, self._beta, self._gamma)
+
+        best = np.argmin(sse, axis=0)
+        cols = np.arange(len(y))
+        return {
+            'level': level[best, cols],
+            'trend': trend[best, cols],
+            'season': season[:, best, cols].T,
+            'alpha': self._alpha[best, 0],
+            'beta': self._beta[best, 0],
+            'gamma': self._gamma[best, 0],
+            'sse': sse[best, cols],
+            'n_resid': n_resid
+        }
+
+    def forecast(self, history, series_id=None):
+        """
+        Expected next value for one series
+
+        Reuses the cached state for series_id when history extends the
+        points it was fitted on, applying only the new points.
+
+        Returns:
+            tuple: (forecast, residual_std), or None when history is
+                shorter than two seasons
+        """
+        history = np.asarray(history, dtype=float)
+        if len(history) < self.min_points:
+            return None
+
+        state = self._cached(series_id, history)
+        if state is None:
+            forecast, residual_std = self.fit_batch(
+                history[None], np.ones((1, len(history)), dtype=bool),
+                None if series_id is None else [series_id]
+            )
+            return float(forecast[0]), float(residual_std[0])
+
+        new = history[state['n']:]
+        if len(new):
+            state = self._extend(state, new)
+            if series_id is not None:
+                with self._lock:
+                    self._store(series_id, state)
+
+        return (
+            float(self._forecast(state, state['n'])),
+            float(np.sqrt(state['sse'] / state['n_resid']))
+        )
+
+    def _cached(self, series_id, history):
+        if series_id is None:
+            return None
+        with self._lock:
+            state = self._cache.get(series_id)
+            if state is None:
+                return None
+            self._cache.move_to_end(series_id)
+
+        # Only continue from the cache if history is that series plus new points
+        n = state['n']
+        if len(history) < n or not np.array_equal(history[n - self.season_length:n], state['tail']):
+            return None
+        return state
+
+    def _extend(self, state, new):
+        """State after applying new points with the series' fitted parameters"""
+        level = np.array([[state['level']]])
+        trend = np.array([[state['trend']]])
+        season = state['season'][:, None, None].copy()
+        params = [np.array([[state[p]]]) for p in ('alpha', 'beta', 'gamma')]
+
+        sse, n_resid = self._run(new[None], np.ones((1, len(new)), dtype=bool),
+                                 state['n'], level, trend, season, *params)
+
+        n = state['n'] + len(new)
+        tail = np.concatenate([state['tail'], new])[-self.season_length:]
+        return {
+            **state,
+            'n': n,
+            'tail': tail,
+            'level': level[0, 0],
+            'trend': trend[0, 0],
+            'season': season[:, 0, 0],
+            'sse': state['sse'] + sse[0, 0],
+            'n_resid': state['n_resid'] + n_resid[0]
+        }
+
+    def _store(self, series_id, state):
+        self._cache[series_id] = state
+        self._cache.move_to_end(series_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _initial_state(self, y):
+        """Level, trend and (season_length, n_series) seasonal offsets from each
+        series' first two seasons"""
+        m = self.season_length
+        first, second = y[:, :m], y[:, m:2 * m]
+        level = first.mean(axis=1)
+        trend = (second.mean(axis=1) - level) / m
+        season = ((first - level[:, None]) + (second - second.mean(axis=1)[:, None])) / 2
+        return level, trend, season.T
+
+    def _run(self, y, mask, start, level, trend, season, alpha, beta, gamma):
+        """
+        Apply the Holt-Winters recursions in place, one time step at a time
+
+        Args:
+            y (np.ndarray): (n_series, steps) observations
+            mask (np.ndarray): Which observations are real
+            start (int): Series position of y[:, 0], for the season phase
+            level, trend (np.ndarray): (combos, n_series) states
+            season (np.ndarray): (season_length, combos, n_series) offsets
+            alpha, beta, gamma: (combos, 1) smoothing parameters
+
+        Returns:
+            tuple: Squared one-step errors (combos, n_series) and the
+                number of errors per series, counted after the first season
+        """
+        m = self.season_length
+        sse = np.zeros(level.shape)
+        n_resid = np.zeros(level.shape[1])
+
+        # Time-major, so each step reads contiguous rows
+        y = np.ascontiguousarray(y.T)
+        mask = np.ascontiguousarray(mask.T)
+
+        for t in range(len(y)):
+            position = start + t
+            phase = position % m
+            observed = y[t]
+            step = mask[t]
+
+            previous = season[phase]
+            error = observed - (level + trend + previous)
+
+            new_level = alpha * (observed - previous) + (1 - alpha) * (level + trend)
+            new_trend = beta * (new_level - level) + (1 - beta) * trend
+            new_season = gamma * (observed - new_level) + (1 - gamma) * previous
+
+            if step.all():
+                level[:], trend[:], season[phase] = new_level, new_trend, new_season
+            else:
+                # Series that have run out of points keep their state
+                level[:] = np.where(step, new_level, level)
+                trend[:] = np.where(step, new_trend, trend)
+                season[phase] = np.where(step, new_season, previous)
+
+            if position >= m:
+                sse += np.where(step, error * error, 0.0)
+                n_resid += step
+
+        return sse, n_resid
+
+    def _forecast(self, state, n):
+        """One-step-ahead forecast after n points"""
+        season = np.atleast_2d(state['season'])
+        phase = np.asarray(n) % self.season_length
+        return state['level'] + state['trend'] + np.take_along_axis(
+            season, np.atleast_1d(phase)[:, None], axis=1
+        )[:, 0].reshape(np.shape(state['level']))
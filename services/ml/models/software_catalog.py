@@ -0,0 +1,128 @@
+"""
+Software Catalog
+Keyword catalog of software categories with a one-pass multi-pattern matcher
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Category -> product keywords matched case-insensitively anywhere in a name
+DEFAULT_CATALOG = {
+    'Communication': ['Slack', 'Teams', 'Zoom', 'Google Meet'],
+    'Productivity': ['Microsoft 365', 'Google Workspace', 'Notion'],
+    'Project Management': ['Jira', 'Asana', 'Monday.com', 'Trello'],
+    'CRM': ['Salesforce', 'HubSpot', 'Zoho'],
+    'Analytics': ['Tableau', 'Power BI', 'Looker']
+}
+
+class SoftwareCatalog:
+    """
+    Matches software names against every catalog keyword at once
+
+    All keywords are compiled into one regex alternation, longest first,
+    and each scan restarts one character after the previous match start,
+    so overlapping keywords are all found. A keyword that occurs inside a
+    longer one is credited through the longer one. Together that finds
+    every category whose keyword occurs in a name, as a substring test per
+    keyword would. Names are deduplicated and scanned as one string.
+    """
+
+    def __init__(self, catalog=None):
+        """
+        Args:
+            catalog (dict): Category -> keywords; defaults to DEFAULT_CATALOG
+        """
+        self.catalog = {category: list(keywords) for category, keywords in (catalog or DEFAULT_CATALOG).items()}
+        self._compile()
+
+    def extend(self, category, keywords):
+        """Add keywords to a category (created if new) and recompile"""
+        self.catalog.setdefault(category, []).extend(keywords)
+        self._compile()
+
+    def match(self, names):
+        """
+        Catalog categories found in each name
+
+        Args:
+            names: Software names (None counts as no name)
+
+        Returns:
+            dict: Category -> ascending indices of the names it matches,
+                for categories with at least one match, in catalog order
+        """
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object).fillna('').astype(str))
+        if not len(uniques) or self._pattern is None:
+            return {}
+
+        # One scan over every distinct name, newline-separated
+        text = '\n'.join(uniques).lower()
+        starts = np.cumsum([0] + [len(name) + 1 for name in uniques[:-1]])
+        positions, keywords = self._scan(text)
+        if not positions:
+            return {}
+
+        owners = np.searchsorted(starts, positions, side='right') - 1
+        keywords = np.array(keywords, dtype=object)
+        matched = np.zeros((len(self._categories), len(uniques)), dtype=bool)
+        for keyword, categories in self._keyword_categories.items():
+            matched[np.ix_(categories, owners[keywords == keyword])] = True
+
+        # Back from distinct names to rows
+        rows = matched[:, codes]
+        return {
+            category: np.flatnonzero(rows[k])
+            for k, category in enumerate(self._categories) if rows[k].any()
+        }
+
+    def categorize(self, name):
+        """
+        Most specific category for one name, e.g. at license ingest
+
+        Returns:
+            str: Category of the longest keyword found in the name (catalog
+                order breaks ties), or None
+        """
+        if not name or self._pattern is None:
+            return None
+
+        _, found = self._scan(name.lower())
+        if not found:
+            return None
+        keyword = max(found, key=len)
+        return self._categories[self._keyword_owner[keyword]]
+
+    def _scan(self, text):
+        """Start and keyword of every keyword occurrence, longest per start"""
+        positions, keywords = [], []
+        search = self._pattern.search
+        match = search(text)
+        while match:
+            start = match.start()
+            positions.append(start)
+            keywords.append(match.group())
+            # Group-free search from the next character keeps the regex's
+            # fast literal prefix scan and still finds overlapping keywords
+            match = search(text, start + 1)
+        return positions, keywords
+
+    def _compile(self):
+        self._categories = list(self.catalog)
+        owners = {}
+        for k, keywords in enumerate(self.catalog.values()):
+            for keyword in keywords:
+                owners.setdefault(keyword.lower(), []).append(k)
+
+        self._keyword_owner = {keyword: min(ks) for keyword, ks in owners.items()}
+
+        # A keyword implies the categories of every keyword it contains
+        self._keyword_categories = {
+            keyword: sorted({k for other, ks in owners.items() if other in keyword for k in ks})
+            for keyword in owners
+        }
+
+        # Longest first, so at each position the longest keyword is reported
+        alternatives = sorted(owners, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, alternatives))) if alternatives else None
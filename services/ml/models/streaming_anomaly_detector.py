@@ -0,0 +1,317 @@
+"""
+Streaming Anomaly Detector
+Keeps running per-series cost statistics and flags anomalies on ingest
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+# Durable, next to the model registry's trained_models/ (gitignored); set
+# ANOMALY_STATE_DIR on read-only deployments such as Lambda
+DEFAULT_STATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'state'
+)
+SNAPSHOT_NAME = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series_state (
+    series_id TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    ewma REAL NOT NULL,
+    median REAL NOT NULL,
+    abs_deviation REAL NOT NULL,
+    last_value REAL NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID
+"""
+_COLUMNS = ('n', 'mean', 'm2', 'ewma', 'median', 'abs_deviation', 'last_value', 'updated_at')
+
+class StreamingAnomalyDetector:
+    """
+    Online cost anomaly detection with O(1) updates per observation
+
+    Each series keeps a Welford running mean/variance, an EWMA, and a
+    robust median estimate (a frugal-streaming median that steps toward
+    each value by a fraction of the running absolute deviation). A new
+    value is scored against the state before it is added, with the same
+    rules as AnomalyDetector.detect over the full history when that
+    detector's seasonal baseline is off.
+
+    State lives in one SQLite row per series (WAL mode), so every worker
+    process sees and updates the same state and it survives restarts.
+    """
+
+    def __init__(self, path=None, alpha=0.3, median_rate=0.2, threshold=2.5):
+        """
+        Args:
+            path (str): SQLite state file; defaults to
+                $ANOMALY_STATE_DIR/streaming_anomaly.db (state/ next to
+                trained_models/ by default)
+            alpha (float): EWMA smoothing factor
+            median_rate (float): Median step as a fraction of the running
+                absolute deviation
+            threshold (float): Z-score above which a value is anomalous
+        """
+        state_dir = os.getenv('ANOMALY_STATE_DIR', DEFAULT_STATE_DIR)
+        self.path = path or os.path.join(state_dir, 'streaming_anomaly.db')
+        self.snapshot_dir = os.path.join(os.path.dirname(os.path.abspath(self.path)), 'snapshots')
+        self.alpha = alpha
+        self.median_rate = median_rate
+        self.threshold = threshold
+
+        # One connection per thread and process, opened on first use so
+        # nothing touches the filesystem at import; SQLite serializes
+        # writers across gunicorn workers
+        self._local = threading.local()
+
+    def _connection(self):
+        # Connections must not cross a fork, e.g. gunicorn's preload_app
+        conn, pid = getattr(self._local, 'conn', None), getattr(self._local, 'pid', None)
+        if conn is None or pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def update(self, series_id, value, timestamp=None):
+        """
+        Ingest one observation
+
+        Returns:
+            dict: Anomaly result for the value, scored against the state
+                before it was added
+        """
+        return self.update_many([(series_id, value, timestamp)])[0]
+
+    def update_many(self, observations):
+        """
+        Ingest observations in order within one transaction
+
+        Args:
+            observations (list): (series_id, value[, timestamp]) tuples or
+                dicts with those keys
+
+        Returns:
+            list: One anomaly result per observation
+        """
+        observations = [self._observation(o) for o in observations]
+        if not observations:
+            return []
+
+        results = []
+        with self._transaction() as conn:
+            states = self._fetch(conn, {series_id for series_id, _, _ in observations})
+
+            for series_id, value, timestamp in observations:
+                state = states.get(series_id)
+                result = self._score(state, value)
+                states[series_id] = self._advance(state, value, timestamp)
+                result['series_id'] = series_id
+                result['statistics'] = self._statistics(states[series_id])
+                results.append(result)
+
+            conn.executemany(
+                f"INSERT OR REPLACE INTO series_state (series_id, {', '.join(_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(_COLUMNS))})",
+                [(series_id,) + tuple(state[c] for c in _COLUMNS) for series_id, state in states.items()]
+            )
+
+        return results
+
+    def get(self, series_id):
+        """
+        Current statistics for a series
+
+        Returns:
+            dict: Running statistics, or None for an unknown series
+        """
+        state = self._fetch(self._connection(), {series_id}).get(series_id)
+        if state is None:
+            return None
+        return {'series_id': series_id, **self._statistics(state)}
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM series_state').fetchone()[0]
+
+    def snapshot(self, name=None):
+        """
+        Copy the current state to snapshots/<name>.db
+
+        Returns:
+            str: Snapshot name
+        """
+        name = name or datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+        target = self._snapshot_path(name)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+        staging = f'{target}.tmp'
+        dest = sqlite3.connect(staging)
+        try:
+            self._connection().backup(dest)
+            # A standalone file, not a WAL database with -wal/-shm siblings
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+        os.replace(staging, target)
+        return name
+
+    def restore(self, name):
+        """Replace the current state with a snapshot"""
+        source_path = self._snapshot_path(name)
+        if not os.path.exists(source_path):
+            raise ValueError(f"Unknown snapshot: {name}")
+
+        source = sqlite3.connect(source_path)
+        try:
+            source.backup(self._connection())
+        finally:
+            source.close()
+
+    def list_snapshots(self):
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return sorted(f[:-3] for f in os.listdir(self.snapshot_dir) if f.endswith('.db'))
+
+    def _snapshot_path(self, name):
+        if not SNAPSHOT_NAME.match(name):
+            raise ValueError(f"Invalid snapshot name: {name}")
+        return os.path.join(self.snapshot_dir, f'{name}.db')
+
+    def _observation(self, observation):
+        if isinstance(observation, dict):
+            observation = (observation.get('series_id'), observation.get('value'), observation.get('timestamp'))
+        series_id, value = observation[0], observation[1]
+        timestamp = observation[2] if len(observation) > 2 else None
+
+        if series_id is None or value is None:
+            raise ValueError("Each observation needs a series_id and a value")
+        return str(series_id), float(value), timestamp or datetime.utcnow().isoformat()
+
+    def _fetch(self, conn, series_ids):
+        states = {}
+        series_ids = list(series_ids)
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(series_ids), 500):
+            chunk = series_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT series_id, {', '.join(_COLUMNS)} FROM series_state "
+                f"WHERE series_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in rows:
+                states[row[0]] = dict(zip(_COLUMNS, row[1:]))
+        return states
+
+    def _score(self, state, value):
+        """Score a value against prior state, with detect()'s rules"""
+        n = state['n'] if state else 0
+        if n == 0:
+            return {
+                'is_anomaly': False,
+                'score': 0.0,
+                'expected_cost': value,
+                'variance_percent': 0.0,
+                'severity': 'low'
+            }
+
+        mean = state['mean']
+        variance_percent = ((value - mean) / mean * 100) if mean > 0 else 0.0
+
+        if n < 3:
+            # Too little history for a z-score: plain percentage threshold
+            is_anomaly = abs(variance_percent) > 30
+            score = min(abs(variance_percent) / 100, 1.0)
+            medium = 30
+        else:
+            std = math.sqrt(state['m2'] / n)
+            z_score = abs((value - mean) / std) if std > 0 else 0.0
+            is_anomaly = z_score > self.threshold
+            score = min(z_score / 5.0, 1.0)
+            medium = 25
+
+        if abs(variance_percent) > 50:
+            severity = 'high'
+        elif abs(variance_percent) > medium:
+            severity = 'medium'
+        else:
+            severity = 'low'
+
+        return {
+            'is_anomaly': is_anomaly,
+            'score': float(score),
+            'expected_cost': float(mean),
+            'variance_percent': float(variance_percent),
+            'severity': severity
+        }
+
+    def _advance(self, state, value, timestamp):
+        """New state after adding one value"""
+        if state is None:
+            return {
+                'n': 1, 'mean': value, 'm2': 0.0, 'ewma': value, 'median': value,
+                'abs_deviation': 0.0, 'last_value': value, 'updated_at': timestamp
+            }
+
+        # Welford
+        n = state['n'] + 1
+        delta = value - state['mean']
+        mean = state['mean'] + delta / n
+        m2 = state['m2'] + delta * (value - mean)
+
+        # Frugal median: step toward the value, sized by the typical deviation
+        median = state['median']
+        step = self.median_rate * state['abs_deviation']
+        if value > median:
+            median = min(median + step, value)
+        elif value < median:
+            median = max(median - step, value)
+        abs_deviation = (1 - self.alpha) * state['abs_deviation'] + self.alpha * abs(value - median)
+
+        return {
+            'n': n,
+            'mean': mean,
+            'm2': m2,
+            'ewma': (1 - self.alpha) * state['ewma'] + self.alpha * value,
+            'median': median,
+            'abs_deviation': abs_deviation,
+            'last_value': value,
+            'updated_at': timestamp
+        }
+
+    def _statistics(self, state):
+        return {
+            'count': state['n'],
+            'mean': state['mean'],
+            'std_dev': math.sqrt(state['m2'] / state['n']),
+            'ewma': state['ewma'],
+            'median': state['median'],
+            'last_value': state['last_value'],
+            'updated_at': state['updated_at']
+        }
+
+class _Transaction:
+    """Context manager running a block in one immediate SQLite transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        # Take the write lock up front so concurrent workers can't interleave
+        # a read-modify-write of the same series
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
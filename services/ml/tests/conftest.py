@@ -9,6 +9,21 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
+@pytest.fixture(autouse=True, scope="session")
+def model_registry_dir(tmp_path_factory):
+    """Publish models trained during tests to a temporary registry"""
+    import os
+    
+    path = tmp_path_factory.mktemp("trained_models")
+    previous = os.environ.get("MODEL_REGISTRY_DIR")
+    os.environ["MODEL_REGISTRY_DIR"] = str(path)
+    yield path
+    if previous is None:
+        os.environ.pop("MODEL_REGISTRY_DIR", None)
+    else:
+        os.environ["MODEL_REGISTRY_DIR"] = previous
+
+
 @pytest.fixture
 def sample_features():
     """Sample feature data for testing"""
@@ -1,6 +1,7 @@
 """
 Tests for anomaly detection
 """
+import numpy as np
 import pytest
 from models.anomaly_detector import AnomalyDetector
 
@@ -79,3 +80,79 @@ def test_statistics_calculation(sample_usage_data):
     assert "max" in stats
     assert stats["mean"] > 0
     assert stats["std"] >= 0
+
+
+def test_detect_batch_matches_detect():
+    """Test batch results match per-series detect() calls"""
+    detector = AnomalyDetector()
+    rng = np.random.default_rng(0)
+    histories = [list(rng.normal(1000, 100, size=n)) for n in (0, 1, 2, 3, 10, 30)]
+    current_costs = [900.0, 2000.0, 1000.0, 1500.0, 3000.0, 1010.0]
+    
+    batch = detector.detect_batch(histories, current_costs, as_records=True)
+    
+    for history, current_cost, result in zip(histories, current_costs, batch):
+        expected = detector.detect(history, current_cost)
+        assert result.keys() == expected.keys()
+        assert result["is_anomaly"] == expected["is_anomaly"]
+        assert result["severity"] == expected["severity"]
+        assert result["explanation"] == expected["explanation"]
+        assert result["score"] == pytest.approx(expected["score"])
+        assert result["expected_cost"] == pytest.approx(expected["expected_cost"])
+        if "statistics" in expected:
+            assert result["statistics"] == pytest.approx(expected["statistics"])
+
+
+def test_detect_batch_padded_input():
+    """Test NaN-padded and length-padded matrices give the same columns"""
+    detector = AnomalyDetector()
+    padded = np.array([
+        [100, 102, 98, 101, np.nan],
+        [50, 55, np.nan, np.nan, np.nan],
+        [10, 12, 11, 13, 10]
+    ])
+    
+    by_nan = detector.detect_batch(padded, [300, 52, 11])
+    by_length = detector.detect_batch(np.nan_to_num(padded), [300, 52, 11], lengths=[4, 2, 5])
+    
+    assert list(by_nan["n_points"]) == [4, 2, 5]
+    assert list(by_nan["is_anomaly"]) == [True, False, False]
+    assert np.isnan(by_nan["median"][1])
+    for key in ("score", "expected_cost", "median", "z_score"):
+        np.testing.assert_array_equal(by_nan[key], by_length[key])
+
+
+def test_change_points_find_level_shifts():
+    """Test changepoint mode locates level shifts and summarizes segments"""
+    detector = AnomalyDetector()
+    rng = np.random.default_rng(0)
+    series = np.concatenate([rng.normal(100, 5, 60), rng.normal(160, 5, 40), rng.normal(90, 5, 50)])
+    
+    result = detector.detect_trend_anomaly(list(series), method="changepoint")
+    
+    assert result["has_anomaly"]
+    assert [c["index"] for c in result["change_points"]] == [60, 100]
+    assert [c["severity"] for c in result["change_points"]] == ["high", "medium"]
+    assert [s["mean"] for s in result["segments"]] == pytest.approx([100, 160, 90], rel=0.03)
+    assert result["segments"][-1]["end"] == 149
+    
+    flat = detector.detect_trend_anomaly([100.0] * 30, method="changepoint")
+    assert not flat["has_anomaly"]
+    assert flat["segments"] == [{"start": 0, "end": 29, "mean": 100.0}]
+
+
+def test_change_points_batch_matches_single_series():
+    """Test the vectorized scan agrees with one-series calls on ragged input"""
+    detector = AnomalyDetector()
+    rng = np.random.default_rng(1)
+    series = []
+    for _ in range(40):
+        n = int(rng.integers(20, 200))
+        values = rng.normal(500, 20, n)
+        values[int(rng.integers(5, n)):] += rng.choice([-150, 0, 150])
+        series.append(list(values))
+    
+    batch = detector.detect_change_points(series)
+    
+    for values, result in zip(series, batch):
+        assert result == detector.detect_change_points([values])[0]
@@ -67,3 +67,39 @@ def test_feature_importance():
         importances = predictor.model.feature_importances_
         assert len(importances) > 0
         assert all(0 <= imp <= 1 for imp in importances)
+
+
+def test_predict_batch_matches_predict():
+    """Test batch prediction returns the same results as per-client predict"""
+    predictor = ChurnPredictor()
+    
+    clients = [
+        {"contract_value": 25000, "monthly_spend": 1000, "total_licenses": 100,
+         "total_users": 60, "support_ticket_frequency": 0.8, "engagement_score": 0.3},
+        {"contract_value": 50000, "monthly_spend": 4000, "total_licenses": 50,
+         "total_users": 45, "support_ticket_frequency": 0.1, "engagement_score": 0.9,
+         "last_support_ticket": "2024-08-15"},
+        {},
+    ]
+    
+    batch = predictor.predict_batch(clients)
+    
+    assert len(batch) == len(clients)
+    for features, result in zip(clients, batch):
+        assert result == predictor.predict(features)
+
+
+def test_predict_batch_empty():
+    """Test batch prediction with no clients"""
+    predictor = ChurnPredictor()
+    
+    assert predictor.predict_batch([]) == []
+
+
+def test_risk_levels_match_risk_level():
+    """Test the vectorized risk labels agree with the per-probability ones, at the thresholds too"""
+    predictor = ChurnPredictor()
+    probabilities = [0.0, 0.29, 0.3, 0.45, 0.59, 0.6, 1.0]
+    
+    assert predictor.risk_levels(probabilities).tolist() == [predictor.risk_level(p) for p in probabilities]
+    assert predictor.risk_levels([]).tolist() == []
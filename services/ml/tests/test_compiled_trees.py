@@ -0,0 +1,97 @@
+"""
+Tests for the compiled NumPy tree evaluator
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import StandardScaler
+
+from models.compiled_trees import CompiledTreeEnsemble, export_gradient_boosting
+from models.churn_predictor import ChurnPredictor
+from models.model_registry import ModelRegistry
+
+
+def make_data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 9)) * [1e4, 1e3, 100, 100, 50, 1, 1, 300, 1] + \
+        [5e4, 5e3, 200, 300, 100, 0.5, 0.8, 500, 0.6]
+    y = (X[:, 8] < 0.5) | (X[:, 5] > 1)
+    return X, y ^ (rng.random(n) < 0.1)
+
+
+@pytest.mark.parametrize("params", [
+    {"max_depth": 5},
+    {"max_depth": 6},
+    {"max_depth": 3, "init": "zero"}
+])
+def test_compiled_matches_predict_proba(params):
+    """Test compiled probabilities are identical to sklearn's"""
+    X, y = make_data(2000)
+    scaler = StandardScaler().fit(X)
+    model = GradientBoostingClassifier(n_estimators=50, random_state=0, **params)
+    model.fit(scaler.transform(X), y)
+    
+    compiled = CompiledTreeEnsemble(export_gradient_boosting(model, scaler))
+    X_test, _ = make_data(5000, seed=1)
+    
+    expected = model.predict_proba(scaler.transform(X_test))
+    np.testing.assert_array_equal(compiled.predict_proba(X_test), expected)
+    np.testing.assert_array_equal(compiled.predict_proba(X_test[0]), expected[:1])
+
+
+def test_compiled_rejects_bad_input():
+    """Test wrong feature counts and non-finite values are rejected"""
+    X, y = make_data(500)
+    compiled = CompiledTreeEnsemble(export_gradient_boosting(
+        GradientBoostingClassifier(n_estimators=5).fit(X, y)
+    ))
+    
+    with pytest.raises(ValueError):
+        compiled.predict_proba(X[:, :8])
+    
+    X[0, 0] = np.nan
+    with pytest.raises(ValueError):
+        compiled.predict_proba(X)
+
+
+def test_churn_predictor_builds_evaluator_once_per_version(tmp_path):
+    """Test requests reuse the loaded version's evaluator, and a swap gets a new one"""
+    predictor = ChurnPredictor(registry=ModelRegistry(str(tmp_path)))
+    predictor.predict({'contract_value': 25000})
+    bundle = predictor._handle.get()
+    evaluator = bundle.derived('compiled', None)
+    
+    predictor.predict_batch([{}, {'engagement_score': 0.2}])
+    assert bundle.derived('compiled', None) is evaluator
+    
+    predictor._handle.swap()
+    predictor.predict({})
+    assert predictor._handle.get().derived('compiled', None) is not evaluator
+
+
+def test_churn_predictor_scores_without_sklearn(tmp_path):
+    """Test serving a published version never imports sklearn or pandas"""
+    ChurnPredictor(registry=ModelRegistry(str(tmp_path))).model_version
+    
+    script = (
+        "import sys\n"
+        "from models.churn_predictor import ChurnPredictor\n"
+        "predictor = ChurnPredictor()\n"
+        "predictor.predict({'contract_value': 25000, 'created_at': '2023-01-01T00:00:00Z'})\n"
+        "predictor.predict_batch([{}, {'engagement_score': 0.2, 'last_support_ticket': '2024-05-01T10:00:00'}])\n"
+        "assert 'sklearn' not in sys.modules, 'sklearn was imported'\n"
+        "assert 'pandas' not in sys.modules, 'pandas was imported'\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "MODEL_REGISTRY_DIR": str(tmp_path)},
+        capture_output=True,
+        text=True
+    )
+    
+    assert result.returncode == 0, result.stderr
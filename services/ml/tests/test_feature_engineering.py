@@ -0,0 +1,124 @@
+"""
+Tests for batch feature extraction
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from models.churn_predictor import ChurnPredictor
+from models.feature_pipeline import FeatureColumns, days_between, parse_timestamps
+from utils.feature_engineering import (
+    CLIENT_FEATURE_COLUMNS, SOFTWARE_FEATURE_COLUMNS, TIME_SERIES_FEATURE_COLUMNS, FeatureEngineer
+)
+
+
+def make_clients(now):
+    return [
+        {'contract_value': 24000, 'monthly_spend': 1500, 'total_licenses': 40, 'total_users': 30,
+         'created_at': (now - timedelta(days=400, hours=3)).isoformat(),
+         'last_support_ticket': now - timedelta(days=12, hours=1)},
+        {'contract_value': 0, 'total_licenses': 0, 'engagement_score': 0.3},
+        {'monthly_spend': 100, 'created_at': (now - timedelta(days=30)).isoformat(), 'health_score': 55}
+    ]
+
+
+def test_client_batch_matches_per_record():
+    """Test the batch extractor gives extract_client_features' values"""
+    engineer = FeatureEngineer()
+    clients = make_clients(datetime.utcnow())
+    
+    batch = engineer.extract_client_features_batch(clients)
+    expected = pd.DataFrame([engineer.extract_client_features(c) for c in clients])
+    
+    assert list(batch.columns) == list(expected.columns) == list(CLIENT_FEATURE_COLUMNS)
+    np.testing.assert_allclose(batch.to_numpy(float), expected.to_numpy(float))
+    pd.testing.assert_frame_equal(engineer.extract_client_features_batch(pd.DataFrame(clients)), batch,
+                                  check_exact=False)
+
+
+def test_software_batch_matches_per_record():
+    """Test the batch extractor gives extract_software_features' values"""
+    engineer = FeatureEngineer()
+    now = datetime.utcnow()
+    licenses = [
+        {'total_licenses': 100, 'active_users': 40, 'monthly_cost': 500, 'annual_cost': 6000,
+         'renewal_date': (now + timedelta(days=45, hours=2)).isoformat()},
+        {'total_licenses': 10, 'active_users': 12, 'monthly_cost': 50,
+         'renewal_date': (now - timedelta(days=3)).isoformat()},
+        {'total_licenses': 0, 'monthly_cost': 20}
+    ]
+    
+    batch = engineer.extract_software_features_batch(licenses)
+    expected = pd.DataFrame([engineer.extract_software_features(s) for s in licenses])
+    
+    assert list(batch.columns) == list(expected.columns) == list(SOFTWARE_FEATURE_COLUMNS)
+    np.testing.assert_allclose(batch.to_numpy(float), expected.to_numpy(float))
+
+
+def test_time_series_batch_matches_per_series():
+    """Test ragged series give create_time_series_features' values, NaN where a feature is missing"""
+    engineer = FeatureEngineer()
+    rng = np.random.default_rng(0)
+    series = [list(rng.normal(100, 20, size)) for size in (0, 1, 2, 6, 7, 12, 30)] + [[0, 5, 3, 3, 9, 1, 4, 4]]
+    
+    batch = engineer.create_time_series_features_batch(series)
+    
+    assert list(batch.columns) == list(TIME_SERIES_FEATURE_COLUMNS)
+    for row, values in zip(batch.to_dict('records'), series):
+        expected = engineer.create_time_series_features(values)
+        for column in TIME_SERIES_FEATURE_COLUMNS:
+            if column in expected:
+                assert row[column] == pytest.approx(expected[column])
+            else:
+                assert np.isnan(row[column])
+    
+    # The same series as a NaN-padded array, or zero-padded with lengths
+    padded = np.full((len(series), 30), np.nan)
+    for i, values in enumerate(series):
+        padded[i, :len(values)] = values
+    pd.testing.assert_frame_equal(engineer.create_time_series_features_batch(padded), batch)
+    pd.testing.assert_frame_equal(
+        engineer.create_time_series_features_batch(np.nan_to_num(padded), lengths=[len(v) for v in series]), batch
+    )
+    
+    # An interior NaN makes the moments NaN, median included, as per series
+    gapped = engineer.create_time_series_features_batch(np.array([[1, np.nan, 3, 4], [1, 2, 3, 4]]))
+    for column in ('mean', 'median', 'std'):
+        assert np.isnan(gapped[column][0]) and np.isnan(engineer.create_time_series_features([1, np.nan, 3, 4])[column])
+    assert gapped['median'][1] == 2.5
+    
+    filled = engineer.create_time_series_features_batch(series, fill_value=0)
+    assert filled.loc[1, 'trend'] == 0 and filled.loc[2, 'rolling_mean'] == 0
+    assert filled.loc[0].isna().all()
+
+
+def test_timestamp_parsing():
+    """Test mixed timestamp inputs parse to UTC and days round down"""
+    parsed = parse_timestamps([
+        '2024-03-01T00:00:00Z', '2024-03-01T02:00:00+02:00', datetime(2024, 3, 1), None, 'not a date'
+    ])
+    
+    assert (parsed[:3] == np.datetime64('2024-03-01T00:00:00')).all()
+    assert np.isnat(parsed[3:]).all()
+    
+    days = days_between(parsed, np.datetime64('2024-02-28T12:00:00'))
+    assert days[0] == -2 and np.isnan(days[3])
+    
+    columns = FeatureColumns([{'a': 1}, {'a': None}, {'a': 'x'}, {}])
+    assert columns.numeric('a', 5).tolist() == [1, 5, 5, 5]
+
+
+def test_churn_matrix_uses_extracted_features():
+    """Test churn reads days since last ticket from FeatureEngineer output"""
+    now = datetime.utcnow()
+    clients = make_clients(now)
+    predictor = ChurnPredictor.__new__(ChurnPredictor)
+    
+    from_raw = predictor._prepare_feature_matrix(clients)
+    from_extracted = predictor._prepare_feature_matrix(FeatureEngineer().extract_client_features_batch(clients))
+    
+    assert from_raw[0, 4] == 12 and from_raw[1, 4] == 365
+    assert from_raw[0, 7] == 400 and from_raw[1, 7] == 0
+    np.testing.assert_array_equal(from_extracted[:, [4, 7]], from_raw[:, [4, 7]])
+    np.testing.assert_array_equal(predictor._prepare_features(clients[0]), from_raw[0])
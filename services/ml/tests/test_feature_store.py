@@ -0,0 +1,130 @@
+"""
+Tests for the feature store
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from models.feature_store import FeatureStore
+
+COLUMNS = ["contract_value", "health_score"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return FeatureStore("client", COLUMNS, root=str(tmp_path), ttl=60, clock=clock)
+
+
+def test_get_many_respects_versions_and_ttl(store, clock):
+    """Test lookups only hit rows at least as new as the requested version"""
+    store.put_many([1, 2], ["2024-01-01T00:00:00", "2024-01-02T00:00:00"], [[100, 80], [200, 60]])
+
+    values, found = store.get_many(["1", 2, 3], ["2024-01-01T00:00:00", "2024-01-03T00:00:00", None])
+
+    assert found.tolist() == [True, False, False]
+    assert values[0].tolist() == [100, 80]
+    assert np.isnan(values[1:]).all()
+    assert store.get(2) == {"contract_value": 200, "health_score": 60}
+
+    clock.now += 60
+    assert store.get(1) is None
+    assert store.stats()["misses"] == 3
+
+
+def test_snapshot_is_shared_and_survives_restarts(store, tmp_path, clock):
+    """Test a snapshot is memory-mapped by other stores over the same directory"""
+    store.put_many(["b", "a"], [5, 5], pd.DataFrame({"health_score": [60, 80], "contract_value": [2, 1]}))
+    name = store.snapshot()
+
+    other = FeatureStore("client", COLUMNS, root=str(tmp_path), ttl=60, clock=clock)
+    values, found = other.get_many(["a", "b", "c"], [5, 6, 5])
+
+    assert other.stats()["snapshot"] == name
+    assert isinstance(other._snapshot.values, np.memmap)
+    assert found.tolist() == [True, False, False]
+    assert values[0].tolist() == [1, 80]
+    assert other.stats()["snapshot_hits"] == 1
+
+    # Rows merged into the next snapshot keep their age
+    clock.now += 30
+    other.put("c", 1, {"contract_value": 3, "health_score": 40})
+    other.snapshot()
+    clock.now += 40
+    assert other.get_many(["a", "b", "c"])[1].tolist() == [False, False, True]
+
+
+def test_invalidate_stale_drops_older_versions_in_both_tiers(store):
+    """Test rows older than the database's updated_at are never served"""
+    store.put_many(["a", "b"], [10, 10], [[1, 1], [2, 2]])
+    store.snapshot()
+    store.put("a", 10, [1, 1])
+
+    assert store.invalidate_stale(["a", "b"], [20, 5]) == 1
+    assert store.get_many(["a", "b"])[1].tolist() == [False, True]
+
+    # A late write of the old version is ignored, the new one is kept
+    store.put("a", 10, [1, 1])
+    assert store.get("a") is None
+    store.put("a", 20, [3, 3])
+    store.snapshot()
+    assert store.get_many(["a", "b"], [20, 10])[0].tolist() == [[3, 3], [2, 2]]
+
+
+def test_get_or_compute_only_computes_misses(store):
+    """Test cached rows are reused and entities without a version are always computed"""
+    computed = []
+
+    def compute(rows):
+        computed.append(rows)
+        return np.array([[float(r), 50.0] for r in rows])
+
+    store.get_or_compute([1, 2, None], ["2024-01-01", "2024-01-01", None], compute)
+    features = store.get_or_compute([1, 2, 3], ["2024-01-01", "2024-02-01", None], compute)
+
+    assert computed == [[0, 1, 2], [1, 2]]
+    assert list(features.columns) == COLUMNS
+    assert features["contract_value"].tolist() == [0, 1, 2]
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path, clock):
+    """Test the memory tier keeps the most recently used rows within its size"""
+    store = FeatureStore("client", COLUMNS, root=str(tmp_path), cache_size=3, clock=clock)
+    store.put_many(["a", "b", "c"], [1, 1, 1], [[1, 1], [2, 2], [3, 3]])
+    store.get("a")
+    store.invalidate(["c"])
+    store.put_many(["d", "e"], [1, 1], [[4, 4], [5, 5]])
+
+    assert store.get_many(["a", "b", "c", "d", "e"])[1].tolist() == [True, False, False, True, True]
+    assert store.get("e") == {"contract_value": 5, "health_score": 5}
+    assert store.stats()["memory_rows"] == 3
+
+
+def test_store_directory_and_pruning(tmp_path, monkeypatch, clock):
+    """Test the root defaults to state/features, and pruning keeps the newest snapshots whatever their names"""
+    monkeypatch.delenv("FEATURE_STORE_DIR", raising=False)
+    ml_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert FeatureStore("client", COLUMNS).root == os.path.join(ml_dir, "state", "features")
+
+    monkeypatch.setenv("FEATURE_STORE_DIR", str(tmp_path))
+    store = FeatureStore("client", COLUMNS, keep_snapshots=2, clock=clock)
+    assert store.directory == str(tmp_path / "client")
+
+    for age, name in enumerate(["zzz-custom", "20240101T000000000000Z", "20240102T000000000000Z"]):
+        store.put("a", age, [age, age])
+        store.snapshot(name)
+        os.utime(tmp_path / "client" / name, ns=(age, age))
+
+    assert store.list_snapshots() == ["20240101T000000000000Z", "20240102T000000000000Z"]
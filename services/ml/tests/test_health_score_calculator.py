@@ -0,0 +1,88 @@
+"""
+Tests for the health score calculator
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from models.health_score_calculator import HealthScoreCalculator
+from models.incremental_health_scorer import IncrementalHealthScorer
+
+
+def make_clients(n, seed=0):
+    """Client inputs spread across every branch, including the edges"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'on_time_payments': rng.uniform(0.5, 1.0, n),
+        'payment_history_months': rng.integers(0, 48, n),
+        'support_tickets_per_month': rng.choice([0, 0.5, 1, 2, 4, 5, 8, 9, 12], n),
+        'avg_resolution_time_days': rng.uniform(0, 12, n),
+        'support_satisfaction': rng.uniform(0.3, 1.0, n),
+        'total_licenses': rng.choice([0, 10, 20, 100], n),
+        'total_users': rng.integers(0, 25, n),
+        'contract_age_days': rng.integers(0, 1500, n),
+        'contract_value': rng.choice([0, 12000, 50000], n),
+        'monthly_spend': rng.uniform(0, 5000, n),
+        'features_used': rng.integers(0, 15, n),
+        'features_available': rng.choice([0, 10, 15], n),
+        'days_since_last_contact': rng.choice([0, 14, 15, 30, 31, 60, 61, 90, 91, 120], n),
+        'previous_health_score': rng.choice([np.nan, 0, 50, 70, 90], n)
+    })
+
+
+def test_batch_matches_scalar():
+    """Test every score and label equals calculate()'s exactly"""
+    calculator = HealthScoreCalculator()
+    clients = make_clients(5000)
+    # Missing values take the scalar path's defaults
+    clients.loc[::7, 'contract_value'] = np.nan
+    clients.loc[::11, 'support_satisfaction'] = np.nan
+    
+    batch = calculator.calculate_batch(clients)
+    
+    for i, row in enumerate(clients.to_dict('records')):
+        expected = calculator.calculate({k: v for k, v in row.items() if not pd.isna(v)})
+        assert batch["overall_score"][i] == expected["overall_score"]
+        assert batch["health_status"][i] == expected["health_status"]
+        assert batch["trend"][i] == expected["trend"]
+        for factor, score in expected["factor_scores"].items():
+            assert batch["factor_scores"][factor][i] == score
+
+
+def test_batch_input_formats():
+    """Test records and column dicts score like a DataFrame, with defaults for absent inputs"""
+    calculator = HealthScoreCalculator()
+    records = [{'total_licenses': 10, 'total_users': 8}, {'days_since_last_contact': 100}, {}]
+    
+    from_records = calculator.calculate_batch(records)
+    from_columns = calculator.calculate_batch({'total_licenses': [10, None, None], 'total_users': [8, None, None],
+                                               'days_since_last_contact': [None, 100, None]})
+    
+    expected = [calculator.calculate(r)["overall_score"] for r in records]
+    assert from_records["overall_score"].tolist() == expected
+    assert from_columns["overall_score"].tolist() == expected
+    assert calculator.calculate_batch([])["overall_score"].shape == (0,)
+
+
+def test_incremental_scorer_recomputes_changed_factors():
+    """Test only factors with changed inputs are recomputed, with identical results"""
+    calculator = HealthScoreCalculator()
+    scorer = IncrementalHealthScorer(calculator)
+    client = {'total_licenses': 100, 'total_users': 85, 'contract_value': 25000, 'days_since_last_contact': 10}
+    
+    assert scorer.calculate(7, client) == calculator.calculate(client)
+    
+    changed = dict(client, total_users=40, previous_health_score=95)
+    assert scorer.calculate(7, changed) == calculator.calculate(changed)
+    
+    stats = scorer.stats()
+    assert stats["requests"] == 2
+    assert (stats["factor_hits"], stats["factor_misses"]) == (5, 7)
+    assert stats["factors"]["license_utilization"] == 0.0
+    assert stats["factors"]["payment_history"] == 0.5
+    
+    scorer.calculate(7, changed)
+    assert scorer.stats()["full_hit_rate"] == pytest.approx(1 / 3)
+    
+    scorer.invalidate(7)
+    scorer.calculate(7, changed)
+    assert scorer.stats()["factor_misses"] == 13
@@ -0,0 +1,97 @@
+"""
+Tests for the multivariate license anomaly model
+"""
+import sys
+import time
+import types
+
+import numpy as np
+import pytest
+from models.anomaly_detector import AnomalyDetector
+from models.license_anomaly_model import LicenseAnomalyModel, license_features
+from models.model_registry import ModelRegistry, _FileLock
+
+
+def make_licenses(n, seed=0):
+    rng = np.random.default_rng(seed)
+    seats = rng.integers(20, 200, n)
+    users = np.round(seats * rng.uniform(0.6, 0.9, n))
+    cost = seats * rng.uniform(10, 20, n)
+    drift = rng.uniform(0.95, 1.05, (2, n))
+    return [
+        {
+            "monthly_cost": float(c), "active_users": float(u), "total_licenses": int(s),
+            "previous_monthly_cost": float(c * dc), "previous_active_users": float(u * du)
+        } for c, u, s, dc, du in zip(cost, users, seats, *drift)
+    ]
+
+
+@pytest.fixture
+def model(tmp_path):
+    model = LicenseAnomalyModel(ModelRegistry(str(tmp_path)), n_jobs=2, n_estimators=50)
+    model.fit(make_licenses(500))
+    return model
+
+
+def test_features_and_scoring(model, tmp_path):
+    """Test a license normal on each feature alone but odd jointly is flagged"""
+    normal = make_licenses(1, seed=1)[0]
+    # Typical cost and seat count, but users and cost jumped month over month
+    odd = dict(normal, previous_monthly_cost=normal["monthly_cost"] / 3, previous_active_users=5)
+    
+    features = license_features([odd])
+    assert features[0, 4] == pytest.approx(2.0)
+    assert features[0, 2] == pytest.approx(odd["active_users"] / odd["total_licenses"] * 100)
+    
+    results = AnomalyDetector(license_model=model).detect_multivariate([normal, odd])
+    assert [r["is_anomaly"] for r in results] == [False, True]
+    assert results[1]["anomaly_score"] > results[0]["anomaly_score"]
+    assert results[1]["top_feature"] in ("cost_change", "active_users_change")
+    
+    # The persisted forest scores the same in a fresh process-like instance
+    reloaded = LicenseAnomalyModel(ModelRegistry(str(tmp_path)))
+    assert reloaded.score([normal, odd]) == results
+
+
+def test_incremental_retrain_extends_window(model):
+    """Test observations are appended to the active version's training window"""
+    first = model.model_version
+    model.observe(make_licenses(30, seed=2))
+    
+    assert model.retrain(min_new_samples=50) is None
+    assert model.pending_count == 30
+    
+    version = model.retrain(make_licenses(20, seed=3), min_new_samples=50)
+    assert version != first
+    assert model.model_version == version
+    assert model.pending_count == 0
+    assert model.registry.get_metadata(model.MODEL_NAME, version)["n_samples"] == 550
+
+
+def test_scheduled_retrain(tmp_path):
+    """Test observing starts a background retrain once enough rows arrive"""
+    model = LicenseAnomalyModel(
+        ModelRegistry(str(tmp_path)), n_jobs=1, n_estimators=20,
+        retrain_interval=0.05, min_new_samples=10
+    )
+    model.fit(make_licenses(100))
+    model.observe(make_licenses(10, seed=4))
+    
+    deadline = time.monotonic() + 10
+    while model.stats["retrains"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    
+    assert model.stats["retrains"] == 2
+    assert model.registry.get_metadata(model.MODEL_NAME, model.model_version)["source"] == "retrain"
+
+
+def test_publish_lock_falls_back_to_msvcrt(tmp_path, monkeypatch):
+    """Test the publish lock works without fcntl, as on Windows"""
+    calls = []
+    msvcrt = types.SimpleNamespace(LK_LOCK=1, LK_UNLCK=0, locking=lambda fd, mode, n: calls.append(mode))
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    monkeypatch.setitem(sys.modules, "msvcrt", msvcrt)
+
+    with _FileLock(str(tmp_path / "model.lock")):
+        assert calls == [msvcrt.LK_LOCK]
+    assert calls == [msvcrt.LK_LOCK, msvcrt.LK_UNLCK]
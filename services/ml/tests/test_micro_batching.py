@@ -0,0 +1,91 @@
+"""
+Tests for the micro-batching scheduler
+"""
+import threading
+
+import pytest
+from utils.micro_batching import MicroBatcher
+
+
+def test_concurrent_requests_are_batched():
+    """Test concurrent submissions share one batch and get their own results"""
+    batch_sizes = []
+    release = threading.Event()
+    
+    def batch_fn(items):
+        release.wait(1)
+        batch_sizes.append(len(items))
+        return [item * 2 for item in items]
+    
+    batcher = MicroBatcher(batch_fn, max_batch_size=16, max_wait_ms=200)
+    results = {}
+    
+    def worker(i):
+        results[i] = batcher.submit(i, timeout=5)
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join()
+    
+    assert results == {i: i * 2 for i in range(8)}
+    assert sum(batch_sizes) == 8
+    assert len(batch_sizes) < 8
+
+
+def test_single_request_is_not_delayed_by_window():
+    """Test a lone caller is scored without waiting out the batch window"""
+    batcher = MicroBatcher(lambda items: items, max_batch_size=64, max_wait_ms=10000)
+    
+    assert batcher.submit("only", timeout=1) == "only"
+
+
+def test_batch_errors_propagate_to_callers():
+    """Test an exception in the batch function reaches the caller"""
+    def batch_fn(items):
+        raise ValueError("bad batch")
+    
+    batcher = MicroBatcher(batch_fn)
+    
+    with pytest.raises(ValueError):
+        batcher.submit(1, timeout=1)
+
+
+def test_bad_item_fails_only_its_caller():
+    """Test a batch error is isolated to the item that caused it"""
+    release = threading.Event()
+    
+    def batch_fn(items):
+        release.wait(1)
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+    
+    batcher = MicroBatcher(batch_fn, max_batch_size=16, max_wait_ms=200)
+    results = {}
+    
+    def worker(item):
+        try:
+            results[item] = batcher.submit(item, timeout=5)
+        except ValueError as e:
+            results[item] = e
+    
+    threads = [threading.Thread(target=worker, args=(item,)) for item in ("a", "bad", "b")]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join()
+    
+    assert results["a"] == "A" and results["b"] == "B"
+    assert isinstance(results["bad"], ValueError)
+
+
+def test_short_results_fail_instead_of_hanging():
+    """Test a batch function returning too few results fails the caller within the timeout"""
+    batcher = MicroBatcher(lambda items: [], timeout=2)
+    
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
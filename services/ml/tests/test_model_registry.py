@@ -0,0 +1,121 @@
+"""
+Tests for the versioned model registry
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+from models.model_registry import ModelRegistry, ModelHandle
+from models.churn_predictor import ChurnPredictor
+
+
+def test_save_and_load_versions(tmp_path):
+    """Test versions are published, listed and loaded with metadata"""
+    registry = ModelRegistry(str(tmp_path))
+    
+    v1 = registry.save("demo", {"model": {"weights": [1, 2]}}, metadata={"accuracy": 0.8}, version="v1")
+    v2 = registry.save("demo", {"model": {"weights": [3, 4]}}, version="v2", activate=False)
+    
+    assert registry.list_versions("demo") == ["v1", "v2"]
+    assert registry.current_version("demo") == v1
+    
+    bundle = registry.load("demo")
+    assert bundle.version == "v1"
+    assert bundle["model"] == {"weights": [1, 2]}
+    assert bundle.metadata["accuracy"] == 0.8
+    
+    registry.activate("demo", v2)
+    assert registry.load("demo")["model"] == {"weights": [3, 4]}
+    
+    with pytest.raises(ValueError):
+        registry.activate("demo", "missing")
+
+
+def test_handle_loads_lazily_and_swaps(tmp_path):
+    """Test the handle loads on first use and swaps without touching old bundles"""
+    registry = ModelRegistry(str(tmp_path))
+    calls = []
+    
+    def bootstrap(reg):
+        calls.append(1)
+        return reg.save("demo", {"model": "first"}, version="v1")
+    
+    handle = ModelHandle(registry, "demo", bootstrap=bootstrap, refresh_interval=None)
+    assert calls == []
+    
+    in_flight = handle.get()
+    assert in_flight["model"] == "first"
+    assert calls == [1]
+    
+    registry.save("demo", {"model": "second"}, version="v2")
+    handle.swap()
+    
+    assert handle.get()["model"] == "second"
+    assert in_flight["model"] == "first"
+
+
+def test_concurrent_handles_bootstrap_one_version(tmp_path):
+    """Test handles starting together on an empty registry publish a single first version"""
+    registry = ModelRegistry(str(tmp_path))
+    
+    def bootstrap(reg):
+        time.sleep(0.05)
+        return reg.save("demo", {"model": "first"})
+    
+    handles = [ModelHandle(ModelRegistry(str(tmp_path)), "demo", bootstrap=bootstrap) for _ in range(4)]
+    threads = [threading.Thread(target=handle.get) for handle in handles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(registry.list_versions("demo")) == 1
+    assert len({handle.get().version for handle in handles}) == 1
+
+
+def test_handle_picks_up_versions_activated_elsewhere(tmp_path):
+    """Test another process activating a version is noticed and swapped in"""
+    registry = ModelRegistry(str(tmp_path))
+    registry.save("demo", {"model": "first"}, version="v1")
+    handle = ModelHandle(registry, "demo", refresh_interval=0)
+    assert handle.get()["model"] == "first"
+    
+    registry.save("demo", {"model": "second"}, version="v2")
+    handle.get()
+    handle._swap_thread.join(5)
+    
+    assert handle.get().version == "v2"
+
+
+def test_churn_predictor_uses_fitted_scaler(tmp_path):
+    """Test a predictor loading a saved version gets its fitted scaler"""
+    registry = ModelRegistry(str(tmp_path))
+    first = ChurnPredictor(registry=registry)
+    expected = first.predict({"contract_value": 25000, "monthly_spend": 1000})
+    
+    second = ChurnPredictor(registry=ModelRegistry(str(tmp_path)))
+    assert second.model_version == first.model_version
+    assert hasattr(second.scaler, "mean_")
+    assert second.predict({"contract_value": 25000, "monthly_spend": 1000}) == expected
+
+
+def test_churn_predictor_preload(tmp_path):
+    """Test the model can be loaded in the background"""
+    predictor = ChurnPredictor(registry=ModelRegistry(str(tmp_path)), preload=True)
+    
+    assert predictor.model is not None
+    assert len(ModelRegistry(str(tmp_path)).list_versions("churn")) == 1
+
+
+def test_arrays_are_memory_mapped(tmp_path):
+    """Test array artifacts are mapped read-only unless mmap is disabled"""
+    ModelRegistry(str(tmp_path)).save("demo", {"weights": {"w": np.arange(1000.0)}}, version="v1")
+    
+    mapped = ModelRegistry(str(tmp_path)).load("demo")["weights"]["w"]
+    assert isinstance(mapped, np.memmap)
+    assert not mapped.flags.writeable
+    
+    copied = ModelRegistry(str(tmp_path), mmap_mode="").load("demo")["weights"]["w"]
+    assert not isinstance(copied, np.memmap)
+    np.testing.assert_array_equal(mapped, copied)
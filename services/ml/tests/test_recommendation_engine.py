@@ -0,0 +1,184 @@
+"""
+Tests for the recommendation engine and software catalog
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from models.recommendation_engine import RecommendationEngine
+from models.recommendation_rules import Expression, Rule, RuleError
+from models.software_catalog import SoftwareCatalog, DEFAULT_CATALOG
+
+
+def test_msp_top_k_order():
+    """Test priority, then value, then client and rule order decide the top 10"""
+    clients = [
+        {'client_id': f'C{i}', 'name': f'Client {i}', 'churn_risk': 'high' if i % 4 == 0 else 'low',
+         'contract_value': 10000 + (i % 3) * 1000, 'days_since_contact': 90, 'monthly_spend': 1000}
+        for i in range(40)
+    ]
+    
+    recommendations = RecommendationEngine().generate('msp', {'clients': clients})
+    
+    assert len(recommendations) == 10
+    # High-risk retention alerts first, largest contracts first, ties by client
+    assert [r['client_id'] for r in recommendations[:4]] == ['C8', 'C20', 'C32', 'C4']
+    assert all(r['priority'] == 'high' for r in recommendations[:10])
+    assert recommendations[0]['description'] == \
+        "URGENT: Client Client 8 at high churn risk. Schedule retention call immediately."
+    assert RecommendationEngine().generate('msp', {'clients': pd.DataFrame(clients)}) == recommendations
+
+
+def test_it_recommendations():
+    """Test cost savings, renewals and consolidation are ranked together"""
+    licenses = [
+        {'id': 1, 'software_name': 'Slack Premium', 'utilization_percent': 30, 'monthly_cost': 2000,
+         'total_licenses': 50, 'active_users': 15},
+        {'id': 2, 'software_name': 'Microsoft Teams', 'monthly_cost': 500,
+         'renewal_date': (datetime.utcnow() + timedelta(days=20, hours=1)).isoformat() + 'Z', 'annual_cost': 6000},
+        {'id': 3, 'software_name': 'Custom App', 'monthly_cost': 100}
+    ]
+    
+    recommendations = RecommendationEngine().generate('it_admin', {'software_licenses': licenses})
+    
+    assert [(r['type'], r['priority']) for r in recommendations] == [
+        ('cost_saving', 'high'), ('renewal', 'high'), ('consolidation', 'medium')
+    ]
+    assert recommendations[0]['description'] == \
+        "Software Slack Premium: 35 unused licenses. Potential monthly savings: $1400.00"
+    assert recommendations[1]['description'].startswith("Software Microsoft Teams renewal in 20 days")
+    assert recommendations[2]['potential_value'] == 2500 * 0.3
+
+
+def test_catalog_matches_like_substring_search():
+    """Test the one-pass matcher finds what a substring test per keyword finds"""
+    catalog = SoftwareCatalog(dict(DEFAULT_CATALOG, Video=['Zoom Pro', 'oomon']))
+    names = ['Zoom Pro', 'zoomonday.com', 'Microsoft 365 + Teams', None, 'Looker Studio', 'Internal']
+    
+    matches = catalog.match(names)
+    
+    for category, keywords in catalog.catalog.items():
+        expected = [i for i, name in enumerate(names) if any(k.lower() in (name or '').lower() for k in keywords)]
+        assert list(matches.get(category, [])) == expected
+    assert catalog.categorize('Microsoft 365 + Teams') == 'Productivity'
+    assert catalog.categorize('Internal') is None
+    
+    catalog.extend('Security', ['1Password'])
+    assert catalog.categorize('1password Teams') == 'Security'
+
+
+def write_rules(path, threshold):
+    """Write a one-rule MSP file whose upsell threshold is `threshold`"""
+    path.write_text(json.dumps({'msp': {
+        'source': 'clients', 'limit': 5, 'reference': {'client_id': 'client_id'},
+        'fields': {'client_id': None, 'name': None, 'health_score': 0, 'monthly_spend': 0},
+        'rules': [{
+            'id': 'upsell', 'type': 'upsell', 'when': f'health_score > {threshold}',
+            'value': 'monthly_spend * 12', 'priority': {'high': 'value > 5000', 'default': 'low'},
+            'title': 'Upsell: {name}', 'description': '{name} scores {health_score}'
+        }]
+    }}))
+
+
+def test_rule_validation():
+    """Test invalid rules are rejected when the file is loaded"""
+    fields = {'health_score', 'name'}
+    
+    with pytest.raises(RuleError, match="Unknown field 'score'"):
+        Expression('score > 80', fields)
+    with pytest.raises(RuleError, match='Unsupported syntax'):
+        Expression("__import__('os')", fields)
+    with pytest.raises(RuleError, match='unknown fields'):
+        Rule({'id': 'r', 'type': 'upsell', 'when': 'health_score > 80',
+              'title': '{nme}', 'description': ''}, fields)
+    with pytest.raises(RuleError, match='priority'):
+        Rule({'id': 'r', 'type': 'upsell', 'when': 'health_score > 80', 'priority': 'urgent',
+              'title': '', 'description': ''}, fields)
+    
+    expression = Expression("health_score > 80 and name in ['A', 'B']", fields)
+    table = pd.DataFrame({'health_score': [90, 90, 50], 'name': ['A', 'C', 'B']})
+    assert expression.mask(table).tolist() == [True, False, False]
+    assert [expression.scalar(row) for row in table.to_dict('records')] == [True, False, False]
+
+
+def test_vector_and_scalar_agree():
+    """Test vector() and scalar() pick the same rows, and constructs where they'd differ are rejected"""
+    fields = {'a', 'b', 'c'}
+    table = pd.DataFrame({'a': [0, 5, 2, -3, 7], 'b': [1.5, 0.0, 2.0, 9.0, 7.0],
+                          'c': ['low', 'high', 'x', 'high', 'low']})
+    rows = table.to_dict('records')
+    
+    for source in ["a > 1 and b < 5", "not (a > 1) or c == 'high'", "not a > 1", "0 < a <= b",
+                   "c not in ['x', 'low'] and True", "a * 2 - b >= 3 or not (c in ['x'])",
+                   "not (a > 1 and b > 1 or c == 'low')"]:
+        expression = Expression(source, fields)
+        assert expression.mask(table).tolist() == [bool(expression.scalar(row)) for row in rows], source
+    
+    for source in ["not a", "a and a > 1", "a > 1 or b", "c == None", "c != None", "c in ['x', None]"]:
+        with pytest.raises(RuleError):
+            Expression(source, fields)
+
+
+def test_rules_hot_reload(tmp_path):
+    """Test a changed rule file is swapped in and a broken one is ignored"""
+    path = tmp_path / 'rules.json'
+    write_rules(path, 80)
+    engine = RecommendationEngine(rules_path=str(path), reload_interval=0)
+    clients = [{'client_id': i, 'name': f'Client {i}', 'health_score': 60 + 10 * i, 'monthly_spend': 500}
+               for i in range(4)]
+    
+    assert [r['client_id'] for r in engine.generate('msp', {'clients': clients})] == [3]
+    version = engine.rule_stats()['version']
+    
+    write_rules(path, 65)
+    os.utime(path, ns=(1, 1))
+    recommendations = engine.generate('msp', {'clients': clients})
+    assert [r['client_id'] for r in recommendations] == [1, 2, 3]
+    assert recommendations[0] == {'type': 'upsell', 'title': 'Upsell: Client 1', 'description': 'Client 1 scores 70',
+                                  'potential_value': 6000, 'priority': 'high', 'client_id': 1}
+    assert engine.rule_stats()['version'] != version
+    
+    path.write_text('{"msp": {"source": "clients", "fields": {}, "rules": [{"id": "x"')
+    os.utime(path, ns=(2, 2))
+    assert len(engine.generate('msp', {'clients': clients})) == 3
+    assert 'parse' in engine.rule_stats()['last_error']
+
+
+def test_rule_stats():
+    """Test per-rule evaluation counters"""
+    engine = RecommendationEngine(reload_interval=None)
+    clients = [{'client_id': i, 'name': f'Client {i}', 'churn_risk': 'high' if i < 12 else 'low'} for i in range(20)]
+    
+    engine.generate('msp', {'clients': clients})
+    engine.generate('msp', {'clients': clients[:5]})
+    
+    stats = engine.rule_stats()['rules']['msp']
+    assert stats['retention_high_churn_risk']['calls'] == 2
+    assert stats['retention_high_churn_risk']['rows'] == 25
+    assert stats['retention_high_churn_risk']['matches'] == 17
+    assert stats['retention_high_churn_risk']['selected'] == 15
+    assert stats['upsell_capacity']['matches'] == 0
+    assert stats['upsell_capacity']['mean_ms'] >= 0
+
+
+def test_affected_rules_and_evaluate():
+    """Test rules are matched to the fields they read and evaluated per record"""
+    engine = RecommendationEngine(reload_interval=None)
+    
+    assert engine.affected_rules('msp', {'monthly_spend'}) == \
+        ['upsell_high_satisfaction', 'upsell_capacity', 'optimization_ticket_volume']
+    assert engine.affected_rules('it_admin', {'renewal_date'}) == ['renewal_upcoming']
+    assert engine.affected_rules('msp', {'email'}) == []
+    
+    clients = [
+        {'client_id': 'A', 'name': 'A', 'health_score': 90, 'monthly_spend': 100, 'churn_risk': 'high'},
+        {'client_id': 'B', 'name': 'B'}
+    ]
+    results = engine.evaluate('msp', clients, ['upsell_high_satisfaction', 'retention_high_churn_risk'])
+    
+    assert [[r['rule_id'] for r in made] for made in results] == \
+        [['upsell_high_satisfaction', 'retention_high_churn_risk'], []]
+    assert results[0][0]['potential_value'] == 100 * 12 * 0.3
+    assert results[0][0]['client_id'] == 'A'
@@ -0,0 +1,65 @@
+"""
+Tests for the seasonal expected-cost baseline
+"""
+import numpy as np
+import pytest
+from models.anomaly_detector import AnomalyDetector
+from models.seasonal_baseline import SeasonalBaseline
+
+
+def annual_true_up(years, seed=0):
+    """Monthly costs with a true-up every twelfth month"""
+    rng = np.random.default_rng(seed)
+    costs = rng.normal(1000, 20, size=12 * years)
+    costs[11::12] += 2000
+    return list(costs)
+
+
+def test_seasonal_peak_is_expected():
+    """Test a recurring annual true-up is not flagged once it has been seen"""
+    # The next month is the fourth true-up
+    history = annual_true_up(3)[:-1]
+    
+    seasonal = AnomalyDetector().detect(history, 3000.0)
+    flat = AnomalyDetector(season_length=None).detect(history, 3000.0)
+    
+    assert not seasonal["is_anomaly"]
+    assert seasonal["expected_cost"] == pytest.approx(3000, rel=0.05)
+    assert seasonal["statistics"]["baseline"] == "seasonal"
+    assert flat["is_anomaly"]
+    
+    # An off-season spike still is
+    assert AnomalyDetector().detect(history[:-1], 3000.0)["is_anomaly"]
+    assert not AnomalyDetector().detect(history[:-1], 1000.0)["is_anomaly"]
+
+
+def test_fit_batch_matches_single_series():
+    """Test fitting many series together matches fitting each alone"""
+    histories = [annual_true_up(years, seed) for seed, years in enumerate((2, 3, 4))]
+    histories.append([100.0] * 10)
+    baseline = SeasonalBaseline()
+    
+    costs, valid = AnomalyDetector()._pad_series(histories)
+    forecast, residual_std = baseline.fit_batch(costs, valid)
+    
+    assert np.isnan(forecast[3]) and np.isnan(residual_std[3])
+    assert baseline.forecast(histories[3]) is None
+    for i in range(3):
+        assert (forecast[i], residual_std[i]) == pytest.approx(baseline.forecast(histories[i]))
+
+
+def test_cached_series_extends_incrementally():
+    """Test appended points continue the cached fit and other histories refit"""
+    baseline = SeasonalBaseline()
+    history = annual_true_up(3)
+    baseline.forecast(history[:-2], "acme/aws")
+    
+    incremental = baseline.forecast(history, "acme/aws")
+    assert baseline._cache["acme/aws"]["n"] == len(history)
+    # Same smoothing parameters, so applying the new points equals a refit
+    # only up to the parameter choice; the forecast stays close
+    assert incremental == pytest.approx(baseline.forecast(history), rel=0.05)
+    
+    other = annual_true_up(3, seed=1)
+    baseline.forecast(other, "acme/aws")
+    assert np.array_equal(baseline._cache["acme/aws"]["tail"], other[-12:])
@@ -0,0 +1,81 @@
+"""
+Tests for the streaming anomaly detector
+"""
+import numpy as np
+import pytest
+from models.anomaly_detector import AnomalyDetector
+from models.streaming_anomaly_detector import StreamingAnomalyDetector
+
+
+@pytest.fixture
+def detector(tmp_path):
+    return StreamingAnomalyDetector(str(tmp_path / "state.db"))
+
+
+def test_update_matches_full_history_detect(detector):
+    """Test each ingest is scored like detect() over all earlier values"""
+    batch_detector = AnomalyDetector(season_length=None)
+    values = list(np.random.default_rng(0).normal(1000, 100, size=30))
+    values[20] = 3000
+    
+    for i, value in enumerate(values):
+        result = detector.update("aws", value)
+        expected = batch_detector.detect(values[:i], value)
+        
+        assert result["is_anomaly"] == expected["is_anomaly"]
+        assert result["severity"] == expected["severity"]
+        assert result["score"] == pytest.approx(expected["score"])
+        assert result["expected_cost"] == pytest.approx(expected["expected_cost"])
+    
+    state = detector.get("aws")
+    assert state["count"] == 30
+    assert state["mean"] == pytest.approx(np.mean(values))
+    assert state["std_dev"] == pytest.approx(np.std(values))
+    # The spike barely moves the robust median
+    assert abs(state["median"] - np.median(values)) < 100
+
+
+def test_update_many_keeps_order_and_series_apart(detector):
+    """Test batched observations update each series in order"""
+    results = detector.update_many([
+        {"series_id": "a", "value": 10},
+        ("b", 500),
+        ("a", 12),
+        ("a", 11)
+    ])
+    
+    assert [r["series_id"] for r in results] == ["a", "b", "a", "a"]
+    assert detector.get("a")["count"] == 3
+    assert detector.get("a")["last_value"] == 11
+    assert detector.get("b")["count"] == 1
+    assert detector.get("missing") is None
+
+
+def test_state_persists_and_restores(tmp_path):
+    """Test state survives a new instance and snapshots restore it"""
+    path = str(tmp_path / "state.db")
+    detector = StreamingAnomalyDetector(path)
+    detector.update_many([("a", v) for v in (10, 11, 12)])
+    name = detector.snapshot()
+    detector.update("a", 13)
+    
+    reopened = StreamingAnomalyDetector(path)
+    assert reopened.get("a")["count"] == 4
+    
+    reopened.restore(name)
+    assert reopened.get("a")["count"] == 3
+    assert reopened.list_snapshots() == [name]
+    
+    with pytest.raises(ValueError):
+        reopened.restore("../state")
+
+
+def test_state_dir_is_created_on_first_use(tmp_path, monkeypatch):
+    """Test construction doesn't touch the filesystem and the env var sets the directory"""
+    state_dir = tmp_path / "state"
+    monkeypatch.setenv("ANOMALY_STATE_DIR", str(state_dir))
+    detector = StreamingAnomalyDetector()
+    assert not state_dir.exists()
+    
+    detector.update("a", 10)
+    assert (state_dir / "streaming_anomaly.db").exists()
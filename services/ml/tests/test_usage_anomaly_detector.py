@@ -0,0 +1,69 @@
+"""
+Tests for the grouped usage anomaly detector
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from models.anomaly_detector import AnomalyDetector
+from models.usage_anomaly_detector import UsageAnomalyDetector
+
+
+@pytest.fixture
+def usage():
+    rng = np.random.default_rng(0)
+    frames = []
+    for license_id, department, typical in ((1, "eng", 40.0), (1, "sales", 5.0), (2, "eng", 10.0)):
+        hours = typical * rng.uniform(0.9, 1.1, size=200)
+        frames.append(pd.DataFrame({
+            "license_id": license_id,
+            "department": department,
+            "user_email": [f"{department}{license_id}-{i}@example.com" for i in range(200)],
+            "usage_hours": hours
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    # 15 outliers in one group, one in another
+    df.loc[df.index[200:215], "usage_hours"] = np.linspace(20, 34, 15)
+    df.loc[df.index[400], "usage_hours"] = 0.0
+    return df
+
+
+def test_top_k_per_group(usage):
+    """Test only the K strongest anomalies per group come back, strongest first"""
+    result = UsageAnomalyDetector(top_k=5).detect(usage)
+    
+    assert result["anomaly_count"] == 16
+    assert result["group_count"] == 3
+    sales, eng = result["groups"]
+    assert (sales["license_id"], sales["department"], sales["anomaly_count"]) == (1, "sales", 15)
+    assert [u["usage_hours"] for u in sales["anomalous_users"]] == pytest.approx([34, 33, 32, 31, 30])
+    assert (eng["license_id"], eng["department"]) == (2, "eng")
+    assert eng["anomalous_users"][0]["direction"] == "low"
+
+
+def test_input_formats_agree(usage):
+    """Test DataFrames, column dicts, dict records and row objects score the same"""
+    detector = UsageAnomalyDetector()
+    records = usage.to_dict("records")
+    
+    expected = detector.detect(usage)
+    assert detector.detect({c: usage[c].to_numpy() for c in usage}) == expected
+    assert detector.detect(iter(records)) == expected
+    assert detector.detect(SimpleNamespace(**r) for r in records) == expected
+    assert AnomalyDetector().detect_grouped_usage_anomalies(usage) == expected
+
+
+def test_zero_mad_group_uses_mean_deviation():
+    """Test a group where most users have identical usage still flags the outlier"""
+    usage = {
+        "license_id": [7] * 8,
+        "user_email": [f"u{i}@example.com" for i in range(8)],
+        "usage_hours": [8, 8, 8, 8, 8, 8, 8, 30]
+    }
+    
+    result = UsageAnomalyDetector(group_by=("license_id",)).detect(usage)
+    
+    assert result["anomaly_count"] == 1
+    assert result["groups"][0]["mad_usage"] == 0
+    assert result["groups"][0]["anomalous_users"][0]["user_email"] == "u7@example.com"
@@ -9,7 +9,7 @@ import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
-import joblib
+from sklearn.preprocessing import StandardScaler
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -90,16 +90,18 @@ def train_churn_model():
     
     # Initialize and train model
     predictor = ChurnPredictor()
+    model = predictor.create_model()
+    scaler = StandardScaler()
     
     # Fit scaler
-    X_train_scaled = predictor.scaler.fit_transform(X_train)
-    X_test_scaled = predictor.scaler.transform(X_test)
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
     
     # Train model
-    predictor.model.fit(X_train_scaled, y_train)
+    model.fit(X_train_scaled, y_train)
     
     # Evaluate
-    y_pred = predictor.model.predict(X_test_scaled)
+    y_pred = model.predict(X_test_scaled)
     accuracy = accuracy_score(y_test, y_pred)
     
     print(f"\nModel Performance:")
@@ -107,16 +109,23 @@ def train_churn_model():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred, target_names=['No Churn', 'Churn']))
     
-    # Save model
-    os.makedirs('trained_models', exist_ok=True)
-    joblib.dump(predictor.model, 'trained_models/churn_model.pkl')
-    joblib.dump(predictor.scaler, 'trained_models/churn_scaler.pkl')
+    # Publish as a new registry version; running services pick it up
+    version = predictor.registry.save(
+        ChurnPredictor.MODEL_NAME,
+        predictor.model_artifacts(model, scaler),
+        metadata={
+            'source': 'train_models',
+            'accuracy': float(accuracy),
+            'n_samples': len(df),
+            'feature_names': feature_cols
+        }
+    )
     
-    print("\n✅ Churn model trained and saved!")
+    print(f"\n✅ Churn model version {version} trained and published!")
     
     # Feature importance
-    if hasattr(predictor.model, 'feature_importances_'):
-        importances = predictor.model.feature_importances_
+    if hasattr(model, 'feature_importances_'):
+        importances = model.feature_importances_
         feature_importance = sorted(zip(feature_cols, importances), key=lambda x: x[1], reverse=True)
         
         print("\nFeature Importance:")
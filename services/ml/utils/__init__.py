@@ -3,5 +3,6 @@ Initialize utils package
 """
 
 from .feature_engineering import FeatureEngineer
+from .micro_batching import MicroBatcher
 
-__all__ = ['FeatureEngineer']
\ No newline at end of file
+__all__ = ['FeatureEngineer', 'MicroBatcher']
\ No newline at end of file
@@ -7,6 +7,24 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+from models.feature_pipeline import FeatureColumns, days_between, parse_timestamps, utc_now
+
+# Columns of extract_client_features_batch and extract_software_features_batch
+CLIENT_FEATURE_COLUMNS = (
+    'contract_value', 'monthly_spend', 'total_licenses', 'total_users', 'spend_ratio',
+    'user_to_license_ratio', 'contract_age_days', 'contract_age_months', 'days_since_last_ticket',
+    'support_ticket_frequency', 'engagement_score', 'payment_history_score', 'health_score'
+)
+SOFTWARE_FEATURE_COLUMNS = (
+    'total_licenses', 'active_users', 'monthly_cost', 'annual_cost', 'utilization_percent',
+    'unused_licenses', 'cost_per_license', 'wasted_licenses', 'wasted_cost', 'days_until_renewal'
+)
+# Columns of create_time_series_features_batch
+TIME_SERIES_FEATURE_COLUMNS = (
+    'mean', 'median', 'std', 'min', 'max', 'range', 'trend', 'last_value', 'first_value',
+    'change_percent', 'rolling_mean', 'rolling_std'
+)
+
 class FeatureEngineer:
     def __init__(self):
         pass
@@ -112,6 +130,88 @@ class FeatureEngineer:
         
         return features
     
+    def extract_client_features_batch(self, clients, now=None):
+        """
+        Extract client features for many records at once
+        
+        Same features as extract_client_features, computed per column: dates
+        are parsed in one vectorized call per field and every derived
+        feature is one array operation.
+        
+        Args:
+            clients: List of dicts, DataFrame or dict of columns
+            now: Reference time for ages (defaults to the current UTC time)
+            
+        Returns:
+            pd.DataFrame: One row per client, columns in
+                extract_client_features order
+        """
+        c = FeatureColumns(clients)
+        now = utc_now() if now is None else parse_timestamps([now])[0]
+        
+        contract_value = c.numeric('contract_value', 0)
+        monthly_spend = c.numeric('monthly_spend', 0)
+        total_licenses = c.numeric('total_licenses', 0)
+        total_users = c.numeric('total_users', 0)
+        
+        contract_age_days = np.nan_to_num(days_between(c.timestamps('created_at'), now), nan=0)
+        days_since_last_ticket = np.nan_to_num(days_between(c.timestamps('last_support_ticket'), now), nan=365)
+        
+        return pd.DataFrame({
+            'contract_value': contract_value,
+            'monthly_spend': monthly_spend,
+            'total_licenses': total_licenses,
+            'total_users': total_users,
+            'spend_ratio': _ratio(monthly_spend * 12, contract_value),
+            'user_to_license_ratio': _ratio(total_users, total_licenses),
+            'contract_age_days': contract_age_days,
+            'contract_age_months': contract_age_days / 30,
+            'days_since_last_ticket': days_since_last_ticket,
+            'support_ticket_frequency': c.numeric('support_ticket_frequency', 0),
+            'engagement_score': c.numeric('engagement_score', 0.5),
+            'payment_history_score': c.numeric('payment_history_score', 0.8),
+            'health_score': c.numeric('health_score', 70)
+        })
+    
+    def extract_software_features_batch(self, licenses, now=None):
+        """
+        Extract software license features for many records at once
+        
+        Args:
+            licenses: List of dicts, DataFrame or dict of columns
+            now: Reference time for renewals (defaults to the current UTC time)
+            
+        Returns:
+            pd.DataFrame: One row per license, columns in
+                extract_software_features order
+        """
+        c = FeatureColumns(licenses)
+        now = utc_now() if now is None else parse_timestamps([now])[0]
+        
+        total_licenses = c.numeric('total_licenses', 0)
+        active_users = c.numeric('active_users', 0)
+        monthly_cost = c.numeric('monthly_cost', 0)
+        
+        has_licenses = total_licenses > 0
+        unused_licenses = np.where(has_licenses, total_licenses - active_users, 0)
+        cost_per_license = _ratio(monthly_cost, total_licenses)
+        wasted_licenses = np.maximum(0, unused_licenses)
+        
+        days_until_renewal = days_between(now, c.timestamps('renewal_date'))
+        
+        return pd.DataFrame({
+            'total_licenses': total_licenses,
+            'active_users': active_users,
+            'monthly_cost': monthly_cost,
+            'annual_cost': c.numeric('annual_cost', 0),
+            'utilization_percent': _ratio(active_users, total_licenses) * 100,
+            'unused_licenses': unused_licenses,
+            'cost_per_license': cost_per_license,
+            'wasted_licenses': wasted_licenses,
+            'wasted_cost': wasted_licenses * cost_per_license,
+            'days_until_renewal': np.where(np.isnan(days_until_renewal), 365, np.maximum(0, days_until_renewal))
+        })
+    
     def create_time_series_features(self, time_series_data, window=7):
         """
         Create features from time series data
@@ -152,6 +252,92 @@ class FeatureEngineer:
         
         return features
     
+    def create_time_series_features_batch(self, series, lengths=None, window=7, fill_value=None):
+        """
+        Create time series features for many series at once
+        
+        Same features as create_time_series_features, for every row of a
+        2-D array in a handful of array operations: masked sums for the
+        moments, a closed-form least-squares slope for the trend (t is
+        0..n-1, so its mean and spread are known) and a sliding-window view
+        for each series' last window.
+        
+        Args:
+            series: 2-D array, one series per row, starting at column 0;
+                or a list of sequences of any lengths
+            lengths: Values per row; defaults to each sequence's length, or
+                for an array, the row up to its trailing NaN padding
+            window (int): Rolling window size
+            fill_value: Value for features a series is too short for
+                (trend needs 2 values, rolling ones a full window); None
+                leaves NaN
+            
+        Returns:
+            pd.DataFrame: One row per series, TIME_SERIES_FEATURE_COLUMNS.
+                Rows of empty series are all NaN
+        """
+        values, lengths = _aligned(series, lengths)
+        n_series, width = values.shape
+        mask = np.arange(width) < lengths[:, None]
+        count = lengths.astype(float)
+        present = lengths > 0
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x = np.where(mask, values, 0.0)
+            mean = x.sum(axis=1) / count
+            deviation = np.where(mask, values - mean[:, None], 0.0)
+            std = np.sqrt((deviation ** 2).sum(axis=1) / count)
+            minimum = np.where(mask, values, np.inf).min(axis=1, initial=np.inf)
+            maximum = np.where(mask, values, -np.inf).max(axis=1, initial=-np.inf)
+            
+            # Padding sorts after the values, so the middle of each row's
+            # sorted values is its median
+            ordered = np.sort(np.where(mask, values, np.inf), axis=1)
+            low = np.maximum(lengths - 1, 0) // 2
+            high = np.minimum(lengths // 2, width - 1)
+            rows = np.arange(n_series)
+            median = (ordered[rows, low] + ordered[rows, high]) / 2 if width else np.full(n_series, np.nan)
+            # NaN sorts last, past the padding; like np.median, a NaN among a
+            # row's values makes its median NaN (mean, std, min, max already are)
+            median[(mask & np.isnan(values)).any(axis=1)] = np.nan
+            
+            # Least-squares slope against t = 0..n-1: sum((t - t_mean) * y) / sum((t - t_mean)^2)
+            t_centered = np.arange(width) - (count[:, None] - 1) / 2
+            trend = (np.where(mask, t_centered, 0.0) * x).sum(axis=1) / (count * (count ** 2 - 1) / 12)
+            
+            first = values[:, 0] if width else np.full(n_series, np.nan)
+            last = values[rows, np.maximum(lengths - 1, 0)] if width else np.full(n_series, np.nan)
+            change_percent = np.where(first != 0, (last - first) / first * 100, 0.0)
+        
+        features = pd.DataFrame({
+            'mean': mean,
+            'median': median,
+            'std': std,
+            'min': minimum,
+            'max': maximum,
+            'range': maximum - minimum,
+            'trend': trend,
+            'last_value': last,
+            'first_value': first,
+            'change_percent': change_percent,
+            'rolling_mean': np.nan,
+            'rolling_std': np.nan
+        })
+        features.loc[~present, ['mean', 'median', 'std', 'min', 'max', 'range']] = np.nan
+        features.loc[lengths < 2, ['trend', 'last_value', 'first_value', 'change_percent']] = np.nan
+        
+        full = lengths >= window
+        if window > 0 and width >= window and full.any():
+            # Each series' last full window, without copying the others
+            windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)
+            last_window = windows[rows[full], lengths[full] - window]
+            features.loc[full, 'rolling_mean'] = last_window.mean(axis=1)
+            features.loc[full, 'rolling_std'] = last_window.std(axis=1)
+        
+        if fill_value is not None:
+            features.loc[present] = features.loc[present].fillna(fill_value)
+        return features
+    
     def normalize_features(self, features_dict):
         """
         Normalize feature values to 0-1 range
@@ -213,4 +399,29 @@ class FeatureEngineer:
                 'total_licenses': int(group_data.get('total_licenses', pd.Series([0])).sum())
             }
         
-        return aggregates
\ No newline at end of file
+        return aggregates
+
+def _aligned(series, lengths):
+    """Series as a 2-D float array (NaN padded) and the number of values per row"""
+    if isinstance(series, np.ndarray) and series.ndim == 2:
+        values = series.astype(float, copy=False)
+        if lengths is None:
+            # Up to the trailing NaN padding
+            filled = ~np.isnan(values)
+            lengths = np.where(filled.any(axis=1), values.shape[1] - np.argmax(filled[:, ::-1], axis=1), 0)
+    else:
+        series = [np.asarray(s, dtype=float) for s in series]
+        sizes = np.array([len(s) for s in series], dtype=np.int64)
+        values = np.full((len(series), sizes.max(initial=0)), np.nan)
+        values[np.arange(values.shape[1]) < sizes[:, None]] = np.concatenate(series) if series else []
+        if lengths is None:
+            lengths = sizes
+    lengths = np.minimum(np.asarray(lengths, dtype=np.int64), values.shape[1])
+    if len(lengths) != len(values):
+        raise ValueError(f"Got {len(lengths)} lengths for {len(values)} series")
+    return values, lengths
+
+def _ratio(numerator, denominator):
+    """numerator / denominator where the denominator is positive, else 0"""
+    positive = denominator > 0
+    return np.divide(numerator, denominator, out=np.zeros(len(positive)), where=positive)
@@ -0,0 +1,155 @@
+"""
+Micro-batching Scheduler
+Collects concurrent single-item requests and scores them as one batch
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+class MicroBatcher:
+    """
+    Scores concurrent submit() calls together in one batch_fn call
+
+    If a batch fails, or batch_fn returns the wrong number of results,
+    each item is retried on its own. A bad item then fails only its own
+    caller.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=64, max_wait_ms=2.0, timeout=30.0):
+        """
+        Args:
+            batch_fn (callable): Takes a list of items, returns a list of
+                results in the same order (e.g. ChurnPredictor.predict_batch)
+            max_batch_size (int): Flush once this many items are waiting
+            max_wait_ms (float): Longest time the first item in a batch
+                waits for others to join
+            timeout (float): Default seconds submit() waits for a result
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.timeout = timeout
+        self.stats = {"batches": 0, "items": 0, "retried_batches": 0, "failed_items": 0}
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    def submit(self, item, timeout=None):
+        """
+        Score one item, blocking until its batch has run
+
+        Args:
+            item: Single input for batch_fn
+            timeout (float): Seconds to wait for the result; defaults to
+                the batcher's timeout
+
+        Returns:
+            The result batch_fn produced for this item
+
+        Raises:
+            concurrent.futures.TimeoutError: If no result came in time
+        """
+        future = Future()
+        self._ensure_worker()
+        with self._lock:
+            self._waiting += 1
+        try:
+            self._queue.put((item, future))
+            try:
+                return future.result(self.timeout if timeout is None else timeout)
+            except FutureTimeoutError:
+                # Not scored yet: the worker skips it
+                future.cancel()
+                raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _ensure_worker(self):
+        # Started lazily so forked worker processes each get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+
+                # Every blocked caller is already in this batch, so nobody
+                # else can join until it is scored
+                if len(batch) >= self._waiting:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        # Skip callers that timed out while queued
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self._score([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch, e)
+                return
+            # Isolate the bad item(s) so co-batched callers still get results
+            with self._lock:
+                self.stats["retried_batches"] += 1
+            for pair in batch:
+                self._process_alone(pair)
+            return
+
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _process_alone(self, pair):
+        item, future = pair
+        try:
+            result, = self._score([item])
+        except Exception as e:
+            self._fail([pair], e)
+            return
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["items"] += 1
+        future.set_result(result)
+
+    def _score(self, items):
+        results = list(self.batch_fn(items))
+        if len(results) != len(items):
+            raise RuntimeError(f"Batch function returned {len(results)} results for {len(items)} items")
+        return results
+
+    def _fail(self, batch, error):
+        with self._lock:
+            self.stats["failed_items"] += len(batch)
+        for _, future in batch:
+            future.set_exception(error)